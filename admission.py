@@ -0,0 +1,113 @@
+# admission.py
+# Admission control for the LLM-backed endpoints in app.py.
+# At most max_concurrent requests run at once; up to max_queue more wait (for at most
+# queue_timeout seconds). Anything beyond that is rejected immediately, so overload
+# turns into fast 503s (or degraded answers) instead of timeouts for everyone.
+# Limits are per worker process.
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed; retry_after is a hint in whole seconds."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._in_flight = 0
+        self._queued = 0
+        self._service_times = deque(maxlen=100)  # Recent request durations, for Retry-After
+        self._wait_times = deque(maxlen=100)
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_queue_timeout = 0
+        self.peak_queue_depth = 0
+
+    def retry_after(self) -> int:
+        """Rough time until a slot frees up: the queue ahead drained at the observed service rate."""
+        if not self._service_times:
+            return 1
+        mean_service = sum(self._service_times) / len(self._service_times)
+        backlog = (self._queued + self._in_flight) / max(1, self.max_concurrent)
+        return max(1, round(mean_service * backlog))
+
+    async def _acquire(self):
+        if self._queued == 0 and not self._semaphore.locked():
+            await self._semaphore.acquire()  # Free slot and nobody waiting: no queueing
+            return
+        if self._queued >= self.max_queue:
+            self.shed_queue_full += 1
+            raise AdmissionRejected("queue full", self.retry_after())
+
+        self._queued += 1
+        self.peak_queue_depth = max(self.peak_queue_depth, self._queued)
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.shed_queue_timeout += 1
+            raise AdmissionRejected("queue wait timed out", self.retry_after())
+        finally:
+            self._queued -= 1
+        self._wait_times.append(time.monotonic() - start)
+
+    async def admit(self):
+        """
+        Waits for a slot like slot(), for work that outlives the handler (streamed responses).
+        Returns release(); calling it more than once is harmless. Raises AdmissionRejected.
+        """
+        await self._acquire()
+        self.admitted += 1
+        self._in_flight += 1
+        start = time.monotonic()
+        released = False
+
+        def release():
+            nonlocal released
+            if released:
+                return
+            released = True
+            self._in_flight -= 1
+            self._service_times.append(time.monotonic() - start)
+            self._semaphore.release()
+        return release
+
+    @asynccontextmanager
+    async def slot(self):
+        """`async with controller.slot():` runs the body once admitted, else raises AdmissionRejected."""
+        release = await self.admit()
+        try:
+            yield
+        finally:
+            release()
+
+    def snapshot(self) -> dict:
+        def mean(values):
+            return round(sum(values) / len(values), 4) if values else 0.0
+
+        return {
+            'max_concurrent': self.max_concurrent,
+            'max_queue': self.max_queue,
+            'queue_timeout_seconds': self.queue_timeout,
+            'in_flight': self._in_flight,
+            'queue_depth': self._queued,
+            'peak_queue_depth': self.peak_queue_depth,
+            'admitted': self.admitted,
+            'shed_queue_full': self.shed_queue_full,
+            'shed_queue_timeout': self.shed_queue_timeout,
+            'shed_total': self.shed_queue_full + self.shed_queue_timeout,
+            'mean_queue_wait_seconds': mean(self._wait_times),
+            'mean_service_seconds': mean(self._service_times),
+        }
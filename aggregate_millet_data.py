@@ -3,13 +3,25 @@
 
 import pandas as pd
 import os
+import io
 import ast # To safely evaluate list-like strings from keywords column
+import json
+import argparse
+import hashlib
 from collections import Counter
+from fractions import Fraction
 
 # --- Define File Names (in the current directory) ---
 SENTIMENT_DATA_CSV = 'millet_review_sentiments_groq.csv'
 PROCESSED_DATA_CSV = 'final_processed_dataset.csv' # Needed for original ratings
 OUTPUT_CSV = 'millet_summary.csv'
+STATE_JSON = 'millet_aggregate_state.json' # Accumulators for --incremental runs
+
+# Bump when the accumulator layout or the summary definition changes (forces a rebuild)
+STATE_VERSION = 1
+MEAN_COLUMNS = ['rating', 'sentiment_score', 'taste_score']
+MENTION_COLUMNS = ['texture_mentioned', 'health_benefit_mentioned', 'price_mentioned']
+SENTIMENT_LABELS = ['positive', 'neutral', 'negative']
 
 def calculate_keyword_freq(series):
     """ Safely evaluates string representations of lists and counts keyword frequencies. """
@@ -27,8 +39,12 @@ def calculate_keyword_freq(series):
     return Counter(all_keywords)
 
 def get_top_keywords(counter, top_n=5):
-    """ Returns the top N keywords from a Counter object as a list of strings. """
-    return [item[0] for item in counter.most_common(top_n)]
+    """
+    Returns the top N keywords from a Counter object as a list of strings.
+    Ties are broken alphabetically, so the result doesn't depend on the order rows were counted in.
+    """
+    ranked = sorted(counter.items(), key=lambda item: (-item[1], item[0]))
+    return [item[0] for item in ranked[:top_n]]
 
 
 def aggregate_data(sentiment_path, processed_path):
@@ -84,7 +100,6 @@ def aggregate_data(sentiment_path, processed_path):
         'texture_mentioned': lambda x: (x == True).mean(), # Pct where texture mentioned
         'health_benefit_mentioned': lambda x: (x == True).mean(), # Pct health mentioned
         'price_mentioned': lambda x: (x == True).mean(), # Pct price mentioned
-        'sentiment_label': lambda x: x.value_counts(normalize=True), # For calculating percentages
         'extracted_keywords': calculate_keyword_freq # Custom aggregation for keywords
     }
 
@@ -97,21 +112,17 @@ def aggregate_data(sentiment_path, processed_path):
     summary_df.rename(columns={'review_id': 'num_reviews',
                                'rating': 'avg_rating'}, inplace=True)
 
-    # Calculate sentiment percentages
-    def get_sentiment_pct(sentiment_counts, label):
-        if isinstance(sentiment_counts, pd.Series):
-            return sentiment_counts.get(label, 0) * 100
-        return 0
-
-    summary_df['positive_pct'] = summary_df['sentiment_label'].apply(lambda x: get_sentiment_pct(x, 'positive'))
-    summary_df['neutral_pct'] = summary_df['sentiment_label'].apply(lambda x: get_sentiment_pct(x, 'neutral'))
-    summary_df['negative_pct'] = summary_df['sentiment_label'].apply(lambda x: get_sentiment_pct(x, 'negative'))
+    # Calculate sentiment percentages (a crosstab: agg() flattens per-group value_counts into bare arrays)
+    label_pct = pd.crosstab(merged_df['millet_type'], merged_df['sentiment_label'], normalize='index') * 100
+    label_pct = label_pct.reindex(index=summary_df['millet_type'], columns=SENTIMENT_LABELS, fill_value=0)
+    for label in SENTIMENT_LABELS:
+        summary_df[f"{label}_pct"] = label_pct[label].astype(float).to_numpy()
 
     # Get top keywords
     summary_df['top_keywords'] = summary_df['extracted_keywords'].apply(lambda x: get_top_keywords(x, top_n=10))
 
     # Drop intermediate columns
-    summary_df.drop(columns=['sentiment_label', 'extracted_keywords'], inplace=True)
+    summary_df.drop(columns=['extracted_keywords'], inplace=True)
 
     # Round numeric columns for readability
     numeric_cols = summary_df.select_dtypes(include='number').columns
@@ -121,6 +132,191 @@ def aggregate_data(sentiment_path, processed_path):
     return summary_df
 
 
+# --- Incremental aggregation ---
+# Every summary column is a function of mergeable per-millet totals, so new reviews can be
+# folded into persisted accumulators instead of re-aggregating everything. Sums are exact
+# (Fractions) and keyword ties are broken by name, so neither depends on the order rows are
+# merged in (previously unmatched rows arrive late) and the summary is the same as a full
+# recompute over the whole file (checked by --verify and tests/test_incremental_aggregation.py).
+
+class MilletAccumulator:
+    """Running totals for one millet type."""
+
+    def __init__(self):
+        self.rows = 0
+        self.review_ids = 0  # Non-null review_id count (num_reviews)
+        self.sums = {column: Fraction(0) for column in MEAN_COLUMNS}
+        self.non_null = {column: 0 for column in MEAN_COLUMNS}
+        self.mentions = {column: 0 for column in MENTION_COLUMNS}
+        self.labels = Counter()
+        self.keywords = Counter()
+
+    def add(self, group: pd.DataFrame):
+        """Folds a block of merged rows (all of this millet) into the totals."""
+        self.rows += len(group)
+        self.review_ids += int(group['review_id'].notna().sum())
+        for column in MEAN_COLUMNS:
+            values = pd.to_numeric(group[column], errors='coerce').dropna()
+            self.sums[column] += sum((Fraction(float(v)) for v in values), Fraction(0))
+            self.non_null[column] += len(values)
+        for column in MENTION_COLUMNS:
+            self.mentions[column] += int((group[column] == True).sum())
+        self.labels.update(group['sentiment_label'].dropna().tolist())
+        self.keywords.update(calculate_keyword_freq(group['extracted_keywords']))
+
+    def summary_row(self, millet_type) -> dict:
+        def mean(column):
+            count = self.non_null[column]
+            return float(self.sums[column] / count) if count else float('nan')
+
+        labelled = sum(self.labels.values())
+        row = {
+            'millet_type': millet_type,
+            'num_reviews': self.review_ids,
+            'avg_rating': mean('rating'),
+            'sentiment_score': mean('sentiment_score'),
+            'taste_score': mean('taste_score'),
+        }
+        for column in MENTION_COLUMNS:
+            row[column] = self.mentions[column] / self.rows if self.rows else float('nan')
+        for label in SENTIMENT_LABELS:
+            row[f"{label}_pct"] = (self.labels.get(label, 0) / labelled) * 100 if labelled else 0
+        row['top_keywords'] = get_top_keywords(self.keywords, top_n=10)
+        return row
+
+    def to_dict(self) -> dict:
+        return {
+            'rows': self.rows,
+            'review_ids': self.review_ids,
+            'sums': {column: f"{value.numerator}/{value.denominator}" for column, value in self.sums.items()},
+            'non_null': self.non_null,
+            'mentions': self.mentions,
+            'labels': list(self.labels.items()),
+            'keywords': list(self.keywords.items()),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'MilletAccumulator':
+        acc = cls()
+        acc.rows = data['rows']
+        acc.review_ids = data['review_ids']
+        acc.sums = {column: Fraction(value) for column, value in data['sums'].items()}
+        acc.non_null = data['non_null']
+        acc.mentions = data['mentions']
+        acc.labels = Counter(dict(data['labels']))
+        acc.keywords = Counter(dict(data['keywords']))
+        return acc
+
+
+def merge_with_processed(sentiment_df, processed_df):
+    """Same join as aggregate_data; returns (matched rows, rows without a millet type yet)."""
+    merged_df = pd.merge(sentiment_df, processed_df, on='review_id', how='left')
+    unmatched = merged_df['millet_type'].isnull()
+    return merged_df[~unmatched], sentiment_df[sentiment_df['review_id'].isin(merged_df.loc[unmatched, 'review_id'])]
+
+
+def summary_from_accumulators(accumulators: dict) -> pd.DataFrame:
+    rows = [accumulators[millet].summary_row(millet) for millet in sorted(accumulators)]
+    summary_df = pd.DataFrame(rows)
+    numeric_cols = summary_df.select_dtypes(include='number').columns
+    summary_df[numeric_cols] = summary_df[numeric_cols].round(3)
+    return summary_df
+
+
+def _tail_fingerprint(path: str, offset: int, size: int = 4096) -> str:
+    """Hash of the bytes just before offset: detects a file that was rewritten rather than appended."""
+    with open(path, 'rb') as f:
+        f.seek(max(0, offset - size))
+        return hashlib.sha256(f.read(offset - max(0, offset - size))).hexdigest()
+
+
+def load_state(state_path: str, sentiment_path: str):
+    """Saved state if it is still valid for the sentiment file, else None (full rebuild)."""
+    if not os.path.exists(state_path):
+        return None
+    try:
+        with open(state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Warning: Could not read aggregation state ({e}); rebuilding.")
+        return None
+    if state.get('version') != STATE_VERSION:
+        print("Aggregation state is from an older version; rebuilding.")
+        return None
+    offset = state['sentiment_offset']
+    if os.path.getsize(sentiment_path) < offset or _tail_fingerprint(sentiment_path, offset) != state['tail_sha256']:
+        print("Sentiment file was rewritten since the last run; rebuilding.")
+        return None
+    return state
+
+
+def save_state(state: dict, state_path: str):
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, state_path)
+
+
+def incremental_aggregate(sentiment_path, processed_path, state_path=STATE_JSON, rebuild=False):
+    """
+    Folds only the sentiment rows appended since the last run (plus rows that could not be
+    matched to a millet before) into the saved accumulators and returns the summary.
+    Assumes the sentiment CSV is append-only; anything else triggers a full rebuild.
+    """
+    state = None if rebuild else load_state(state_path, sentiment_path)
+    with open(sentiment_path, 'rb') as f:
+        header = f.readline()
+        if state is None:
+            offset = f.tell()
+            accumulators, pending = {}, pd.DataFrame()
+        else:
+            offset = state['sentiment_offset']
+            accumulators = {m: MilletAccumulator.from_dict(d) for m, d in state['millets'].items()}
+            pending = pd.DataFrame(state['pending'])
+        f.seek(offset)
+        tail = f.read()
+    end_offset = offset + len(tail)
+
+    new_rows = pd.read_csv(io.BytesIO(header + tail)) if tail.strip() else pd.DataFrame()
+    delta = pd.concat([pending, new_rows], ignore_index=True) if len(pending) else new_rows
+    print(f"{'Rebuilding from' if state is None else 'Merging'} {len(new_rows)} new sentiment rows "
+          f"({len(pending)} previously unmatched).")
+
+    if len(delta):
+        processed_df = pd.read_csv(processed_path, usecols=['review_id', 'rating', 'millet_type'])
+        processed_df = processed_df[processed_df['review_id'].isin(delta['review_id'])]
+        matched, pending = merge_with_processed(delta, processed_df)
+        if len(pending):
+            print(f"Warning: {len(pending)} reviews could not be matched to a millet type yet; kept for the next run.")
+        for millet, group in matched.groupby('millet_type', sort=False):
+            accumulators.setdefault(millet, MilletAccumulator()).add(group)
+
+    save_state({
+        'version': STATE_VERSION,
+        'sentiment_offset': end_offset,
+        'tail_sha256': _tail_fingerprint(sentiment_path, end_offset),
+        'millets': {millet: acc.to_dict() for millet, acc in accumulators.items()},
+        'pending': json.loads(pending.to_json(orient='records')) if len(pending) else [],
+    }, state_path)
+    return summary_from_accumulators(accumulators)
+
+
+def verify_against_full(incremental_df, sentiment_path, processed_path) -> bool:
+    """Compares an incremental summary with a full recompute; prints any differences."""
+    full_df = aggregate_data(sentiment_path, processed_path)
+    if full_df is None:
+        return False
+    full_df = full_df.sort_values('millet_type').reset_index(drop=True)
+    incremental_df = incremental_df.sort_values('millet_type').reset_index(drop=True)
+    try:
+        pd.testing.assert_frame_equal(incremental_df, full_df, check_dtype=False, atol=1e-9, rtol=0)
+    except AssertionError as e:
+        print(f"VERIFY FAILED: incremental summary differs from full recompute:\n{e}")
+        return False
+    print(f"VERIFY OK: incremental summary matches full recompute ({len(full_df)} millets).")
+    return True
+
+
 def save_summary_data(df, csv_path):
     """Saves the summary DataFrame to the current directory."""
     output_abs_path = os.path.abspath(csv_path)
@@ -132,6 +328,14 @@ def save_summary_data(df, csv_path):
         print(f"Error saving summary CSV to {output_abs_path}: {e}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aggregate review sentiments into millet_summary.csv")
+    parser.add_argument('--incremental', action='store_true',
+                        help=f"Merge only new sentiment rows into the saved accumulators ({STATE_JSON})")
+    parser.add_argument('--rebuild', action='store_true', help="With --incremental: discard the saved state first")
+    parser.add_argument('--verify', action='store_true',
+                        help="With --incremental: also run the full aggregation and compare the results")
+    args = parser.parse_args()
+
     print("--- Starting Millet Data Aggregation Script ---")
 
     current_dir = os.getcwd()
@@ -139,7 +343,17 @@ if __name__ == "__main__":
     processed_file_path = os.path.join(current_dir, PROCESSED_DATA_CSV)
     output_file_path = os.path.join(current_dir, OUTPUT_CSV)
 
-    millet_summary = aggregate_data(sentiment_file_path, processed_file_path)
+    if args.incremental:
+        millet_summary = None
+        if not os.path.exists(sentiment_file_path) or not os.path.exists(processed_file_path):
+            print("Error: Sentiment or processed data file not found.")
+        else:
+            millet_summary = incremental_aggregate(sentiment_file_path, processed_file_path,
+                                                   os.path.join(current_dir, STATE_JSON), rebuild=args.rebuild)
+            if args.verify and not verify_against_full(millet_summary, sentiment_file_path, processed_file_path):
+                raise SystemExit(1)
+    else:
+        millet_summary = aggregate_data(sentiment_file_path, processed_file_path)
 
     if millet_summary is not None and not millet_summary.empty:
         save_summary_data(millet_summary, output_file_path)
@@ -152,4 +366,4 @@ if __name__ == "__main__":
         print(millet_summary)
     else:
         print("\n--- Aggregation Script Failed ---")
-        print("No output file generated. Please check for errors above.")
\ No newline at end of file
+        print("No output file generated. Please check for errors above.")
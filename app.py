@@ -1,13 +1,31 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import iterate_in_threadpool, run_in_threadpool
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, Response
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 from typing import List, Optional
+import asyncio
+import copy
+import json
 import os
+import threading
+import tracemalloc
 
-from rag_engine import MilletRAGEngine
+from admission import AdmissionController, AdmissionRejected
+from config import Config
+from http_pool import pool_snapshot, warm_up
+from llm_guard import Deadline
+from memory_accounting import deep_sizeof, memory_report
+from profiling import is_admin, profile_store, run_profiled, should_profile, top_functions
+from rag_engine import MilletRAGEngine, PROMPT_VERSION
 from recommendation_engine import MilletRecommender
+from static_assets import StaticAssets, json_asset
+from summary_store import open_summary_store
+
+if Config.TRACEMALLOC:
+    tracemalloc.start()  # Before the engines load, so /debug/memory can attribute their allocations
 
 app = FastAPI(
     title="Millet Health Advisor API",
@@ -23,14 +41,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Serve static files (HTML, CSS, JS) from current directory
-app.mount("/static", StaticFiles(directory="."), name="static")
+# Frontend files are held in memory (precompressed, with ETags); only these are served
+static_assets = StaticAssets()
 
 # Request models
 class HealthQuery(BaseModel):
     health_concerns: List[str]
     user_query: Optional[str] = ""
 
+class BatchHealthQuery(BaseModel):
+    items: List[HealthQuery]
+    include_llm: bool = False  # Off by default: scores, stats and evidence only
+
 class RecommendationResponse(BaseModel):
     success: bool
     recommendations: List[dict]
@@ -40,10 +62,32 @@ class RecommendationResponse(BaseModel):
 # Initialize engines
 rag_engine = MilletRAGEngine()
 recommender = MilletRecommender()
+summary_store = open_summary_store(PROMPT_VERSION)  # Pre-generated summaries (precompute_summaries.py)
+# Bounds the LLM-backed requests in flight (/api/recommend, and batches with include_llm);
+# /health, /api/millets, static files and score-only batches bypass it
+admission = AdmissionController(
+    max_concurrent=Config.ADMISSION_MAX_CONCURRENT,
+    max_queue=Config.ADMISSION_MAX_QUEUE,
+    queue_timeout=Config.ADMISSION_QUEUE_TIMEOUT_SECONDS
+)
+# The catalog only changes with the CSV, so serialise it once and answer revalidations with 304
+millets_catalog = json_asset({"millets": recommender.display_names})
+
+@app.on_event("startup")
+async def warm_groq_pool():
+    # Runs in each worker (after fork); in the background so startup isn't held up by the network
+    threading.Thread(target=warm_up, name="groq-warm-up", daemon=True).start()
 
 @app.get("/")
-async def read_root():
-    return FileResponse('index.html')
+async def read_root(request: Request):
+    return static_assets.index.respond(request)
+
+@app.get("/static/{filename}", include_in_schema=False)
+async def static_file(filename: str, request: Request):
+    asset = static_assets.get(filename)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return asset.respond(request)
 
 @app.get("/favicon.ico", include_in_schema=False)
 async def favicon():
@@ -51,70 +95,357 @@ async def favicon():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "message": "Millet Health Advisor API is running"}
+    return {
+        "status": "healthy",
+        "message": "Millet Health Advisor API is running",
+        "llm_circuit": rag_engine.circuit_breaker.snapshot()
+    }
 
-@app.post("/api/recommend", response_model=RecommendationResponse)
-async def get_recommendations(query: HealthQuery):
-    try:
-        if not query.health_concerns:
-            raise HTTPException(status_code=400, detail="At least one health concern is required")
-        
-        # Get recommendations from CSV data
-        recommendations = recommender.get_top_recommendations(query.health_concerns, top_n=3)
-        
-        # Get scientific evidence for each recommended millet
-        # Get scientific evidence for each recommended millet
-        scientific_evidence = {}
-        
-        # FIX: Combine selected tags AND user's typed text for the search
-        search_context = ', '.join(query.health_concerns)
-        if query.user_query:
-            search_context += f". Specific focus: {query.user_query}"
+def search_context_for(query: HealthQuery) -> str:
+    # FIX: Combine selected tags AND user's typed text for the search
+    search_context = ', '.join(query.health_concerns)
+    if query.user_query:
+        search_context += f". Specific focus: {query.user_query}"
+    return search_context
 
-        for rec in recommendations:
-            millet_name = rec['name'].lower().replace(' millet', '')
-            
+def gather_evidence(query: HealthQuery, recommendations: List[dict], cache: Optional[dict] = None):
+    """
+    Scientific evidence for each recommended millet -> (display strings, raw chunks) keyed by name.
+    Pass a dict as cache to share retrieval results between queries (batch endpoint).
+    """
+    scientific_evidence = {}
+    evidence_documents = {}  # Raw chunks, assembled into the prompts under a token budget
+    search_context = search_context_for(query)
+
+    for rec in recommendations:
+        millet_name = recommender.millet_key(rec)
+        key = (search_context, millet_name)
+        if cache is not None and key in cache:
+            evidence, documents = cache[key]
+        else:
             # Now we search the database for "Weight Loss AND Bone Strength"
-            evidence = rag_engine.get_scientific_evidence(
+            evidence, documents = rag_engine.get_evidence_with_documents(
                 health_concern=search_context,
                 millet_type=millet_name
             )
-            scientific_evidence[rec['name']] = evidence
-        
-        # Generate comprehensive summary using LLM
-        user_data = {
-            'recommendations': recommendations,
-            'health_concerns': query.health_concerns,
-            'user_query': query.user_query
-        }
-        summary = rag_engine.get_combined_recommendation(query.health_concerns, user_data)
-        
-        # Enhance each recommendation with benefits summary
+            if cache is not None:
+                cache[key] = (evidence, documents)
+        scientific_evidence[rec['name']] = evidence
+        evidence_documents[rec['name']] = documents
+    return scientific_evidence, evidence_documents
+
+async def agather_evidence(query: HealthQuery, recommendations: List[dict]):
+    """gather_evidence for the async handler: every millet's retrieval in flight at once, off the event loop."""
+    search_context = search_context_for(query)
+    results = await asyncio.gather(*(
+        rag_engine.aget_evidence_with_documents(health_concern=search_context,
+                                                millet_type=recommender.millet_key(rec))
+        for rec in recommendations
+    ))
+    scientific_evidence = {rec['name']: evidence for rec, (evidence, _) in zip(recommendations, results)}
+    evidence_documents = {rec['name']: documents for rec, (_, documents) in zip(recommendations, results)}
+    return scientific_evidence, evidence_documents
+
+def generate_summaries(query: HealthQuery, recommendations: List[dict], evidence_documents: dict,
+                       deadline: Deadline) -> str:
+    """Combined summary (returned) plus rec['benefits_summary'] on every recommendation."""
+    user_data = {
+        'recommendations': recommendations,
+        'health_concerns': query.health_concerns,
+        'user_query': query.user_query,
+        'scientific_evidence': evidence_documents
+    }
+    # Without free text the summaries only depend on the concern set, so try the store first
+    use_store = not query.user_query
+    summary = None
+    benefits = {}
+    if use_store:
+        summary = summary_store.get_combined(query.health_concerns, [rec['name'] for rec in recommendations])
         for rec in recommendations:
-            millet_name = rec['name'].lower().replace(' millet', '')
-            evidence = scientific_evidence.get(rec['name'], [])
+            millet_name = recommender.millet_key(rec)
+            benefits[rec['name']] = summary_store.get_benefits(millet_name, query.health_concerns)
+
+    # Structured mode: one JSON call covers everything still missing; any failure falls through
+    needs_llm = summary is None or any(benefits.get(rec['name']) is None for rec in recommendations)
+    if needs_llm and Config.LLM_MODE == 'structured':
+        try:
+            structured_summary, structured_benefits = rag_engine.get_structured_recommendation(
+                query.health_concerns, user_data, deadline=deadline
+            )
+            summary = summary or structured_summary
+            for name, html in structured_benefits.items():
+                if benefits.get(name) is None:
+                    benefits[name] = html
+        except Exception as e:
+            print(f"Structured LLM call failed, using per-call prompts: {e}")
+
+    if summary is None:
+        summary = rag_engine.get_combined_recommendation(query.health_concerns, user_data, deadline=deadline)
+
+    # Enhance each recommendation with benefits summary
+    for rec in recommendations:
+        millet_name = recommender.millet_key(rec)
+        evidence = evidence_documents.get(rec['name'], [])
+        benefits_summary = benefits.get(rec['name'])
+        if benefits_summary is None:
             benefits_summary = rag_engine.generate_benefits_summary(
-                millet_name, query.health_concerns, evidence
+                millet_name, query.health_concerns, evidence, deadline=deadline
             )
-            rec['benefits_summary'] = benefits_summary
-        
+        rec['benefits_summary'] = benefits_summary
+    return summary
+
+async def abuild_recommendation_response(query: HealthQuery, offload=run_in_threadpool) -> RecommendationResponse:
+    """
+    The /api/recommend pipeline, with nothing blocking on the event loop: scoring and the LLM
+    stage go through offload (the threadpool by default), retrieval runs on the RAG engine's
+    bounded retrieval pool.
+    """
+    # One time budget for every LLM call made on behalf of this request
+    deadline = Deadline(Config.REQUEST_DEADLINE_SECONDS)
+    try:
+        if not query.health_concerns:
+            raise HTTPException(status_code=400, detail="At least one health concern is required")
+
+        # Get recommendations from CSV data
+        recommendations = await offload(recommender.get_top_recommendations, query.health_concerns, 3)
+
+        # Get scientific evidence for each recommended millet
+        scientific_evidence, evidence_documents = await agather_evidence(query, recommendations)
+
+        # Generate comprehensive summary using LLM
+        summary = await offload(generate_summaries, query, recommendations, evidence_documents, deadline)
+
         return RecommendationResponse(
             success=True,
             recommendations=recommendations,
             summary=summary,
             scientific_evidence=scientific_evidence
         )
-        
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating recommendations: {str(e)}")
 
-@app.get("/api/millets")
-async def get_all_millets():
+async def run_inline(func, *args):
+    return func(*args)
+
+def build_recommendation_response(query: HealthQuery) -> RecommendationResponse:
+    """
+    abuild_recommendation_response from a worker thread (profiled requests), on a private event
+    loop: scoring and the LLM stage run in this thread, retrieval on the retrieval pool as usual.
+    """
+    return asyncio.run(abuild_recommendation_response(query, offload=run_inline))
+
+def degraded_summaries(query: HealthQuery, recommendations: List[dict]) -> str:
+    """generate_summaries for shed requests: template text only, no retrieval or Groq calls."""
+    spent = Deadline(0)  # An exhausted deadline makes every LLM call fall straight to its template
+    user_data = {'recommendations': recommendations, 'health_concerns': query.health_concerns,
+                 'user_query': query.user_query, 'scientific_evidence': {}}
+    summary = rag_engine.get_combined_recommendation(query.health_concerns, user_data, deadline=spent)
+    for rec in recommendations:
+        millet_name = recommender.millet_key(rec)
+        rec['benefits_summary'] = rag_engine.generate_benefits_summary(
+            millet_name, query.health_concerns, [], deadline=spent
+        )
+    return summary
+
+def build_degraded_response(query: HealthQuery) -> RecommendationResponse:
+    """Recommender-only answer for shed requests: no retrieval, no Groq calls, template text."""
+    if not query.health_concerns:
+        raise HTTPException(status_code=400, detail="At least one health concern is required")
+    recommendations = recommender.get_top_recommendations(query.health_concerns, top_n=3)
+    summary = degraded_summaries(query, recommendations)
+    return RecommendationResponse(
+        success=True,
+        recommendations=recommendations,
+        summary=summary,
+        scientific_evidence={}
+    )
+
+def busy_response(e: AdmissionRejected) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail=f"Server busy ({e.reason}), please retry",
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+@app.post("/api/recommend", response_model=RecommendationResponse)
+async def get_recommendations(query: HealthQuery, request: Request):
     try:
-        millets = recommender.df['millet_type'].unique().tolist()
-        return {"millets": [millet.title() for millet in millets]}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        async with admission.slot():
+            # Off the event loop, so queued requests and cheap endpoints keep being served
+            if should_profile(request.headers):
+                # Same pipeline; scoring and the LLM stage stay in the profiled thread, which also
+                # shows how long it waits on the retrieval pool
+                label = '+'.join(query.health_concerns) + (' (with query)' if query.user_query else '')
+                return await run_in_threadpool(run_profiled, label, build_recommendation_response, query)
+            return await abuild_recommendation_response(query)
+    except AdmissionRejected as e:
+        if Config.SHED_MODE == 'degraded':
+            return await run_in_threadpool(build_degraded_response, query)
+        raise busy_response(e)
+
+@app.post("/api/recommend/batch")
+async def get_batch_recommendations(batch: BatchHealthQuery):
+    """
+    Recommendations for many profiles, streamed back as NDJSON (one line per item, in order).
+    Identical concern sets are scored once, in one vectorized pass; retrieval results are
+    shared across items. LLM text is skipped unless include_llm is set; such a batch holds one
+    admission slot while it streams (its items call Groq one after another).
+    """
+    if not batch.items:
+        raise HTTPException(status_code=400, detail="At least one item is required")
+    if len(batch.items) > Config.BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {Config.BATCH_MAX_ITEMS} items per batch")
+
+    release = None
+    degraded = False
+    if batch.include_llm:
+        try:
+            release = await admission.admit()
+        except AdmissionRejected as e:
+            if Config.SHED_MODE != 'degraded':
+                raise busy_response(e)
+            degraded = True
+
+    try:
+        valid = [query for query in batch.items if query.health_concerns]
+        all_recommendations = iter(await run_in_threadpool(
+            recommender.get_batch_recommendations, [query.health_concerns for query in valid], 3
+        ))
+    except BaseException:
+        if release is not None:
+            release()
+        raise
+
+    def lines():
+        evidence_cache = {}
+        for index, query in enumerate(batch.items):
+            if not query.health_concerns:
+                item = {"index": index, "success": False, "error": "At least one health concern is required"}
+                yield json.dumps(item) + "\n"
+                continue
+            # Shared between identical concern sets: copy before attaching per-item text
+            recommendations = next(all_recommendations)
+            if degraded:
+                # Shed: recommender-only answers with template text, like /api/recommend
+                recommendations = copy.deepcopy(recommendations)
+                item = {
+                    "index": index,
+                    "success": True,
+                    "recommendations": recommendations,
+                    "summary": degraded_summaries(query, recommendations),
+                    "scientific_evidence": {}
+                }
+                yield json.dumps(jsonable_encoder(item)) + "\n"
+                continue
+            try:
+                if batch.include_llm:
+                    recommendations = copy.deepcopy(recommendations)
+                scientific_evidence, evidence_documents = gather_evidence(query, recommendations, evidence_cache)
+                summary = None
+                if batch.include_llm:
+                    deadline = Deadline(Config.REQUEST_DEADLINE_SECONDS)
+                    summary = generate_summaries(query, recommendations, evidence_documents, deadline)
+                item = {
+                    "index": index,
+                    "success": True,
+                    "recommendations": recommendations,
+                    "summary": summary,
+                    "scientific_evidence": scientific_evidence
+                }
+            except Exception as e:
+                item = {"index": index, "success": False, "error": f"Error generating recommendations: {str(e)}"}
+            yield json.dumps(jsonable_encoder(item)) + "\n"
+
+    if release is None:
+        # A sync generator: Starlette iterates it in the threadpool, keeping the event loop free
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    async def admitted_lines():
+        try:
+            async for line in iterate_in_threadpool(lines()):
+                yield line
+        finally:
+            release()
+    # The background task also releases the slot if the stream is cut off before it starts
+    return StreamingResponse(admitted_lines(), media_type="application/x-ndjson", background=BackgroundTask(release))
+
+def require_admin(request: Request):
+    if not is_admin(request.headers):
+        raise HTTPException(status_code=403, detail="This endpoint needs the admin token in the X-Profile header")
+
+@app.get("/debug/admission")
+async def admission_metrics(request: Request):
+    require_admin(request)
+    return admission.snapshot()
+
+@app.get("/debug/groq-pool")
+async def groq_pool_metrics(request: Request):
+    require_admin(request)
+    return pool_snapshot()
+
+@app.get("/debug/prompts")
+async def prompt_metrics(request: Request):
+    """Prompt and evidence token counts over the most recent prompts sent to Groq."""
+    require_admin(request)
+    return rag_engine.prompt_stats_summary()
+
+@app.get("/debug/profiles")
+async def list_profiles(request: Request):
+    require_admin(request)
+    return {"profiles": [meta for meta, _ in profile_store.values()]}
+
+@app.get("/debug/profiles/{profile_id}")
+async def download_profile(profile_id: str, request: Request, format: str = "raw"):
+    """Raw folded stacks / .prof file, or ?format=text for a cProfile top-functions table."""
+    require_admin(request)
+    entry = profile_store.get(profile_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    meta, data = entry
+    if format == "text" and meta['mode'] == 'cprofile':
+        return Response(content=top_functions(profile_id), media_type="text/plain")
+    media_type = "text/plain" if meta['mode'] == 'sampling' else "application/octet-stream"
+    return Response(content=data, media_type=media_type,
+                    headers={"Content-Disposition": f'attachment; filename="{meta["filename"]}"'})
+
+@app.get("/debug/memory")
+async def memory_usage(request: Request, top: int = 10):
+    """Sizes of the engines and caches, plus tracemalloc tracebacks (source paths) when tracing is on."""
+    require_admin(request)
+
+    def build():
+        caches = {
+            'evidence': rag_engine.evidence_cache,
+            'profiles': profile_store,
+            'summary_store': {'entries': len(summary_store.benefits) + len(summary_store.combined),
+                              'bytes': deep_sizeof(summary_store.benefits) + deep_sizeof(summary_store.combined)},
+            'static_assets': {'entries': len(static_assets.assets),
+                              'bytes': sum(len(body) for asset in static_assets.assets.values()
+                                           for body in asset.variants.values())},
+        }
+        caches['recommender_materialized'] = recommender.materialized_stats()
+        return memory_report(recommender, rag_engine, caches, top=top)
+    # Deep sizing and tracemalloc snapshots are slow; keep them off the event loop
+    return await run_in_threadpool(build)
+
+@app.post("/debug/reload")
+async def reload_data(request: Request):
+    """Re-reads the reviews CSV in this worker: recommender tables, materialized results, catalog and summary store."""
+    require_admin(request)
+
+    def reload():
+        global millets_catalog, summary_store
+        recommender.reload()
+        millets_catalog = json_asset({"millets": recommender.display_names})
+        summary_store = open_summary_store(PROMPT_VERSION)  # Its version follows the CSV
+    await run_in_threadpool(reload)
+    return {"reloaded": True, "millets": len(recommender.millets),
+            "materialized": recommender.materialized_stats()}
+
+@app.get("/api/millets")
+async def get_all_millets(request: Request):
+    return millets_catalog.respond(request)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,321 @@
+# benchmark_app.py
+# Offline load test for the FastAPI app.
+# Starts app.py in-process with a fake ChatGroq (and optionally a fake embedder),
+# drives /api/recommend with concurrent clients and prints a JSON report.
+# With --groq-stand-in the real ChatGroq client is kept and talks to a local HTTP stand-in
+# for the Groq API, so the shared connection pool (http_pool.py) is exercised too.
+# With --probe-health a side client polls /health during the load: its latency shows whether
+# anything in the request path blocks the event loop (add --embed-latency to make retrieval slow).
+#
+# Example:
+#   python benchmark_app.py --requests 200 --concurrency 8 --llm-latency 0.3 --fake-embedder --output bench.json
+#   python benchmark_app.py --groq-stand-in --fake-embedder
+#   python benchmark_app.py --fake-embedder --embed-latency 0.2 --probe-health 0.02 --concurrency 8
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+# Keep Chroma from phoning home during offline runs
+os.environ.setdefault("ANONYMIZED_TELEMETRY", "False")
+
+# --- Realistic concern mixes (weights roughly follow what users pick on the site) ---
+CONCERN_MIXES = [
+    (['diabetes'], 20),
+    (['weight'], 18),
+    (['diabetes', 'weight'], 12),
+    (['heart'], 8),
+    (['digestive'], 8),
+    (['bones'], 6),
+    (['anemia'], 6),
+    (['gluten'], 5),
+    (['diabetes', 'heart'], 5),
+    (['weight', 'digestive'], 4),
+    (['anemia', 'bones'], 3),
+    (['diabetes', 'heart', 'weight'], 3),
+    (['gluten', 'digestive', 'weight'], 2),
+]
+USER_QUERIES = [
+    "",
+    "",
+    "",
+    "I am pre-diabetic and want breakfast ideas",
+    "Looking for something easy to cook for kids",
+    "I have low hemoglobin",
+]
+
+# Engine methods timed as request stages
+STAGES = {
+    'recommender': ('recommender', 'get_top_recommendations'),
+    'retrieval': ('rag_engine', 'get_evidence_with_documents'),
+    'combined_summary': ('rag_engine', 'get_combined_recommendation'),
+    'benefits_summary': ('rag_engine', 'generate_benefits_summary'),
+    'structured_summary': ('rag_engine', 'get_structured_recommendation'),
+}
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def summarize_ms(samples):
+    values = sorted(samples)
+    if not values:
+        return {'count': 0}
+    return {
+        'count': len(values),
+        'mean_ms': round(sum(values) / len(values), 3),
+        'p50_ms': round(percentile(values, 50), 3),
+        'p95_ms': round(percentile(values, 95), 3),
+        'p99_ms': round(percentile(values, 99), 3),
+        'max_ms': round(values[-1], 3),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def install_stubs(args):
+    """Patches the engine module before app.py builds its singletons."""
+    import rag_engine
+    from config import Config
+    from offline_stubs import FakeEmbeddings, GroqStandInServer, make_fake_chat_groq
+
+    stand_in = None
+    if args.groq_stand_in:
+        stand_in = GroqStandInServer(latency=args.llm_latency, jitter=args.llm_jitter, seed=args.seed).start()
+        Config.GROQ_BASE_URL = stand_in.url
+        Config.GROQ_API_KEY = Config.GROQ_API_KEY or "stand-in-key"
+    else:
+        rag_engine.ChatGroq = make_fake_chat_groq(args.llm_latency, args.llm_jitter, args.seed)
+    if args.fake_embedder:
+        rag_engine.load_embeddings = lambda *a, **kw: FakeEmbeddings(query_latency=args.embed_latency)
+    if args.csv:
+        Config.CSV_PATH = args.csv
+    if args.llm_mode:
+        Config.LLM_MODE = args.llm_mode
+    return stand_in
+
+
+def instrument_stages(app_module, stage_samples, lock):
+    """Wraps engine methods so every call records its wall time under a stage name."""
+    for stage, (attr, method_name) in STAGES.items():
+        target = getattr(app_module, attr)
+        original = getattr(target, method_name)
+
+        def timed(*a, _original=original, _stage=stage, **kw):
+            start = time.perf_counter()
+            try:
+                return _original(*a, **kw)
+            finally:
+                elapsed = (time.perf_counter() - start) * 1000
+                with lock:
+                    stage_samples[_stage].append(elapsed)
+
+        setattr(target, method_name, timed)
+
+
+def start_server(app, host, port):
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.time() + 30
+    while not server.started:
+        if time.time() > deadline:
+            raise RuntimeError("Server did not start within 30 seconds")
+        time.sleep(0.05)
+    return server, thread
+
+
+def build_payloads(count, seed):
+    rng = random.Random(seed)
+    mixes, weights = zip(*CONCERN_MIXES)
+    payloads = []
+    for _ in range(count):
+        payloads.append({
+            'health_concerns': list(rng.choices(mixes, weights=weights)[0]),
+            'user_query': rng.choice(USER_QUERIES),
+        })
+    return payloads
+
+
+def post_json(url, payload, timeout):
+    data = json.dumps(payload).encode('utf-8')
+    request = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        response.read()
+        return response.status
+
+
+class HealthProbe:
+    """Polls /health every `interval` seconds from its own thread and records each latency."""
+
+    def __init__(self, base_url, interval, timeout):
+        self.url = f"{base_url}/health"
+        self.interval = interval
+        self.timeout = timeout
+        self.latencies = []
+        self.errors = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="health-probe", daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(self.url, timeout=self.timeout) as response:
+                    response.read()
+                self.latencies.append((time.perf_counter() - start) * 1000)
+            except Exception:
+                self.errors += 1
+            self._stop.wait(self.interval)
+
+    def start(self) -> 'HealthProbe':
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def report(self) -> dict:
+        return {'interval_s': self.interval, 'errors': self.errors, **summarize_ms(self.latencies)}
+
+
+def run_load(base_url, payloads, concurrency, timeout):
+    """Fires all payloads with a fixed number of concurrent clients."""
+    latencies = []
+    status_counts = defaultdict(int)
+    lock = threading.Lock()
+
+    def one(payload):
+        start = time.perf_counter()
+        try:
+            status = post_json(f"{base_url}/api/recommend", payload, timeout)
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except Exception:
+            status = 'error'
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            latencies.append(elapsed)
+            status_counts[str(status)] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, payloads))
+    duration = time.perf_counter() - start
+    return latencies, dict(status_counts), duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test for /api/recommend")
+    parser.add_argument('--requests', type=int, default=100, help="Total measured requests")
+    parser.add_argument('--warmup', type=int, default=5, help="Unmeasured warm-up requests")
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--llm-latency', type=float, default=0.2, help="Fake LLM latency per call (s)")
+    parser.add_argument('--llm-jitter', type=float, default=0.05, help="Fake LLM latency jitter (s)")
+    parser.add_argument('--fake-embedder', action='store_true', help="Use the hashed fake embedder")
+    parser.add_argument('--embed-latency', type=float, default=0.0,
+                        help="With --fake-embedder: seconds each query embedding blocks (like a real model)")
+    parser.add_argument('--probe-health', type=float, default=0.0, metavar='INTERVAL',
+                        help="Poll /health every INTERVAL seconds during the measured load and report its latency")
+    parser.add_argument('--csv', default=None, help="Override Config.CSV_PATH")
+    parser.add_argument('--llm-mode', choices=['per_call', 'structured'], default=None,
+                        help="Override Config.LLM_MODE")
+    parser.add_argument('--groq-stand-in', action='store_true',
+                        help="Use the real ChatGroq against a local Groq API stand-in (needs langchain-groq)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--timeout', type=float, default=120.0, help="Client timeout per request (s)")
+    parser.add_argument('--output', default=None, help="Write JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    stand_in = install_stubs(args)
+    import app as app_module
+    from config import Config
+
+    stage_samples = defaultdict(list)
+    stage_lock = threading.Lock()
+    instrument_stages(app_module, stage_samples, stage_lock)
+
+    server, thread = start_server(app_module.app, args.host, args.port)
+    base_url = f"http://{args.host}:{args.port}"
+
+    try:
+        if args.warmup:
+            run_load(base_url, build_payloads(args.warmup, args.seed + 1), 1, args.timeout)
+        with stage_lock:
+            stage_samples.clear()
+
+        payloads = build_payloads(args.requests, args.seed)
+        probe = HealthProbe(base_url, args.probe_health, args.timeout).start() if args.probe_health > 0 else None
+        try:
+            latencies, status_counts, duration = run_load(base_url, payloads, args.concurrency, args.timeout)
+        finally:
+            if probe is not None:
+                probe.stop()
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+        if stand_in is not None:
+            stand_in.stop()
+
+    report = {
+        'git_revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'config': {
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'llm_latency_s': args.llm_latency,
+            'llm_jitter_s': args.llm_jitter,
+            'fake_embedder': args.fake_embedder,
+            'embed_latency_s': args.embed_latency,
+            'llm_mode': args.llm_mode or Config.LLM_MODE,
+            'groq_stand_in': args.groq_stand_in,
+            'seed': args.seed,
+        },
+        'duration_s': round(duration, 3),
+        'throughput_rps': round(len(latencies) / duration, 3) if duration > 0 else 0.0,
+        'status_counts': status_counts,
+        'latency': summarize_ms(latencies),
+        'stages': {stage: summarize_ms(samples) for stage, samples in stage_samples.items()},
+    }
+    if probe is not None:
+        report['health_probe'] = probe.report()  # Stays near its idle latency if the event loop is never blocked
+    if stand_in is not None:
+        from http_pool import pool_snapshot
+        report['groq_pool'] = pool_snapshot()
+        report['groq_stand_in'] = stand_in.stats()  # connections_accepted << requests means keep-alive works
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+        print(f"Benchmark report saved to {os.path.abspath(args.output)}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
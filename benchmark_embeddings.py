@@ -0,0 +1,162 @@
+# benchmark_embeddings.py
+# Compares embedding backends (huggingface vs onnx vs onnx-int8) on:
+#  - load time and resident memory (each backend runs in its own subprocess)
+#  - per-query encode latency
+#  - vector agreement with the huggingface reference (cosine)
+#  - retrieval agreement: overlap of top-k chunks from the existing Chroma index
+#
+# Example:
+#   python benchmark_embeddings.py --backends huggingface onnx onnx-int8 --output embed_bench.json
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("ANONYMIZED_TELEMETRY", "False")
+
+MILLETS = ['finger', 'pearl', 'foxtail', 'kodo', 'little', 'barnyard', 'proso', 'sorghum']
+CONCERNS = ['diabetes', 'heart', 'digestive', 'anemia', 'weight', 'bones', 'gluten']
+
+
+def benchmark_queries():
+    """Same query shapes MilletRAGEngine.get_scientific_evidence sends."""
+    queries = [f"health benefits of {m} millet for {c}" for m in MILLETS for c in CONCERNS]
+    queries += [f"millets for {c} health benefits nutritional composition" for c in CONCERNS]
+    return queries
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB (Linux /proc, falls back to peak RSS)."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_worker(backend, k, output_path):
+    """Measures a single backend in this (fresh) process and dumps raw results."""
+    rss_start = current_rss_mb()
+    start = time.perf_counter()
+    from embedding_backends import load_embeddings
+    embeddings = load_embeddings(backend)
+    load_seconds = time.perf_counter() - start
+    rss_loaded = current_rss_mb()
+
+    queries = benchmark_queries()
+    embeddings.embed_query(queries[0])  # warm-up
+    latencies, vectors = [], []
+    for query in queries:
+        t0 = time.perf_counter()
+        vectors.append(embeddings.embed_query(query))
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    from config import Config
+    from langchain_community.vectorstores import Chroma
+    store = Chroma(persist_directory=Config.VECTOR_DB_PATH, embedding_function=embeddings)
+    hits = []
+    for vector in vectors:
+        docs = store.similarity_search_by_vector(vector, k=k)
+        hits.append([f"{d.metadata.get('source_page')}:{d.metadata.get('start_index')}" for d in docs])
+
+    with open(output_path, 'w') as f:
+        json.dump({
+            'backend': backend,
+            'load_seconds': load_seconds,
+            'rss_before_mb': rss_start,
+            'rss_after_load_mb': rss_loaded,
+            'rss_after_queries_mb': current_rss_mb(),
+            'latencies_ms': latencies,
+            'vectors': vectors,
+            'hits': hits,
+        }, f)
+
+
+def compare(reference, candidate, k):
+    import numpy as np
+
+    ref = np.array(reference['vectors'])
+    cand = np.array(candidate['vectors'])
+    cosines = (ref * cand).sum(axis=1) / (np.linalg.norm(ref, axis=1) * np.linalg.norm(cand, axis=1))
+    overlaps = [len(set(a) & set(b)) / k for a, b in zip(reference['hits'], candidate['hits'])]
+    top1 = [bool(a and b and a[0] == b[0]) for a, b in zip(reference['hits'], candidate['hits'])]
+    return {
+        'min_cosine': round(float(cosines.min()), 5),
+        'mean_cosine': round(float(cosines.mean()), 5),
+        f'mean_overlap_at_{k}': round(sum(overlaps) / len(overlaps), 4),
+        'top1_agreement': round(sum(top1) / len(top1), 4),
+    }
+
+
+def latency_summary(latencies):
+    values = sorted(latencies)
+    return {
+        'mean_ms': round(sum(values) / len(values), 3),
+        'p50_ms': round(values[len(values) // 2], 3),
+        'p95_ms': round(values[min(len(values) - 1, int(len(values) * 0.95))], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends")
+    parser.add_argument('--backends', nargs='+', default=['huggingface', 'onnx', 'onnx-int8'])
+    parser.add_argument('--k', type=int, default=4, help="Top-k used for retrieval agreement")
+    parser.add_argument('--tolerance', type=float, default=0.02,
+                        help="Minimum cosine must be >= 1 - tolerance for every backend")
+    parser.add_argument('--output', default=None)
+    parser.add_argument('--worker', default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--worker-output', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.k, args.worker_output)
+        return
+
+    raw = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in args.backends:
+            out = os.path.join(tmp, f"{backend}.json")
+            print(f"Benchmarking backend '{backend}'...")
+            subprocess.check_call([sys.executable, os.path.abspath(__file__), '--worker', backend,
+                                   '--worker-output', out, '--k', str(args.k)])
+            with open(out) as f:
+                raw[backend] = json.load(f)
+
+    reference_name = 'huggingface' if 'huggingface' in raw else args.backends[0]
+    report = {'reference': reference_name, 'queries': len(benchmark_queries()), 'backends': {}}
+    within_tolerance = True
+    for backend, result in raw.items():
+        entry = {
+            'load_seconds': round(result['load_seconds'], 3),
+            'rss_after_load_mb': round(result['rss_after_load_mb'], 1),
+            'rss_model_delta_mb': round(result['rss_after_load_mb'] - result['rss_before_mb'], 1),
+            'rss_after_queries_mb': round(result['rss_after_queries_mb'], 1),
+            'query_latency': latency_summary(result['latencies_ms']),
+        }
+        if backend != reference_name:
+            entry['agreement'] = compare(raw[reference_name], result, args.k)
+            entry['within_tolerance'] = entry['agreement']['min_cosine'] >= 1 - args.tolerance
+            within_tolerance = within_tolerance and entry['within_tolerance']
+        report['backends'][backend] = entry
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+        print(f"Embedding benchmark saved to {os.path.abspath(args.output)}")
+    else:
+        print(output)
+    if not within_tolerance:
+        raise SystemExit(f"At least one backend is outside the cosine tolerance of {args.tolerance}.")
+
+
+if __name__ == "__main__":
+    main()
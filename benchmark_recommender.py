@@ -0,0 +1,260 @@
+# benchmark_recommender.py
+# Scaling benchmark for the statistical half of the app, on synthetic review tables.
+# For each size, a generator produces a review table with configurable millets, platforms,
+# rating and health-keyword distributions, plus matching LLM extraction columns. The script then times:
+#  - MilletRecommender construction (plus the tracemalloc peak of what a second, traced build allocates)
+#  - calculate_millet_scores, get_top_recommendations and get_millet_stats
+#  - aggregate_millet_data.aggregate_data and recommender.recommend_millets on the summary
+# The JSON report includes per-size latencies, peak memory and a log-log scaling exponent per
+# function (about 0 = constant, 1 = linear in the number of reviews).
+#
+# Example:
+#   python benchmark_recommender.py --sizes 1000 10000 100000 1000000 --output recommender_bench.json
+#   python benchmark_recommender.py --spec spec.json --no-materialize
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from benchmark_app import CONCERN_MIXES, git_revision, summarize_ms
+from config import Config
+from memory_accounting import dataframe_report, process_rss_bytes
+from millet_registry import registry
+
+# --- Synthetic data distributions (override any key with --spec file.json) ---
+DEFAULT_SPEC = {
+    'millets': [millet.display_name for millet in registry.millets],
+    'millet_weights': None,  # None = uniform
+    'platforms': ['amazon', 'flipkart', 'bigbasket', 'jiomart'],
+    'platform_weights': None,
+    'rating_weights': [5, 7, 13, 30, 45],  # Stars 1..5
+    'sentiment_noise': 0.1,  # Share of reviews whose lexicon sentiment disagrees with the stars
+    'keyword_rate': 0.35,  # Share of reviews mentioning a health concern
+    'concern_weights': None,  # Per concern in HEALTH_PHRASES order; None = uniform
+    'taste_rate': 0.4,  # Share of reviews with an LLM taste score
+}
+
+OPENERS = {
+    'Positive': ["very good product, tasty and fresh", "nice quality millet, loved it", "excellent, will buy again"],
+    'Neutral': ["okay product, nothing special", "average quality, packing was fine", "it is fine for the price"],
+    'Negative': ["bad quality, full of stones", "not fresh, tasted stale", "poor packing and bitter taste"],
+}
+# Each phrase contains at least one MilletRecommender.health_keywords entry for its concern
+HEALTH_PHRASES = {
+    'diabetes': ["good for diabetes", "keeps my blood sugar in check", "low glycemic index"],
+    'heart': ["good for the heart", "helped my cholesterol", "doctor suggested for blood pressure"],
+    'digestive': ["easy to digest", "cured my constipation", "rich in fiber, good for the gut"],
+    'anemia': ["rich in iron", "my hemoglobin improved", "helps with anemia and fatigue"],
+    'weight': ["helped me lose weight", "perfect for my diet", "low calorie breakfast"],
+    'bones': ["good for bone strength", "high in calcium", "recommended for osteoporosis"],
+    'gluten': ["gluten free", "safe for my celiac son", "no allergy unlike wheat"],
+}
+USER_INPUTS = [{'health_goal': 'weight_loss'}, {'health_goal': 'diabetes'},
+               {'taste_preference': 'good', 'texture_preference': 'mentioned'}, {}]
+
+
+def _probabilities(weights, count):
+    if weights is None:
+        return np.full(count, 1.0 / count)
+    weights = np.asarray(weights, dtype=float)
+    return weights / weights.sum()
+
+
+def generate_reviews(n: int, spec: dict = None, seed: int = 0) -> pd.DataFrame:
+    """
+    n synthetic reviews: the columns of Config.CSV_PATH (millet_type, platform, rating, review,
+    sentiment) plus the fields extract_sentiment_aspects_groq.py would produce.
+    """
+    spec = {**DEFAULT_SPEC, **(spec or {})}
+    rng = np.random.default_rng(seed)
+    millets = np.asarray(spec['millets'], dtype=object)
+    platforms = np.asarray(spec['platforms'], dtype=object)
+    concerns = list(HEALTH_PHRASES)
+
+    ratings = rng.choice(np.arange(1, 6), size=n, p=_probabilities(spec['rating_weights'], 5))
+    sentiment = np.where(ratings >= 4, 'Positive', np.where(ratings == 3, 'Neutral', 'Negative')).astype(object)
+    noisy = rng.random(n) < spec['sentiment_noise']
+    sentiment[noisy] = rng.choice(list(OPENERS), size=int(noisy.sum()))
+
+    review = np.empty(n, dtype=object)
+    for label, openers in OPENERS.items():
+        rows = sentiment == label
+        review[rows] = rng.choice(np.asarray(openers, dtype=object), size=int(rows.sum()))
+    mentions = rng.random(n) < spec['keyword_rate']
+    concern_of = rng.choice(len(concerns), size=n, p=_probabilities(spec['concern_weights'], len(concerns)))
+    for j, concern in enumerate(concerns):
+        rows = mentions & (concern_of == j)
+        review[rows] = review[rows] + ', ' + rng.choice(np.asarray(HEALTH_PHRASES[concern], dtype=object),
+                                                        size=int(rows.sum()))
+
+    label = np.char.lower(sentiment.astype(str))
+    base_score = np.select([label == 'positive', label == 'neutral'], [0.85, 0.5], 0.15)
+    taste = np.where(rng.random(n) < spec['taste_rate'], np.round(rng.random(n), 2), np.nan)
+    return pd.DataFrame({
+        'review_id': np.arange(n),
+        'millet_type': rng.choice(millets, size=n, p=_probabilities(spec['millet_weights'], len(millets))),
+        'platform': rng.choice(platforms, size=n, p=_probabilities(spec['platform_weights'], len(platforms))),
+        'rating': ratings,
+        'review': review,
+        'sentiment': sentiment,
+        # LLM extraction columns
+        'sentiment_label': label,
+        'sentiment_score': np.clip(base_score + rng.normal(0, 0.05, n), 0, 1).round(3),
+        'taste_score': taste,
+        'texture_mentioned': rng.random(n) < 0.2,
+        'health_benefit_mentioned': mentions,
+        'price_mentioned': rng.random(n) < 0.1,
+        'extracted_keywords': np.where(label == 'negative', "['stale', 'bitter']", "['tasty', 'fresh']"),
+    })
+
+
+RECOMMENDER_COLUMNS = ['millet_type', 'platform', 'rating', 'review', 'sentiment']
+PROCESSED_COLUMNS = ['review_id', 'rating', 'millet_type']
+SENTIMENT_COLUMNS = ['review_id', 'sentiment_label', 'sentiment_score', 'taste_score', 'texture_mentioned',
+                     'health_benefit_mentioned', 'price_mentioned', 'extracted_keywords']
+
+
+def time_calls(func, argument_sets) -> dict:
+    samples = []
+    for args in argument_sets:
+        start = time.perf_counter()
+        func(*args)
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize_ms(samples)
+
+
+def traced_peak(func, *args):
+    """(result, tracemalloc peak bytes) of one call."""
+    tracemalloc.start()
+    try:
+        result = func(*args)
+        return result, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_size(rows: int, spec: dict, args) -> dict:
+    import recommender as summary_recommender
+    from aggregate_millet_data import aggregate_data
+    from recommendation_engine import MilletRecommender
+
+    start = time.perf_counter()
+    reviews = generate_reviews(rows, spec, seed=args.seed)
+    result = {'rows': rows, 'generate_s': round(time.perf_counter() - start, 3)}
+
+    start = time.perf_counter()
+    engine = MilletRecommender(reviews[RECOMMENDER_COLUMNS].copy())
+    result['construct'] = {'seconds': round(time.perf_counter() - start, 3)}
+    if not args.no_tracemalloc:
+        _, peak = traced_peak(MilletRecommender, reviews[RECOMMENDER_COLUMNS].copy())
+        result['construct']['tracemalloc_peak_bytes'] = peak
+    result['reviews_dataframe_bytes'] = dataframe_report(engine.df)['bytes']
+
+    rng = random.Random(args.seed)
+    mixes, weights = zip(*CONCERN_MIXES)
+    concern_sets = [list(rng.choices(mixes, weights=weights)[0]) for _ in range(args.repeat)]
+    millet_names = [engine.millets[i % len(engine.millets)] for i in range(args.repeat)]
+    functions = {
+        'calculate_millet_scores': time_calls(engine.calculate_millet_scores, [(c,) for c in concern_sets]),
+        'get_top_recommendations': time_calls(engine.get_top_recommendations, [(c, 3) for c in concern_sets]),
+        'get_millet_stats': time_calls(engine.get_millet_stats, [(m,) for m in millet_names]),
+    }
+
+    # aggregate_data and recommend_millets read files, like in the real pipeline
+    with tempfile.TemporaryDirectory() as tmp:
+        sentiment_path = os.path.join(tmp, 'sentiments.csv')
+        processed_path = os.path.join(tmp, 'processed.csv')
+        reviews[SENTIMENT_COLUMNS].to_csv(sentiment_path, index=False)
+        reviews[PROCESSED_COLUMNS].to_csv(processed_path, index=False)
+        with contextlib.redirect_stdout(io.StringIO()):  # Both functions print progress
+            functions['aggregate_data'] = time_calls(aggregate_data, [(sentiment_path, processed_path)])
+            summary = aggregate_data(sentiment_path, processed_path)
+            summary_recommender.millet_summary_df = summary.set_index('millet_type')
+            summary_recommender.LOG_CSV = os.path.join(tmp, 'recommendation_logs.csv')
+            user_inputs = [(USER_INPUTS[i % len(USER_INPUTS)], 3) for i in range(args.repeat)]
+            functions['recommend_millets'] = time_calls(summary_recommender.recommend_millets, user_inputs)
+
+    result['functions'] = functions
+    result['process_rss_bytes'] = process_rss_bytes()
+    return result
+
+
+def scaling_exponents(sizes: list) -> dict:
+    """Slope of log(mean latency) against log(rows) per function (least squares)."""
+    curves = {}
+    for name in sizes[0]['functions']:
+        rows = [entry['rows'] for entry in sizes]
+        means = [entry['functions'][name].get('mean_ms', 0.0) for entry in sizes]
+        curve = {'rows': rows, 'mean_ms': means}
+        if len(rows) > 1 and all(mean > 0 for mean in means):
+            curve['exponent'] = round(float(np.polyfit(np.log(rows), np.log(means), 1)[0]), 3)
+        curves[name] = curve
+    construct = [entry['construct']['seconds'] for entry in sizes]
+    if len(sizes) > 1 and all(seconds > 0 for seconds in construct):
+        curves['construct'] = {
+            'rows': [entry['rows'] for entry in sizes], 'seconds': construct,
+            'exponent': round(float(np.polyfit(np.log([e['rows'] for e in sizes]), np.log(construct), 1)[0]), 3),
+        }
+    return curves
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scaling benchmark for MilletRecommender and recommend_millets")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=20, help="Timed calls per function and size")
+    parser.add_argument('--spec', default=None, help="JSON file overriding DEFAULT_SPEC keys")
+    parser.add_argument('--no-materialize', action='store_true',
+                        help="Build the recommender without materialized results (RECOMMENDER_MATERIALIZE=false)")
+    parser.add_argument('--no-tracemalloc', action='store_true', help="Skip the traced build (halves build time)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=None, help="Write JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    spec = {}
+    if args.spec:
+        with open(args.spec, 'r', encoding='utf-8') as f:
+            spec = json.load(f)
+    if args.no_materialize:
+        Config.RECOMMENDER_MATERIALIZE = False
+
+    # Progress (ours and the recommender's) goes to stderr; stdout carries only the JSON report
+    sizes = []
+    for rows in sorted(args.sizes):
+        print(f"Benchmarking {rows} reviews...", file=sys.stderr)
+        with contextlib.redirect_stdout(sys.stderr):
+            sizes.append(bench_size(rows, spec, args))
+
+    report = {
+        'git_revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'config': {
+            'repeat': args.repeat,
+            'materialize': Config.RECOMMENDER_MATERIALIZE,
+            'concern_scoring': Config.CONCERN_SCORING,
+            'seed': args.seed,
+            'spec': {**DEFAULT_SPEC, **spec},
+        },
+        'sizes': sizes,
+        'scaling': scaling_exponents(sizes),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+        print(f"Recommender benchmark saved to {os.path.abspath(args.output)}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
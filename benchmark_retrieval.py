@@ -0,0 +1,98 @@
+# benchmark_retrieval.py
+# Latency / recall comparison of dense-only retrieval (Chroma) against the hybrid retriever.
+# Recall@k is measured against exact (brute-force) dense top-k over the full embedding matrix;
+# "lexical hit rate" is the share of returned chunks containing at least one query term.
+#
+# Example:
+#   python benchmark_retrieval.py --k 4 --output retrieval_bench.json
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+os.environ.setdefault("ANONYMIZED_TELEMETRY", "False")
+
+from benchmark_embeddings import benchmark_queries
+from config import Config
+from embedding_backends import load_embeddings
+from hybrid_retriever import HybridRetriever, tokenize
+
+
+def exact_dense_top_k(retriever, query_vec, k):
+    scores = np.asarray(retriever.embeddings) @ query_vec
+    return [retriever.texts[i] for i in np.argsort(-scores)[:k]]
+
+
+def run_method(name, search, queries, references, k):
+    latencies, recalls, lexical_hits, fallbacks = [], [], [], 0
+    for query in queries:
+        start = time.perf_counter()
+        docs = search(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if docs is None:
+            fallbacks += 1
+            docs = []
+        texts = [doc.page_content for doc in docs]
+        recalls.append(len(set(texts) & set(references[query])) / k)
+        terms = set(tokenize(query))
+        lexical_hits.extend(bool(terms & set(tokenize(text))) for text in texts)
+
+    values = sorted(latencies)
+    return {
+        'mean_ms': round(sum(values) / len(values), 3),
+        'p50_ms': round(values[len(values) // 2], 3),
+        'p95_ms': round(values[min(len(values) - 1, int(len(values) * 0.95))], 3),
+        f'recall_at_{k}': round(sum(recalls) / len(recalls), 4),
+        'lexical_hit_rate': round(sum(lexical_hits) / len(lexical_hits), 4) if lexical_hits else 0.0,
+        'no_lexical_match_queries': fallbacks,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare dense-only and hybrid retrieval")
+    parser.add_argument('--k', type=int, default=Config.RETRIEVAL_K)
+    parser.add_argument('--candidates', type=int, default=Config.HYBRID_CANDIDATES)
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    from langchain_community.vectorstores import Chroma
+
+    embeddings = load_embeddings()
+    store = Chroma(persist_directory=Config.VECTOR_DB_PATH, embedding_function=embeddings)
+    hybrid = HybridRetriever(Config.HYBRID_INDEX_PATH, embeddings, candidates=args.candidates)
+    queries = benchmark_queries()
+
+    # Query vectors are computed once for the reference so it doesn't skew method latency
+    references = {}
+    for query in queries:
+        vec = np.asarray(embeddings.embed_query(query), dtype=np.float32)
+        vec /= max(float(np.linalg.norm(vec)), 1e-12)
+        references[query] = exact_dense_top_k(hybrid, vec, args.k)
+
+    methods = {
+        'dense': lambda q: store.similarity_search(q, k=args.k),
+        'hybrid': lambda q: hybrid.search(q, k=args.k, fusion='dense'),
+        'hybrid_rrf': lambda q: hybrid.search(q, k=args.k, fusion='rrf'),
+    }
+    report = {
+        'queries': len(queries),
+        'chunks': len(hybrid.texts),
+        'k': args.k,
+        'candidates': args.candidates,
+        'methods': {name: run_method(name, fn, queries, references, args.k) for name, fn in methods.items()},
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+        print(f"Retrieval benchmark saved to {os.path.abspath(args.output)}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# build_static.py
+# Build step for the web frontend: writes content-hashed copies of style.css and script.js
+# (plus gzip and, if the brotli package is installed, brotli variants) to static_build/,
+# and an index.html that references the hashed names. app.py serves these with long-lived
+# cache headers; without a build it falls back to the source files with revalidation only.
+#
+# Example:
+#   python build_static.py
+
+import gzip
+import hashlib
+import json
+import os
+
+BUILD_DIR = 'static_build'
+MANIFEST_FILE = 'manifest.json'
+INDEX_FILE = 'index.html'
+HASHED_ASSETS = ['style.css', 'script.js']  # Files referenced from index.html as /static/<name>
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def write_variants(path: str, data: bytes):
+    """Writes the file plus precompressed .gz (and .br) next to it."""
+    with open(path, 'wb') as f:
+        f.write(data)
+    with open(path + '.gz', 'wb') as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))  # mtime=0 keeps builds reproducible
+    if brotli is not None:
+        with open(path + '.br', 'wb') as f:
+            f.write(brotli.compress(data, quality=11))
+
+
+def build(source_dir: str = '.', build_dir: str = BUILD_DIR) -> dict:
+    os.makedirs(build_dir, exist_ok=True)
+    manifest = {}
+
+    for name in HASHED_ASSETS:
+        with open(os.path.join(source_dir, name), 'rb') as f:
+            data = f.read()
+        stem, ext = os.path.splitext(name)
+        hashed_name = f"{stem}.{content_hash(data)}{ext}"
+        write_variants(os.path.join(build_dir, hashed_name), data)
+        manifest[name] = hashed_name
+        print(f"{name} -> {hashed_name} ({len(data)} bytes)")
+
+    with open(os.path.join(source_dir, INDEX_FILE), 'r', encoding='utf-8') as f:
+        index_html = f.read()
+    for name, hashed_name in manifest.items():
+        index_html = index_html.replace(f"/static/{name}", f"/static/{hashed_name}")
+    write_variants(os.path.join(build_dir, INDEX_FILE), index_html.encode('utf-8'))
+    manifest[INDEX_FILE] = INDEX_FILE  # Not hashed: its URL is "/", revalidated via ETag
+
+    # Drop stale hashed files from earlier builds
+    keep = set(manifest.values()) | {MANIFEST_FILE}
+    for existing in os.listdir(build_dir):
+        base = existing[:-3] if existing.endswith(('.gz', '.br')) else existing
+        if base not in keep:
+            os.remove(os.path.join(build_dir, existing))
+
+    with open(os.path.join(build_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+if __name__ == "__main__":
+    print("--- Building precompressed static assets ---")
+    if brotli is None:
+        print("Note: 'brotli' not installed; writing gzip variants only.")
+    result = build()
+    print(f"Wrote {len(result)} assets to {os.path.abspath(BUILD_DIR)}")
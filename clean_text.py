@@ -6,10 +6,12 @@ import pandas as pd
 import os
 import re
 import uuid
+import argparse
 from datetime import datetime
 import nltk
 from nltk.corpus import stopwords
 from nltk.stem import WordNetLemmatizer
+from near_duplicates import find_near_duplicates, cluster_sizes
 # import spacy # Optional alternative
 
 # --- NLTK Data Download (Run these lines once in a Python console if needed) ---
@@ -61,7 +63,7 @@ def clean_text(text):
 
     return ' '.join(cleaned_words)
 
-def preprocess_data(input_path):
+def preprocess_data(input_path, drop_near_duplicates=False):
     """Loads, cleans, and preprocesses the dataset."""
     print(f"Attempting to load data from: {os.path.abspath(input_path)}")
     if not os.path.exists(input_path):
@@ -132,6 +134,21 @@ def preprocess_data(input_path):
     if empty_clean_reviews > 0:
         print(f"Warning: {empty_clean_reviews} reviews resulted in an empty 'clean_review' after processing.")
 
+    # 7. Cluster near-identical reviews of the same millet (MinHash LSH over 'clean_review', see near_duplicates.py)
+    # 'near_duplicate_of' is the review_id of the cluster's first review (its own id if unique)
+    print("Detecting near-duplicate reviews...")
+    representatives = find_near_duplicates(df['clean_review'].tolist(), groups=df['millet_type'].tolist())
+    df['near_duplicate_of'] = df['review_id'].to_numpy()[representatives]
+    df['near_duplicate_count'] = cluster_sizes(representatives)
+    near_dups = int((df['near_duplicate_of'] != df['review_id']).sum())
+    print(f"Found {near_dups} near-duplicate reviews in {int((df['near_duplicate_count'] > 1).sum()) - near_dups} clusters.")
+    if drop_near_duplicates:
+        # Like step 3, one review per cluster (clusters never span millet types) is kept
+        initial_rows = len(df)
+        df = df.drop_duplicates(subset=['near_duplicate_of'], keep='first').copy()
+        df['near_duplicate_count'] = df.groupby('near_duplicate_of')['review_id'].transform('size')
+        print(f"Dropped {initial_rows - len(df)} near-duplicate review entries.")
+
     # Reorder columns for clarity (optional)
     # Ensure 'sentiment' column exists before including it
     base_cols = ['review_id', 'millet_type', 'platform', 'rating', 'review_text', 'clean_review']
@@ -157,6 +174,11 @@ def save_processed_data(df, csv_path):
         print(f"Error saving CSV to {output_abs_path}: {e}")
 
 if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Clean and preprocess the review dataset")
+    arg_parser.add_argument('--drop-near-duplicates', action='store_true',
+                            help="Keep one review per near-duplicate cluster and millet type (default: only annotate)")
+    args = arg_parser.parse_args()
+
     print("--- Starting Data Preprocessing Script ---")
     
     # Define current directory for input/output
@@ -164,7 +186,7 @@ if __name__ == "__main__":
     input_file_path = os.path.join(current_dir, INPUT_CSV)
     output_file_path = os.path.join(current_dir, OUTPUT_CSV)
     
-    processed_df = preprocess_data(input_file_path)
+    processed_df = preprocess_data(input_file_path, drop_near_duplicates=args.drop_near_duplicates)
 
     if processed_df is not None and not processed_df.empty:
         save_processed_data(processed_df, output_file_path)
@@ -0,0 +1,171 @@
+# concern_relevance.py
+# Offline stage for concern scoring by meaning instead of substrings.
+# Every review is embedded once (CPU, batched, exact duplicates embedded once) and compared with a
+# few prototype sentences per health concern. Its relevance to a concern is the best cosine
+# similarity to that concern's prototypes, scaled to 0..1 between SIMILARITY_FLOOR and
+# SIMILARITY_CEILING. The per-millet mean, per 100 reviews (same scale as the keyword
+# percentages), is saved as a small millets x concerns table. With CONCERN_SCORING=embedding,
+# MilletRecommender loads that table and online scoring stays a lookup.
+#
+# Example:
+#   python concern_relevance.py                 # Writes Config.CONCERN_RELEVANCE_PATH
+#   python concern_relevance.py --batch-size 512 --backend onnx
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import Config
+from millet_registry import registry
+from summary_store import file_fingerprint
+
+# Bump when the prototypes, the scaling or the file layout change
+TABLE_VERSION = 1
+SIMILARITY_FLOOR = 0.25  # all-MiniLM-L6-v2: unrelated review/concern pairs mostly score below this
+SIMILARITY_CEILING = 0.55  # ... and clearly on-topic ones above this
+
+# Concern -> prototype sentences; keys match MilletRecommender.health_keywords
+CONCERN_PROTOTYPES = {
+    'diabetes': ["Good for diabetes, keeps my blood sugar under control.",
+                 "Low glycemic index, my glucose levels stay stable after eating it.",
+                 "Helps diabetics manage sugar and insulin."],
+    'heart': ["Good for heart health and lowers cholesterol.",
+              "Helps control blood pressure and hypertension.",
+              "A heart friendly grain for cardiac patients."],
+    'digestive': ["Easy to digest and good for the stomach.",
+                  "High fiber, it relieved my constipation and improved gut health.",
+                  "Light on the stomach, no bloating or acidity."],
+    'anemia': ["Rich in iron, improved my hemoglobin levels.",
+               "Good for anemia and reduces tiredness and fatigue.",
+               "Helps increase blood count."],
+    'weight': ["Helped me lose weight, keeps me full for longer.",
+               "Good for weight loss and dieting, low in calories.",
+               "Part of my diet to reduce fat and obesity."],
+    'bones': ["Rich in calcium, good for strong bones.",
+              "Helps with bone density and osteoporosis.",
+              "Good for joints and bone health of children and elders."],
+    'gluten': ["Gluten free, safe for my celiac disease.",
+               "A good wheat alternative for gluten intolerance.",
+               "No allergic reaction, suits my gluten allergy."],
+}
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def review_relevance(embeddings, texts, batch_size: int = 256) -> np.ndarray:
+    """
+    (len(texts) x len(CONCERN_PROTOTYPES)) relevance in 0..1, columns in CONCERN_PROTOTYPES order.
+    Identical texts are embedded once.
+    """
+    concerns = list(CONCERN_PROTOTYPES)
+    prototype_texts = [text for concern in concerns for text in CONCERN_PROTOTYPES[concern]]
+    prototype_owner = np.repeat(np.arange(len(concerns)), [len(CONCERN_PROTOTYPES[c]) for c in concerns])
+    prototypes = _normalize_rows(np.asarray(embeddings.embed_documents(prototype_texts), dtype=np.float32))
+
+    unique_texts, inverse = np.unique(np.asarray(texts, dtype=object).astype(str), return_inverse=True)
+    relevance = np.empty((len(unique_texts), len(concerns)), dtype=np.float32)
+    for start in range(0, len(unique_texts), batch_size):
+        batch = unique_texts[start:start + batch_size].tolist()
+        vectors = _normalize_rows(np.asarray(embeddings.embed_documents(batch), dtype=np.float32))
+        similarity = vectors @ prototypes.T
+        for j in range(len(concerns)):
+            relevance[start:start + len(batch), j] = similarity[:, prototype_owner == j].max(axis=1)
+        print(f"  embedded {min(start + batch_size, len(unique_texts))}/{len(unique_texts)} unique reviews", end='\r')
+    print()
+    scaled = (relevance - SIMILARITY_FLOOR) / (SIMILARITY_CEILING - SIMILARITY_FLOOR)
+    return np.clip(scaled, 0.0, 1.0)[inverse.reshape(-1)]
+
+
+def build_relevance_table(df: pd.DataFrame, relevance: np.ndarray) -> Dict:
+    """Per-millet mean relevance per 100 reviews, plus what the table was built from."""
+    millets = df['millet_type']
+    table, names, counts = [], [], []
+    for millet, rows in millets.groupby(millets, sort=False).groups.items():
+        positions = df.index.get_indexer(rows)
+        names.append(str(millet))
+        counts.append(len(positions))
+        table.append([round(float(value), 4) for value in relevance[positions].mean(axis=0) * 100])
+    return {
+        'version': TABLE_VERSION,
+        'created_at': datetime.now().isoformat(),
+        'csv_path': Config.CSV_PATH,
+        'csv_fingerprint': file_fingerprint(Config.CSV_PATH),
+        'embedding_model': Config.EMBEDDING_MODEL,
+        'similarity_floor': SIMILARITY_FLOOR,
+        'similarity_ceiling': SIMILARITY_CEILING,
+        'concerns': list(CONCERN_PROTOTYPES),
+        'millets': names,
+        'millet_ids': [registry.id_for(name) for name in names],
+        'review_counts': counts,
+        'relevance': table,
+    }
+
+
+def save_relevance_table(table: Dict, path: str):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(table, f, indent=2)
+    os.replace(tmp_path, path)  # Readers never see a half-written file
+
+
+def load_relevance_table(path: str) -> Optional[Dict]:
+    """The saved table, or None (with a warning) if it is missing, unreadable or from another version."""
+    if not os.path.exists(path):
+        print(f"Warning: Concern relevance table {path} not found. Run concern_relevance.py to build it.")
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            table = json.load(f)
+    except Exception as e:
+        print(f"Warning: Could not read concern relevance table {path}: {e}")
+        return None
+    if table.get('version') != TABLE_VERSION:
+        print(f"Warning: Concern relevance table {path} is version {table.get('version')}, "
+              f"expected {TABLE_VERSION}. Rebuild it with concern_relevance.py.")
+        return None
+    if table.get('csv_fingerprint') != file_fingerprint(Config.CSV_PATH):
+        print(f"Warning: Concern relevance table {path} was built from a different {Config.CSV_PATH}; "
+              f"rebuild it to include the current reviews.")
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute per-millet concern relevance from review embeddings")
+    parser.add_argument('--output', default=Config.CONCERN_RELEVANCE_PATH)
+    parser.add_argument('--backend', default=None, help="Embedding backend (default: Config.EMBEDDING_BACKEND)")
+    parser.add_argument('--batch-size', type=int, default=256)
+    args = parser.parse_args()
+
+    from embedding_backends import load_embeddings
+
+    df = pd.read_csv(Config.CSV_PATH)
+    df = df[df['millet_type'].notna()].reset_index(drop=True)
+    print(f"Loaded {len(df)} reviews from {Config.CSV_PATH}.")
+    embeddings = load_embeddings(args.backend)
+
+    start = time.perf_counter()
+    relevance = review_relevance(embeddings, df['review'].fillna(''), batch_size=args.batch_size)
+    elapsed = time.perf_counter() - start
+    print(f"Scored {len(df)} reviews against {len(CONCERN_PROTOTYPES)} concerns in {elapsed:.1f}s "
+          f"({len(df) / elapsed:.0f} reviews/s).")
+
+    table = build_relevance_table(df, relevance)
+    save_relevance_table(table, args.output)
+    print(f"Saved {len(table['millets'])} x {len(table['concerns'])} relevance table to {args.output}")
+    header = ' ' * 18 + ''.join(f"{concern[:9]:>10}" for concern in table['concerns'])
+    print(header)
+    for millet, row in zip(table['millets'], table['relevance']):
+        print(f"{millet[:18]:<18}" + ''.join(f"{value:10.1f}" for value in row))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,4 +6,77 @@ load_dotenv()
 class Config:
     GROQ_API_KEY = os.getenv("GROQ_API_KEY")
     VECTOR_DB_PATH = "chroma_vector_db"  # Changed path
-    CSV_PATH = "dataset_with_lexicon_sentiment.csv"  # Changed path
\ No newline at end of file
+    CSV_PATH = "dataset_with_lexicon_sentiment.csv"  # Changed path
+
+    # --- Embeddings (see embedding_backends.py) ---
+    EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "huggingface")  # "huggingface" or "onnx"
+    ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "onnx_embedder")
+    ONNX_QUANTIZED = os.getenv("ONNX_QUANTIZED", "false").lower() == "true"  # Use the int8 model
+
+    # --- Retrieval ---
+    RETRIEVAL_K = 4
+    MILLET_PREFILTER = os.getenv("MILLET_PREFILTER", "true").lower() == "true"  # Search only chunks tagged with the millet
+    RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "dense")  # "dense", "hybrid" or "hybrid_rrf"
+    HYBRID_INDEX_PATH = os.getenv("HYBRID_INDEX_PATH", "hybrid_index")
+    HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "50"))  # BM25 candidates re-ranked densely
+    EVIDENCE_CACHE_BYTES = int(os.getenv("EVIDENCE_CACHE_BYTES", str(16 * 1024 * 1024)))  # Retrieved chunks, LRU
+    RETRIEVAL_MAX_WORKERS = int(os.getenv("RETRIEVAL_MAX_WORKERS", "4"))  # Threads for async retrieval (per worker)
+
+    # --- Prompt evidence budgets (see context_assembler.py) ---
+    EVIDENCE_TOKEN_BUDGET = int(os.getenv("EVIDENCE_TOKEN_BUDGET", "600"))  # Per-millet benefits prompt
+    COMBINED_EVIDENCE_TOKEN_BUDGET = int(os.getenv("COMBINED_EVIDENCE_TOKEN_BUDGET", "900"))  # Combined prompt
+    PROMPT_STATS_HISTORY = 200  # Recent prompts kept for token accounting
+
+    # --- Groq call deadlines and circuit breaker ---
+    REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "20"))  # Whole /api/recommend budget
+    LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "8"))  # Per-call cap
+    LLM_MIN_CALL_SECONDS = float(os.getenv("LLM_MIN_CALL_SECONDS", "0.5"))  # Don't start a call with less left
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "1"))
+    LLM_MAX_WORKERS = int(os.getenv("LLM_MAX_WORKERS", "8"))
+    LLM_BREAKER_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", "3"))
+    LLM_BREAKER_COOLDOWN_SECONDS = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+    LLM_SLOW_CALL_SECONDS = float(os.getenv("LLM_SLOW_CALL_SECONDS", "5"))  # Slower successes count as failures
+    LLM_MODE = os.getenv("LLM_MODE", "per_call")  # "per_call" or "structured" (one JSON call per request)
+
+    # --- Shared Groq HTTP pool (see http_pool.py) ---
+    GROQ_BASE_URL = os.getenv("GROQ_BASE_URL")  # None = https://api.groq.com; point at a local stand-in to test
+    GROQ_POOL_MAX_CONNECTIONS = int(os.getenv("GROQ_POOL_MAX_CONNECTIONS", "20"))
+    GROQ_POOL_MAX_KEEPALIVE = int(os.getenv("GROQ_POOL_MAX_KEEPALIVE", "10"))
+    GROQ_POOL_KEEPALIVE_SECONDS = float(os.getenv("GROQ_POOL_KEEPALIVE_SECONDS", "60"))
+    GROQ_HTTP2 = os.getenv("GROQ_HTTP2", "true").lower() == "true"  # Used only if the 'h2' package is installed
+    GROQ_POOL_WARM_CONNECTIONS = int(os.getenv("GROQ_POOL_WARM_CONNECTIONS", "2"))  # Opened at startup
+
+    # --- Admission control for /api/recommend (see admission.py; limits are per worker) ---
+    ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "8"))
+    ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "16"))
+    ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "5"))
+    SHED_MODE = os.getenv("SHED_MODE", "reject")  # "reject" (503 + Retry-After) or "degraded" (recommender only)
+
+    # --- Per-request profiling (see profiling.py); off unless a token or sample rate is set ---
+    PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN")  # X-Profile header value; also guards /debug/profiles
+    PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))  # Fraction of requests profiled
+    PROFILE_MODE = os.getenv("PROFILE_MODE", "sampling")  # "sampling" (folded stacks) or "cprofile"
+    PROFILE_INTERVAL_SECONDS = float(os.getenv("PROFILE_INTERVAL_SECONDS", "0.005"))
+    PROFILE_MAX_STORED = int(os.getenv("PROFILE_MAX_STORED", "50"))
+    PROFILE_STORE_BYTES = int(os.getenv("PROFILE_STORE_BYTES", str(32 * 1024 * 1024)))
+
+    # --- Memory accounting (see memory_accounting.py, /debug/memory) ---
+    TRACEMALLOC = os.getenv("TRACEMALLOC", "false").lower() == "true"  # Trace allocations from startup (slower)
+
+    # --- Batch endpoint (/api/recommend/batch) ---
+    BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "5000"))
+
+    # --- Multi-worker serving (see gunicorn.conf.py) ---
+    WEB_WORKERS = int(os.getenv("WEB_WORKERS", "4"))
+    WEB_PRELOAD = os.getenv("WEB_PRELOAD", "true").lower() == "true"  # Load models once, share via fork
+
+    # --- Recommender ---
+    RECOMMENDER_MATERIALIZE = os.getenv("RECOMMENDER_MATERIALIZE", "true").lower() == "true"  # Results for all 127 concern subsets
+
+    # --- Concern scoring (see concern_relevance.py) ---
+    CONCERN_SCORING = os.getenv("CONCERN_SCORING", "keywords")  # "keywords" (substring match) or "embedding"
+    CONCERN_RELEVANCE_PATH = os.getenv("CONCERN_RELEVANCE_PATH", "concern_relevance.json")
+
+    # --- Materialized summaries (see precompute_summaries.py) ---
+    SUMMARY_STORE_PATH = os.getenv("SUMMARY_STORE_PATH", "summary_store")
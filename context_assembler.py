@@ -0,0 +1,121 @@
+# context_assembler.py
+# Turns retrieved evidence chunks into a compact, token-budgeted context block for LLM prompts.
+# Chunks are 1000 chars with 150 overlap, so results for one millet often repeat text:
+# overlapping/adjacent chunks from the same page are merged using their start_index,
+# exact duplicates are dropped, and the result is trimmed to the token budget.
+
+import re
+from typing import Dict, List, Tuple
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken is optional; fall back to the ~4 chars/token rule of thumb
+    _ENCODING = None
+
+CHARS_PER_TOKEN = 4
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _to_span(item, rank: int) -> dict:
+    """Normalises a LangChain Document or a plain evidence string into a span dict."""
+    if hasattr(item, 'page_content'):
+        meta = item.metadata or {}
+        start = meta.get('start_index')
+        return {
+            'key': (str(meta.get('source', '')), meta.get('source_page', 'N/A')),
+            'page': meta.get('source_page', 'N/A'),
+            'start': start if isinstance(start, int) and start >= 0 else None,
+            'text': item.page_content,
+            'rank': rank,
+        }
+    return {'key': None, 'page': None, 'start': None, 'text': str(item), 'rank': rank}
+
+
+def merge_spans(items: List) -> List[dict]:
+    """Dedups and merges overlapping/adjacent chunks of the same page; keeps retrieval order."""
+    spans, seen_text = [], set()
+    for rank, item in enumerate(items):
+        span = _to_span(item, rank)
+        if span['text'] in seen_text:
+            continue
+        seen_text.add(span['text'])
+        spans.append(span)
+
+    positioned: Dict[tuple, List[dict]] = {}
+    merged = []
+    for span in spans:
+        if span['key'] is None or span['start'] is None:
+            merged.append(span)
+        else:
+            positioned.setdefault(span['key'], []).append(span)
+
+    for page_spans in positioned.values():
+        page_spans.sort(key=lambda s: s['start'])
+        current = dict(page_spans[0])
+        for span in page_spans[1:]:
+            current_end = current['start'] + len(current['text'])
+            if span['start'] <= current_end:
+                # Overlapping or touching: append only the part not already covered
+                span_end = span['start'] + len(span['text'])
+                if span_end > current_end:
+                    current['text'] += span['text'][current_end - span['start']:]
+                current['rank'] = min(current['rank'], span['rank'])
+            else:
+                merged.append(current)
+                current = dict(span)
+        merged.append(current)
+
+    return sorted(merged, key=lambda s: s['rank'])
+
+
+def assemble_context(items: List, token_budget: int) -> Tuple[str, dict]:
+    """
+    Returns (context_text, stats). The most relevant spans come first; the last one that
+    doesn't fit is cut at a sentence/word boundary so the block stays within token_budget.
+    """
+    spans = merge_spans(items or [])
+    blocks = []
+    for span in spans:
+        text = re.sub(r'\s+', ' ', span['text']).strip()
+        if text:
+            prefix = f"[Page {span['page']}] " if span['page'] is not None else ""
+            blocks.append((prefix + text, count_tokens(prefix + text)))
+    parts, used_tokens, truncated = [], 0, False
+
+    for block, block_tokens in blocks:
+        remaining = token_budget - used_tokens
+        if block_tokens > remaining:
+            if remaining < 20:  # Not worth a fragment
+                truncated = True
+                break
+            cut = block[:remaining * CHARS_PER_TOKEN]
+            while cut and count_tokens(cut + " ...") > remaining:
+                cut = cut[:int(len(cut) * 0.9)]
+            boundary = max(cut.rfind('. '), cut.rfind(' '))
+            block = (cut[:boundary + 1] if boundary > 0 else cut).rstrip() + " ..."
+            block_tokens = count_tokens(block)
+            truncated = True
+        parts.append(block)
+        used_tokens += block_tokens
+        if truncated:
+            break
+
+    context = "\n".join(parts)
+    stats = {
+        'chunks_in': len(items or []),
+        'spans_after_merge': len(spans),
+        'spans_used': len(parts),
+        'evidence_tokens_in': sum(block_tokens for _, block_tokens in blocks),  # Before trimming to the budget
+        'evidence_tokens': used_tokens,
+        'token_budget': token_budget,
+        'truncated': truncated,
+    }
+    return context, stats
@@ -0,0 +1,114 @@
+# embedding_backends.py
+# Embedding backends selectable through Config.EMBEDDING_BACKEND:
+#  - "huggingface": sentence-transformers through LangChain (full PyTorch, the original setup)
+#  - "onnx": ONNX Runtime export of the same model (see export_onnx_embedder.py),
+#            optionally int8 dynamic-quantized via Config.ONNX_QUANTIZED
+# Both produce L2-normalised mean-pooled vectors, so they can query the same Chroma index.
+
+import os
+import threading
+from typing import List
+
+import numpy as np
+
+from config import Config
+
+ONNX_MODEL_FILE = 'model.onnx'
+ONNX_INT8_MODEL_FILE = 'model_int8.onnx'
+TOKENIZER_FILE = 'tokenizer.json'
+
+
+class OnnxEmbeddings:
+    """
+    LangChain-compatible embedder running the exported MiniLM graph on ONNX Runtime (CPU).
+    The InferenceSession (and its intra-op thread pool) is created on first use in each process:
+    a session inherited across fork() from a preloading gunicorn master can deadlock.
+    """
+
+    def __init__(self, model_dir: str, quantized: bool = False, batch_size: int = 32,
+                 max_length: int = 256, num_threads: int = 0):
+        from tokenizers import Tokenizer
+
+        model_file = ONNX_INT8_MODEL_FILE if quantized else ONNX_MODEL_FILE
+        model_path = os.path.join(model_dir, model_file)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(
+                f"ONNX model not found at {os.path.abspath(model_path)}. Run export_onnx_embedder.py first."
+            )
+
+        self.model_name = f"{Config.EMBEDDING_MODEL}:onnx{'-int8' if quantized else ''}"
+        self.batch_size = batch_size
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding(pad_id=0, pad_token='[PAD]')
+
+        self.model_path = model_path
+        self.num_threads = num_threads
+        self._session = None
+        self._session_pid = None
+        self._inherited_sessions = []  # Sessions from a parent process: never used, never torn down here
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """This process's InferenceSession, created on first use after start-up or fork."""
+        if self._session_pid != os.getpid():
+            with self._session_lock:
+                if self._session_pid != os.getpid():
+                    import onnxruntime as ort
+
+                    if self._session is not None:
+                        # Freeing it would join thread-pool threads that don't exist in this process
+                        self._inherited_sessions.append(self._session)
+                    options = ort.SessionOptions()
+                    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+                    if self.num_threads:
+                        options.intra_op_num_threads = self.num_threads
+                    self._session = ort.InferenceSession(self.model_path, options, providers=['CPUExecutionProvider'])
+                    self.input_names = {inp.name for inp in self._session.get_inputs()}
+                    self._session_pid = os.getpid()
+        return self._session
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(list(texts))
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        session = self.session
+        feed = {'input_ids': input_ids, 'attention_mask': attention_mask}
+        if 'token_type_ids' in self.input_names:
+            feed['token_type_ids'] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        token_embeddings = session.run(None, feed)[0]
+
+        # Mean pooling over real tokens, then L2 normalisation (same as the sentence-transformers pipeline)
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return pooled / np.clip(norms, 1e-12, None)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for i in range(0, len(texts), self.batch_size):
+            vectors.extend(self._encode_batch(texts[i:i + self.batch_size]).tolist())
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode_batch([text])[0].tolist()
+
+
+def load_embeddings(backend: str = None):
+    """Builds the embedding function for the configured backend."""
+    backend = (backend or Config.EMBEDDING_BACKEND).lower()
+    if backend == 'onnx':
+        return OnnxEmbeddings(Config.ONNX_MODEL_DIR, quantized=Config.ONNX_QUANTIZED)
+    if backend == 'onnx-int8':
+        return OnnxEmbeddings(Config.ONNX_MODEL_DIR, quantized=True)
+    if backend == 'huggingface':
+        # Imported lazily so the ONNX path never pulls in PyTorch
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(
+            model_name=Config.EMBEDDING_MODEL,
+            model_kwargs={'device': 'cpu'}
+        )
+    raise ValueError(f"Unknown embedding backend '{backend}'. Use 'huggingface', 'onnx' or 'onnx-int8'.")
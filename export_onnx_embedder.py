@@ -0,0 +1,113 @@
+# export_onnx_embedder.py
+# One-off export of all-MiniLM-L6-v2 to ONNX (plus an int8 dynamic-quantized copy)
+# for the "onnx" embedding backend. Needs torch/transformers only at export time.
+#
+# Example:
+#   python export_onnx_embedder.py --quantize
+#   python export_onnx_embedder.py --check-only        # Re-check an existing export (also tests/test_onnx_embedder.py)
+#   set EMBEDDING_BACKEND=onnx (and ONNX_QUANTIZED=true for the int8 model)
+
+import argparse
+import os
+
+import numpy as np
+
+from config import Config
+from embedding_backends import ONNX_INT8_MODEL_FILE, ONNX_MODEL_FILE, TOKENIZER_FILE, OnnxEmbeddings
+
+FP32_TOLERANCE = 0.001  # Allowed 1 - cosine vs the PyTorch model
+INT8_TOLERANCE = 0.02
+
+SAMPLE_SENTENCES = [
+    "health benefits of finger millet millet for bones",
+    "Pearl millet is rich in iron and helps prevent anemia.",
+    "Foxtail millet has a low glycemic index suitable for diabetes management.",
+    "millets for weight, digestive health benefits nutritional composition",
+]
+
+
+def export(output_dir, opset):
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    hub_name = f"sentence-transformers/{Config.EMBEDDING_MODEL}"
+    print(f"Loading {hub_name}...")
+    tokenizer = AutoTokenizer.from_pretrained(hub_name)
+    model = AutoModel.from_pretrained(hub_name)
+    model.eval()
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer.save_pretrained(output_dir)  # Writes tokenizer.json for the fast tokenizer
+    if not os.path.exists(os.path.join(output_dir, TOKENIZER_FILE)):
+        raise RuntimeError("Tokenizer export did not produce tokenizer.json")
+
+    dummy = tokenizer(SAMPLE_SENTENCES[:2], padding=True, return_tensors='pt')
+    model_path = os.path.join(output_dir, ONNX_MODEL_FILE)
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in dummy.keys()}
+    dynamic_axes['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(dummy[name] for name in dummy.keys()),
+            model_path,
+            input_names=list(dummy.keys()),
+            output_names=['last_hidden_state'],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+        )
+    print(f"Exported ONNX model to {os.path.abspath(model_path)}")
+    return model_path
+
+
+def quantize(output_dir):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    source = os.path.join(output_dir, ONNX_MODEL_FILE)
+    target = os.path.join(output_dir, ONNX_INT8_MODEL_FILE)
+    quantize_dynamic(source, target, weight_type=QuantType.QInt8)
+    print(f"Wrote int8 dynamic-quantized model to {os.path.abspath(target)}")
+
+
+def min_cosine_vs_reference(output_dir, quantized) -> float:
+    """Worst cosine similarity between the ONNX vectors and sentence-transformers on SAMPLE_SENTENCES."""
+    from sentence_transformers import SentenceTransformer
+
+    reference = SentenceTransformer(Config.EMBEDDING_MODEL, device='cpu').encode(SAMPLE_SENTENCES)
+    reference = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    candidate = np.array(OnnxEmbeddings(output_dir, quantized=quantized).embed_documents(SAMPLE_SENTENCES))
+    return float((reference * candidate).sum(axis=1).min())
+
+
+def check_against_reference(output_dir, quantized, tolerance):
+    """Prints the agreement of an exported model with sentence-transformers; True if within tolerance."""
+    worst = min_cosine_vs_reference(output_dir, quantized)
+    label = 'int8' if quantized else 'fp32'
+    status = 'OK' if worst >= 1 - tolerance else 'OUT OF TOLERANCE'
+    print(f"{label}: min cosine vs sentence-transformers = {worst:.5f} (tolerance {tolerance}) -> {status}")
+    return worst >= 1 - tolerance
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX")
+    parser.add_argument('--output-dir', default=Config.ONNX_MODEL_DIR)
+    parser.add_argument('--opset', type=int, default=14)
+    parser.add_argument('--quantize', action='store_true', help="Also write an int8 dynamic-quantized model")
+    parser.add_argument('--check-only', action='store_true',
+                        help="Skip the export; only compare the models already in --output-dir")
+    parser.add_argument('--tolerance', type=float, default=FP32_TOLERANCE, help="Allowed 1 - cosine for fp32")
+    parser.add_argument('--int8-tolerance', type=float, default=INT8_TOLERANCE, help="Allowed 1 - cosine for int8")
+    args = parser.parse_args()
+
+    if not args.check_only:
+        export(args.output_dir, args.opset)
+    ok = check_against_reference(args.output_dir, False, args.tolerance)
+    if args.quantize and not args.check_only:
+        quantize(args.output_dir)
+    if args.quantize or (args.check_only and os.path.exists(os.path.join(args.output_dir, ONNX_INT8_MODEL_FILE))):
+        ok = check_against_reference(args.output_dir, True, args.int8_tolerance) and ok
+    if not ok:
+        raise SystemExit("Exported model does not match the reference embeddings within tolerance.")
+
+
+if __name__ == "__main__":
+    main()
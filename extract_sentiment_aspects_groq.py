@@ -7,8 +7,11 @@ import json
 from datetime import datetime
 from tqdm import tqdm
 import time
+import argparse
 from dotenv import load_dotenv
 
+from near_duplicates import propagate_to_members
+
 # --- LangChain Imports ---
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
@@ -42,9 +45,14 @@ try:
 
     print(f"DEBUG: Attempting to use Groq model: {GROQ_MODEL}") # Debug print
 
+    from config import Config
+    from http_pool import get_http_client
+
     llm = ChatGroq(
         model=GROQ_MODEL,
-        temperature=0.1
+        temperature=0.1,
+        groq_api_base=Config.GROQ_BASE_URL,
+        http_client=get_http_client()  # Shared keep-alive pool (http_pool.py)
         )
     print(f"Successfully initialized LLM via Groq: {GROQ_MODEL}")
 
@@ -148,6 +156,13 @@ def process_batch(batch_df):
 
 # --- Main Processing Logic (Same as before) ---
 if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Extract sentiment and aspects from reviews with Groq")
+    arg_parser.add_argument('--fast-path', action='store_true',
+                            help="Label confident reviews with the local model (sentiment_classifier.py); only the rest go to the LLM")
+    arg_parser.add_argument('--threshold', type=float, default=None,
+                            help="Minimum local confidence to skip the LLM (default: sentiment_classifier.DEFAULT_THRESHOLD)")
+    args = arg_parser.parse_args()
+
     print("--- Starting Sentiment and Aspect Extraction Script (using Groq) ---")
 
     current_dir = os.getcwd()
@@ -175,10 +190,38 @@ if __name__ == "__main__":
     # df = df.head(10)
     # print(f"Processing a sample of {len(df)} rows...")
 
-    batch_size = 50
     all_results = []
     all_errors = []
+
+    # Near-identical reviews (clean_text.py, near_duplicates.py) are extracted once per cluster
+    cluster_members = None
+    if 'near_duplicate_of' in df.columns:
+        cluster_members = df.loc[df['near_duplicate_of'] != df['review_id'], ['review_id', 'near_duplicate_of']]
+        df = df[df['near_duplicate_of'] == df['review_id']]
+        print(f"Extracting {len(df)} cluster representatives; results are copied to {len(cluster_members)} near-duplicates.")
+
+    if args.fast_path:
+        from sentiment_classifier import SentimentFastPath, MODEL_PATH, DEFAULT_THRESHOLD, eligible
+        threshold = DEFAULT_THRESHOLD if args.threshold is None else args.threshold
+        fast_path = SentimentFastPath.load(MODEL_PATH)
+        candidates = df[eligible(df['clean_review'])]
+        start = time.perf_counter()
+        local_outputs, confidence = fast_path.predict(candidates['clean_review'], candidates.get('sentiment'))
+        elapsed = time.perf_counter() - start
+        local_mask = confidence >= threshold
+        for review_id, output, is_local in zip(candidates['review_id'], local_outputs, local_mask):
+            if is_local:
+                output['review_id'] = review_id
+                output['extraction_source'] = 'local'
+                all_results.append(output)
+        df = df[~df['review_id'].isin(candidates['review_id'][local_mask])]
+        rate = len(candidates) / elapsed if elapsed > 0 else float('inf')
+        print(f"Fast path: {int(local_mask.sum())}/{len(candidates)} reviews labelled locally "
+              f"({rate:.0f} reviews/s, threshold {threshold}); {len(df)} rows left for the LLM.")
+
+    batch_size = 50
     stop_processing = False # Flag to stop if model is wrong
+    llm_rows_sent = 0 # Rows handed to process_batch that make a Groq call (for the fast-path summary)
 
     print(f"Processing reviews in batches of {batch_size}...")
     for i in range(0, len(df), batch_size):
@@ -188,6 +231,10 @@ if __name__ == "__main__":
         batch = df.iloc[i : i + batch_size]
         print(f"\nProcessing batch {i//batch_size + 1}/{(len(df)-1)//batch_size + 1}...")
         batch_results, batch_errors = process_batch(batch)
+        if args.fast_path:
+            llm_rows_sent += int(eligible(batch['clean_review']).sum())  # process_batch skips the rest
+            for output in batch_results:
+                output['extraction_source'] = 'llm'
         all_results.extend(batch_results)
         all_errors.extend(batch_errors)
 
@@ -200,6 +247,12 @@ if __name__ == "__main__":
 
     print("\n--- Processing Complete ---")
 
+    if cluster_members is not None and len(cluster_members):
+        # Members share the representative's millet type and are near-identical to it
+        propagated = propagate_to_members(all_results, cluster_members)
+        all_results.extend(propagated)
+        print(f"Copied results to {len(propagated)} near-duplicate reviews.")
+
     # (Saving results and errors logic remains the same)
     results_df = pd.DataFrame(all_results)
     errors_df = pd.DataFrame(all_errors)
@@ -224,4 +277,8 @@ if __name__ == "__main__":
         except Exception as save_error_err:
              print(f"Error saving error log CSV: {save_error_err}")
     else:
-        print("\nNo errors encountered during processing.")
\ No newline at end of file
+        print("\nNo errors encountered during processing.")
+
+    if args.fast_path:
+        local_count = sum(1 for output in all_results if output.get('extraction_source') == 'local')
+        print(f"\nFast path saved {local_count} LLM calls ({llm_rows_sent} reviews still went to Groq).")
\ No newline at end of file
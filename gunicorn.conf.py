@@ -0,0 +1,39 @@
+# gunicorn.conf.py
+# Multi-worker serving with copy-on-write sharing of the read-only artifacts.
+# With preload the master imports app.py once (embedding model weights, review DataFrame,
+# mmap'd hybrid index, summary store) and forks the workers, which share those pages
+# instead of each loading its own copy. Per-process handles are reopened after fork.
+#
+# Example:
+#   gunicorn app:app -c gunicorn.conf.py
+#   python worker_memory_report.py --pidfile gunicorn.pid
+
+import gc
+import sys
+
+from config import Config
+
+# The config file is read before the app is preloaded: keep the collector from running (and
+# dirtying shared pages) until the workers are forked; post_fork re-enables it per worker
+gc.disable()
+
+bind = "0.0.0.0:8000"
+workers = Config.WEB_WORKERS
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = Config.WEB_PRELOAD
+pidfile = "gunicorn.pid"
+timeout = int(Config.REQUEST_DEADLINE_SECONDS) + 10  # Above the request deadline so slow LLM calls aren't killed
+
+
+def pre_fork(server, worker):
+    # Move everything allocated so far into the permanent generation: the workers' collections
+    # then never write to these objects' GC headers, which would copy their pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    gc.enable()
+    app_module = sys.modules.get('app')
+    if app_module is not None:  # Only present in the worker when the app was preloaded
+        app_module.rag_engine.reopen_after_fork()
+        server.log.info(f"Worker {worker.pid}: reopened vector store and LLM pool after fork")
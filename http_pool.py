@@ -0,0 +1,154 @@
+# http_pool.py
+# One shared, pooled httpx client for every Groq client in the process.
+# Keep-alive connections (and HTTP/2 when the 'h2' package is installed) are reused across
+# requests and threads, so concurrent LLM calls don't each pay a TCP + TLS handshake.
+# A thin transport wrapper keeps utilization metrics (in flight, peak, errors, latency).
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from config import Config
+
+DEFAULT_GROQ_BASE_URL = "https://api.groq.com"
+
+try:
+    import h2  # noqa: F401  (httpx needs it for http2=True)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class MeteredTransport(httpx.BaseTransport):
+    """Delegates to the pooled transport and counts what passes through it."""
+
+    def __init__(self, transport: httpx.HTTPTransport):
+        self._transport = transport
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=200)
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.status_counts = {}
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        start = time.monotonic()
+        try:
+            response = self._transport.handle_request(request)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self._latencies.append(time.monotonic() - start)
+        with self._lock:
+            key = str(response.status_code)
+            self.status_counts[key] = self.status_counts.get(key, 0) + 1
+        return response
+
+    def close(self):
+        self._transport.close()
+
+    def connection_counts(self) -> dict:
+        """Open / idle connections in the pool (reads httpcore's pool; empty if unavailable)."""
+        try:
+            connections = list(self._transport._pool.connections)
+        except AttributeError:
+            return {}
+        idle = sum(1 for c in connections if c.is_idle())
+        return {'open_connections': len(connections), 'idle_connections': idle}
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            stats = {
+                'requests': self.requests,
+                'errors': self.errors,
+                'in_flight': self.in_flight,
+                'peak_in_flight': self.peak_in_flight,
+                'status_counts': dict(self.status_counts),
+                'mean_latency_seconds': round(sum(latencies) / len(latencies), 4) if latencies else 0.0,
+                'max_latency_seconds': round(latencies[-1], 4) if latencies else 0.0,
+            }
+        stats.update(self.connection_counts())
+        return stats
+
+
+_client = None
+_transport = None
+_client_lock = threading.Lock()
+
+
+def groq_base_url() -> str:
+    return (Config.GROQ_BASE_URL or DEFAULT_GROQ_BASE_URL).rstrip('/')
+
+
+def get_http_client() -> httpx.Client:
+    """The process-wide client; created on first use with the Config.GROQ_POOL_* limits."""
+    global _client, _transport
+    with _client_lock:
+        if _client is None:
+            limits = httpx.Limits(
+                max_connections=Config.GROQ_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=Config.GROQ_POOL_MAX_KEEPALIVE,
+                keepalive_expiry=Config.GROQ_POOL_KEEPALIVE_SECONDS,
+            )
+            pooled = httpx.HTTPTransport(limits=limits, http2=Config.GROQ_HTTP2 and HTTP2_AVAILABLE)
+            _transport = MeteredTransport(pooled)
+            _client = httpx.Client(transport=_transport, timeout=Config.LLM_TIMEOUT_SECONDS)
+        return _client
+
+
+def reset_http_client():
+    """Drops the client (e.g. in a freshly forked worker, whose inherited sockets belong to the parent)."""
+    global _client, _transport
+    with _client_lock:
+        _client, _transport = None, None  # Not closed: the parent still owns those connections
+
+
+def warm_up(connections: int = None) -> int:
+    """
+    Opens up to `connections` pooled connections to the Groq API ahead of the first request.
+    Any HTTP response counts (an auth error still leaves a warm TLS connection); returns
+    how many succeeded.
+    """
+    connections = Config.GROQ_POOL_WARM_CONNECTIONS if connections is None else connections
+    if connections <= 0:
+        return 0
+    client = get_http_client()
+    url = f"{groq_base_url()}/openai/v1/models"
+    headers = {'Authorization': f"Bearer {Config.GROQ_API_KEY or ''}"}
+
+    def probe(_):
+        try:
+            client.get(url, headers=headers)
+            return True
+        except httpx.HTTPError as e:
+            print(f"Warning: Groq connection warm-up failed: {e}")
+            return False
+
+    with ThreadPoolExecutor(max_workers=connections) as pool:
+        return sum(pool.map(probe, range(connections)))
+
+
+def pool_snapshot() -> dict:
+    transport = _transport
+    stats = {
+        'base_url': groq_base_url(),
+        'http2': Config.GROQ_HTTP2 and HTTP2_AVAILABLE,
+        'max_connections': Config.GROQ_POOL_MAX_CONNECTIONS,
+        'max_keepalive_connections': Config.GROQ_POOL_MAX_KEEPALIVE,
+    }
+    if transport is not None:
+        stats.update(transport.snapshot())
+    return stats
@@ -0,0 +1,216 @@
+# hybrid_retriever.py
+# Hybrid lexical + dense retrieval over the same chunks as the Chroma store.
+# A BM25 index picks a small candidate set (exact nutrient/disease terms matter for our
+# short templated queries), then only those candidates are scored with dense similarity,
+# either re-ranked purely by cosine or fused with reciprocal-rank fusion (RRF).
+#
+# The index is built by setup_rag_vectorstore.py from the finished Chroma collection and
+# saved next to it: bm25_index.json (texts, metadata, postings) + chunk_embeddings.npy.
+# Each build goes into its own directory under builds/, and the CURRENT file names the live
+# one. A rebuild writes a fresh directory and then swaps CURRENT atomically, so running
+# workers keep their mmap of the old embeddings and a reader never pairs a JSON from one
+# build with embeddings from another.
+
+import json
+import math
+import os
+import re
+import shutil
+import time
+import uuid
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+BM25_FILE = 'bm25_index.json'
+EMBEDDINGS_FILE = 'chunk_embeddings.npy'
+CURRENT_FILE = 'CURRENT'  # Name of the live build directory
+BUILDS_DIR = 'builds'
+INDEX_FORMAT_VERSION = 1
+
+RRF_K = 60  # Standard RRF damping constant
+
+_STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'have', 'in', 'is', 'it',
+    'its', 'of', 'on', 'or', 'that', 'the', 'this', 'to', 'was', 'were', 'with', 'what', 'which',
+    'health', 'benefits', 'millet', 'millets',  # Present in every templated query, no signal
+}
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in re.findall(r"[a-z0-9]+", (text or '').lower()) if len(t) > 1 and t not in _STOPWORDS]
+
+
+class BM25Index:
+    """Minimal Okapi BM25 with an inverted index."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_lens: List[int] = []
+        self.postings: Dict[str, List[List[int]]] = {}
+        self.idf: Dict[str, float] = {}
+        self.avg_doc_len = 0.0
+
+    def build(self, texts: List[str]) -> 'BM25Index':
+        postings = defaultdict(list)
+        self.doc_lens = []
+        for doc_idx, text in enumerate(texts):
+            tokens = tokenize(text)
+            self.doc_lens.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                postings[term].append([doc_idx, tf])
+        self.postings = dict(postings)
+        self._finalize()
+        return self
+
+    def _finalize(self):
+        n_docs = len(self.doc_lens)
+        self.avg_doc_len = (sum(self.doc_lens) / n_docs) if n_docs else 0.0
+        self.idf = {
+            term: math.log(1 + (n_docs - len(plist) + 0.5) / (len(plist) + 0.5))
+            for term, plist in self.postings.items()
+        }
+
+    def search(self, query: str, top_n: int, allowed: Optional[set] = None) -> List[tuple]:
+        """Returns up to top_n (doc_idx, score) pairs, best first."""
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_idx, tf in self.postings[term]:
+                if allowed is not None and doc_idx not in allowed:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lens[doc_idx] / (self.avg_doc_len or 1))
+                scores[doc_idx] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda x: x[1], reverse=True)[:top_n]
+
+    def to_dict(self) -> dict:
+        return {'k1': self.k1, 'b': self.b, 'doc_lens': self.doc_lens, 'postings': self.postings}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'BM25Index':
+        index = cls(k1=data['k1'], b=data['b'])
+        index.doc_lens = data['doc_lens']
+        index.postings = data['postings']
+        index._finalize()
+        return index
+
+
+def build_hybrid_index(vectorstore, index_dir: str) -> int:
+    """
+    Snapshots the whole Chroma collection (after a full or incremental ingest) into the
+    BM25 index and an aligned, L2-normalised embedding matrix. Returns the chunk count.
+    """
+    data = vectorstore.get(include=['documents', 'metadatas', 'embeddings'])
+    texts = data['documents']
+    embeddings = np.asarray(data['embeddings'], dtype=np.float32)
+    if len(embeddings):
+        embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+
+    payload = {
+        'format_version': INDEX_FORMAT_VERSION,
+        'ids': data['ids'],
+        'texts': texts,
+        'metadatas': data['metadatas'],
+        'bm25': BM25Index().build(texts).to_dict(),
+    }
+    # Never touch files a live worker may have mmap'd: write a new build, then swap the pointer
+    previous = _current_build(index_dir)
+    build = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    build_dir = os.path.join(index_dir, BUILDS_DIR, build)
+    os.makedirs(build_dir)
+    with open(os.path.join(build_dir, BM25_FILE), 'w', encoding='utf-8') as f:
+        json.dump(payload, f)
+    with open(os.path.join(build_dir, EMBEDDINGS_FILE), 'wb') as f:
+        np.save(f, embeddings)
+
+    tmp_path = os.path.join(index_dir, CURRENT_FILE + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(build)
+    os.replace(tmp_path, os.path.join(index_dir, CURRENT_FILE))
+    _prune_builds(index_dir, keep={build, previous})
+    return len(texts)
+
+
+def _current_build(index_dir: str) -> Optional[str]:
+    try:
+        with open(os.path.join(index_dir, CURRENT_FILE), 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _prune_builds(index_dir: str, keep: set):
+    """Removes older builds. Workers that still map one keep their pages (the inode outlives the unlink)."""
+    builds_root = os.path.join(index_dir, BUILDS_DIR)
+    for name in os.listdir(builds_root):
+        if name not in keep:
+            shutil.rmtree(os.path.join(builds_root, name), ignore_errors=True)
+
+
+def current_index_dir(index_dir: str) -> str:
+    """Directory holding the live build's files (index_dir itself for indexes from before versioned builds)."""
+    build = _current_build(index_dir)
+    return os.path.join(index_dir, BUILDS_DIR, build) if build else index_dir
+
+
+class HybridRetriever:
+    """BM25 candidate pre-filter followed by dense re-ranking of only those candidates."""
+
+    def __init__(self, index_dir: str, embedding_function, candidates: int = 50):
+        index_dir = current_index_dir(index_dir)  # Resolved once: both files come from the same build
+        with open(os.path.join(index_dir, BM25_FILE), 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+        if payload.get('format_version') != INDEX_FORMAT_VERSION:
+            raise ValueError("Hybrid index format is out of date; re-run setup_rag_vectorstore.py")
+
+        self.embedding_function = embedding_function
+        self.candidates = candidates
+        self.ids = payload['ids']
+        self.texts = payload['texts']
+        self.metadatas = payload['metadatas']
+        self.bm25 = BM25Index.from_dict(payload['bm25'])
+        self._flag_index: Dict[str, set] = {}  # millet flag -> doc indices, filled lazily
+        # Memory-mapped: read-only pages are shared by every worker process on the box
+        self.embeddings = np.load(os.path.join(index_dir, EMBEDDINGS_FILE), mmap_mode='r')
+
+    def _docs_with_flag(self, flag: str) -> set:
+        if flag not in self._flag_index:
+            self._flag_index[flag] = {i for i, meta in enumerate(self.metadatas) if meta and meta.get(flag)}
+        return self._flag_index[flag]
+
+    def search(self, query: str, k: int = 4, metadata_flag: str = None, fusion: str = 'dense'):
+        """
+        Returns up to k Documents, or None when the query has no lexical match at all
+        (the caller should then fall back to plain dense search).
+        """
+        from langchain_core.documents import Document
+
+        allowed = self._docs_with_flag(metadata_flag) if metadata_flag else None
+        lexical = self.bm25.search(query, self.candidates, allowed)
+        if allowed is not None and len(lexical) < k:
+            # Millet subset too small: top up with the best untagged candidates
+            extra = [hit for hit in self.bm25.search(query, self.candidates) if hit[0] not in allowed]
+            lexical += extra[:self.candidates - len(lexical)]
+        if not lexical:
+            return None
+
+        candidate_idx = np.array([doc_idx for doc_idx, _ in lexical])
+        query_vec = np.asarray(self.embedding_function.embed_query(query), dtype=np.float32)
+        query_vec /= max(float(np.linalg.norm(query_vec)), 1e-12)
+        dense_scores = np.asarray(self.embeddings[candidate_idx]) @ query_vec
+
+        if fusion == 'rrf':
+            dense_rank = {int(candidate_idx[i]): r for r, i in enumerate(np.argsort(-dense_scores))}
+            fused = {
+                doc_idx: 1.0 / (RRF_K + lex_rank + 1) + 1.0 / (RRF_K + dense_rank[doc_idx] + 1)
+                for lex_rank, (doc_idx, _) in enumerate(lexical)
+            }
+            ordered = sorted(fused, key=fused.get, reverse=True)[:k]
+        else:
+            ordered = [int(candidate_idx[i]) for i in np.argsort(-dense_scores)[:k]]
+
+        return [Document(page_content=self.texts[i], metadata=self.metadatas[i] or {}) for i in ordered]
@@ -0,0 +1,92 @@
+# llm_guard.py
+# Request deadlines and a circuit breaker for the Groq calls in MilletRAGEngine.
+# When the upstream is slow or failing, callers skip straight to their fallback templates.
+
+import threading
+import time
+
+
+class LLMUnavailableError(Exception):
+    """Raised instead of calling the LLM when the breaker is open or the deadline is spent."""
+
+
+class Deadline:
+    """Absolute time budget for one API request, shared by every LLM call it makes."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+class CircuitBreaker:
+    """
+    Classic closed -> open -> half-open breaker.
+    Failures and calls slower than slow_call_seconds both count towards the threshold.
+    While open, allow_request() returns False until the cool-down has elapsed; then a
+    single trial call is let through and its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 3, cooldown_seconds: float = 30.0,
+                 slow_call_seconds: float = 5.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.slow_call_seconds = slow_call_seconds
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self.short_circuited = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown_seconds:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown_seconds:
+                self._state = self.HALF_OPEN
+            if self._state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.short_circuited += 1
+            return False
+
+    def record_success(self, duration: float):
+        if duration > self.slow_call_seconds:
+            self.record_failure()
+            return
+        with self._lock:
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive_failures += 1
+            if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def snapshot(self) -> dict:
+        return {
+            'state': self.state,
+            'consecutive_failures': self._consecutive_failures,
+            'short_circuited': self.short_circuited,
+        }
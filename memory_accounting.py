@@ -0,0 +1,278 @@
+# memory_accounting.py
+# Where the memory of a running app goes: per-component sizes for the recommender, the RAG
+# engine (embedding model, Chroma, hybrid index) and every cache, plus tracemalloc's top
+# allocators when tracing is on. Served at /debug/memory; also usable from the command line.
+# BudgetedLRUCache is the cache type used by the app: it evicts least recently used entries
+# to stay under a byte budget, so cache memory is a setting rather than a guess.
+#
+# Example:
+#   python memory_accounting.py --tracemalloc --top 15
+#   python memory_accounting.py --output memory.json
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+
+MIB = 1024 * 1024
+
+
+def deep_sizeof(obj, _seen=None) -> int:
+    """Approximate deep size in bytes of plain Python data (containers, strings, simple objects)."""
+    seen = set() if _seen is None else _seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool, type(None))):
+        return size
+    if isinstance(obj, dict):
+        return size + sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return size + sum(deep_sizeof(item, seen) for item in obj)
+    nbytes = getattr(obj, 'nbytes', None)  # numpy arrays
+    if isinstance(nbytes, int):
+        return size + nbytes
+    if hasattr(obj, '__dict__'):  # e.g. LangChain Documents
+        return size + deep_sizeof(vars(obj), seen)
+    return size
+
+
+class BudgetedLRUCache:
+    """
+    Thread-safe LRU cache bounded by total (approximate) bytes and, optionally, entry count.
+    Values larger than the whole budget are not cached.
+    """
+
+    def __init__(self, name: str, max_bytes: int, max_entries: int = None, sizeof=deep_sizeof):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.sizeof = sizeof
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = self.sizeof(key) + self.sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes or (self.max_entries and len(self._entries) > self.max_entries):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def values(self) -> list:
+        """Most recently used first."""
+        with self._lock:
+            return [value for value, _ in reversed(self._entries.values())]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'budget_bytes': self.max_bytes,
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+def directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                continue
+    return total
+
+
+def dataframe_report(df) -> dict:
+    usage = df.memory_usage(deep=True)
+    return {
+        'rows': len(df),
+        'bytes': int(usage.sum()),
+        'columns': {column: int(size) for column, size in usage.items()},
+    }
+
+
+def embedding_model_report(embeddings) -> dict:
+    """Parameter bytes of the loaded embedding model (PyTorch) or model file size (ONNX)."""
+    report = {'model': getattr(embeddings, 'model_name', type(embeddings).__name__)}
+    client = getattr(embeddings, 'client', None)  # SentenceTransformer behind HuggingFaceEmbeddings
+    if client is not None and hasattr(client, 'parameters'):
+        params = list(client.parameters())
+        report['parameters'] = sum(p.numel() for p in params)
+        report['bytes'] = sum(p.numel() * p.element_size() for p in params)
+    model_path = getattr(embeddings, 'model_path', None)  # OnnxEmbeddings
+    if model_path and os.path.exists(model_path):
+        report['bytes'] = os.path.getsize(model_path)
+    return report
+
+
+def recommender_report(recommender) -> dict:
+    return {
+        'reviews_dataframe': dataframe_report(recommender.df),
+        'keyword_masks_bytes': int(recommender.keyword_masks.memory_usage(deep=True).sum()),
+        'concern_matrix_bytes': int(recommender.mention_pct.nbytes + recommender.rating_bonus.nbytes
+                                    + (0 if recommender.relevance_pct is None else recommender.relevance_pct.nbytes)),
+    }
+
+
+def rag_engine_report(rag_engine, vector_db_path: str) -> dict:
+    report = {
+        'embedding_model': embedding_model_report(rag_engine.embeddings),
+        'chroma': {'path': vector_db_path, 'disk_bytes': directory_size(vector_db_path)},
+        'prompt_stats_bytes': deep_sizeof(list(rag_engine.prompt_stats)),
+    }
+    try:
+        report['chroma']['chunks'] = rag_engine.vector_store._collection.count()
+    except Exception:
+        pass
+    hybrid = rag_engine.hybrid_retriever
+    if hybrid is not None:
+        report['hybrid_index'] = {
+            'chunks': len(hybrid.ids),
+            'embedding_matrix_bytes': int(hybrid.embeddings.nbytes),  # mmap'd: page cache, shared
+            'texts_and_metadata_bytes': deep_sizeof(hybrid.texts) + deep_sizeof(hybrid.metadatas),
+            'bm25_bytes': deep_sizeof(vars(hybrid.bm25)),
+        }
+    return report
+
+
+def tracemalloc_top(limit: int = 10) -> dict:
+    if not tracemalloc.is_tracing():
+        return {'enabled': False, 'hint': "Set TRACEMALLOC=true (or PYTHONTRACEMALLOC=1) to trace allocations"}
+    snapshot = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ])
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        'enabled': True,
+        'traced_bytes': current,
+        'peak_traced_bytes': peak,
+        'top': [
+            {'location': str(stat.traceback[0]), 'bytes': stat.size, 'blocks': stat.count}
+            for stat in snapshot.statistics('lineno')[:limit]
+        ],
+    }
+
+
+def process_rss_bytes() -> int:
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def memory_report(recommender=None, rag_engine=None, caches: dict = None, top: int = 10) -> dict:
+    from config import Config
+
+    report = {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'process_rss_bytes': process_rss_bytes()}
+    if recommender is not None:
+        report['recommender'] = recommender_report(recommender)
+    if rag_engine is not None:
+        report['rag_engine'] = rag_engine_report(rag_engine, Config.VECTOR_DB_PATH)
+    report['caches'] = {name: (cache.stats() if isinstance(cache, BudgetedLRUCache) else cache)
+                        for name, cache in (caches or {}).items()}
+    report['tracemalloc'] = tracemalloc_top(top)
+    return report
+
+
+def print_report(report: dict):
+    def mib(value):
+        return f"{value / MIB:8.2f} MiB"
+
+    print(f"Process RSS: {mib(report['process_rss_bytes'])}")
+    rec = report.get('recommender')
+    if rec:
+        print(f"Review DataFrame ({rec['reviews_dataframe']['rows']} rows): {mib(rec['reviews_dataframe']['bytes'])}")
+        print(f"Keyword masks:    {mib(rec['keyword_masks_bytes'])}")
+    rag = report.get('rag_engine')
+    if rag:
+        model = rag['embedding_model']
+        print(f"Embedding model {model['model']}: {mib(model.get('bytes', 0))}")
+        print(f"Chroma on disk:   {mib(rag['chroma']['disk_bytes'])}")
+        if 'hybrid_index' in rag:
+            hybrid = rag['hybrid_index']
+            print(f"Hybrid index:     {mib(hybrid['embedding_matrix_bytes'])} embeddings (mmap), "
+                  f"{mib(hybrid['texts_and_metadata_bytes'] + hybrid['bm25_bytes'])} texts + BM25")
+    for name, stats in report['caches'].items():
+        if 'budget_bytes' in stats:
+            print(f"Cache {name}: {stats['entries']} entries, {mib(stats['bytes'])} of {mib(stats['budget_bytes'])}")
+        else:
+            print(f"Cache {name}: {stats}")
+    traced = report['tracemalloc']
+    if traced.get('enabled'):
+        print(f"\nTop allocators (traced {mib(traced['traced_bytes'])}, peak {mib(traced['peak_traced_bytes'])}):")
+        for entry in traced['top']:
+            print(f"  {mib(entry['bytes'])}  {entry['location']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-component memory report for the recommender and RAG engine")
+    parser.add_argument('--tracemalloc', action='store_true', help="Trace allocations while the engines load")
+    parser.add_argument('--top', type=int, default=10, help="Number of top allocators to show")
+    parser.add_argument('--no-rag', action='store_true', help="Skip loading the RAG engine")
+    parser.add_argument('--output', help="Also write the report as JSON")
+    args = parser.parse_args()
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    from recommendation_engine import MilletRecommender
+    recommender = MilletRecommender()
+    rag_engine = None
+    if not args.no_rag:
+        from rag_engine import MilletRAGEngine
+        rag_engine = MilletRAGEngine()
+
+    caches = {'evidence': rag_engine.evidence_cache} if rag_engine is not None else {}
+    report = memory_report(recommender, rag_engine, caches, top=args.top)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+# millet_registry.py
+# Single source of truth for millet identity: every alias (regional, botanical, "X millet")
+# maps to a small integer ID, and each ID carries its canonical key, display name and
+# milletamma.com product URL. Lookups are dict hits; the word-boundary fallback for free-form
+# names ("organic ragi flour") is memoised. millet_tags.py and the recommender build on this.
+
+import re
+from functools import lru_cache
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+UNKNOWN_ID = -1
+DEFAULT_PRODUCT_URL = "https://milletamma.com/collections/millet-basket"
+
+
+class Millet(NamedTuple):
+    id: int
+    key: str  # Canonical lower-case name, also used in Chroma metadata flags and prompts
+    display_name: str
+    aliases: List[str]
+    product_url: str
+
+
+# Canonical key -> (display name, aliases, product URL). The order defines the IDs: append only.
+_MILLETS = [
+    ('pearl', 'Pearl Millet', ['pearl', 'bajra', 'bajri', 'cumbu', 'pennisetum glaucum'],
+     'https://milletamma.com/products/bajra-perl-milet-flour-organic-500gm'),
+    ('finger', 'Finger Millet', ['finger', 'ragi', 'nachni', 'mandua', 'eleusine coracana'],
+     'https://milletamma.com/products/ragi-finger-millet-flour-organic-500gm'),
+    ('foxtail', 'Foxtail Millet', ['foxtail', 'kangni', 'kakum', 'navane', 'setaria italica'],
+     'https://milletamma.com/products/foxtail-millet-grains-organic-500gm'),
+    ('barnyard', 'Barnyard Millet', ['barnyard', 'sama', 'sanwa', 'jhangora', 'echinochloa'],
+     'https://milletamma.com/products/barnyard-millet-grains-organic-500gm'),
+    ('little', 'Little Millet', ['little', 'kutki', 'samai', 'panicum sumatrense'],
+     'https://milletamma.com/products/little-millet-flour-organic-500gm'),
+    ('kodo', 'Kodo Millet', ['kodo', 'kodra', 'varagu', 'paspalum scrobiculatum'],
+     'https://milletamma.com/products/kodo-millet-grains-organic-500gm'),
+    ('proso', 'Proso Millet', ['proso', 'chena', 'cheena', 'panicum miliaceum'],
+     'https://milletamma.com/products/proso-millet-organic-500gm'),  # proso millet flour
+    ('sorghum', 'Sorghum', ['sorghum', 'jowar', 'jola', 'cholam'],
+     'https://milletamma.com/products/jowar-millet-grain-organic-500gm'),
+]
+
+# Regional names that link to a different product than their millet's default
+_ALIAS_PRODUCT_URLS = {
+    'bajra': 'https://milletamma.com/products/bajra-methi-khakhra-180gm',
+    'ragi': 'https://milletamma.com/products/ragi-grains-finger-millet-organic-500gm',
+    'jowar': 'https://milletamma.com/products/jowar-sorghum-flour-organic-500gm',
+    'kangni': 'https://milletamma.com/products/foxtail-millet-organic-500gm',
+    'kutki': 'https://milletamma.com/products/little-millet-organic-500gm',
+    'sama': 'https://milletamma.com/products/barnyard-millet-organic-500gm',
+    'chena': 'https://milletamma.com/products/proso-millet-organic-500gm',
+}
+
+
+def _normalize(name: str) -> str:
+    return ' '.join(str(name).lower().split())
+
+
+class MilletRegistry:
+    def __init__(self, millets, alias_product_urls: dict):
+        self.millets = [Millet(i, key, display, aliases, url) for i, (key, display, aliases, url) in enumerate(millets)]
+        self.alias_product_urls = alias_product_urls
+        self._id_by_alias = {}
+        for millet in self.millets:
+            for alias in [millet.key, _normalize(millet.display_name)] + millet.aliases:
+                for form in (alias, f"{alias} millet", f"{alias} millets"):
+                    self._id_by_alias.setdefault(form, millet.id)
+        # Longest aliases first so "pennisetum glaucum" wins over shorter partial hits
+        self._partial_patterns = [
+            (re.compile(rf"\b{re.escape(alias)}\b"), millet_id)
+            for alias, millet_id in sorted(self._id_by_alias.items(), key=lambda item: -len(item[0]))
+        ]
+
+    def __len__(self):
+        return len(self.millets)
+
+    def id_for(self, name) -> int:
+        """'Finger Millet', 'ragi', 'jowar', 'organic ragi flour' ... -> ID, or UNKNOWN_ID."""
+        if name is None or (isinstance(name, float) and name != name):  # None / NaN
+            return UNKNOWN_ID
+        normalized = _normalize(name)
+        millet_id = self._id_by_alias.get(normalized)
+        return millet_id if millet_id is not None else self._partial_id(normalized)
+
+    @lru_cache(maxsize=1024)
+    def _partial_id(self, normalized: str) -> int:
+        for pattern, millet_id in self._partial_patterns:
+            if pattern.search(normalized):
+                return millet_id
+        return UNKNOWN_ID
+
+    def get(self, millet_id: int) -> Optional[Millet]:
+        return self.millets[millet_id] if 0 <= millet_id < len(self.millets) else None
+
+    def key(self, millet_id: int) -> Optional[str]:
+        millet = self.get(millet_id)
+        return millet.key if millet else None
+
+    def short_name(self, millet_id: int, fallback: str) -> str:
+        """Canonical key for prompts, retrieval and store keys; unknown millets keep their own name."""
+        return self.key(millet_id) or _normalize(fallback).replace(' millet', '')
+
+    def display_name(self, millet_id: int, fallback: str = '') -> str:
+        millet = self.get(millet_id)
+        return millet.display_name if millet else fallback
+
+    def product_url(self, name_or_id) -> str:
+        """milletamma.com product page; regional names keep their specific product."""
+        if isinstance(name_or_id, (int, np.integer)):
+            millet = self.get(int(name_or_id))
+        else:
+            normalized = _normalize(name_or_id).replace(' millet', '').strip()
+            if normalized in self.alias_product_urls:
+                return self.alias_product_urls[normalized]
+            millet = self.get(self.id_for(name_or_id))
+        return millet.product_url if millet else DEFAULT_PRODUCT_URL
+
+    def ids_for(self, names) -> np.ndarray:
+        """id_for over many names (e.g. the categories of a column), as an ID array."""
+        return np.array([self.id_for(name) for name in names], dtype=np.int16)
+
+
+registry = MilletRegistry(_MILLETS, _ALIAS_PRODUCT_URLS)
+
+# Canonical key -> aliases, as used for tagging PDF chunks (millet_tags.py)
+MILLET_ALIASES = {millet.key: millet.aliases for millet in registry.millets}
+
+
+def encode_millet_column(df, column: str = 'millet_type'):
+    """
+    Converts df[column] in place to a categorical (categories in order of first appearance)
+    and returns (row codes, registry ID per category). Code -1 marks missing values.
+    """
+    categories = df[column].dropna().unique()
+    df[column] = df[column].astype(pd.CategoricalDtype(categories=categories))
+    codes = df[column].cat.codes.to_numpy()
+    return codes, registry.ids_for(categories)
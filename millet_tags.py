@@ -0,0 +1,52 @@
+# millet_tags.py
+# Tags PDF chunks with the millets they discuss (at ingestion) and turns a requested millet
+# into a metadata pre-filter (at query time). Names and aliases come from millet_registry.py.
+
+import re
+from typing import List, Optional
+
+from millet_registry import MILLET_ALIASES, registry
+
+# Bump when the tagging rules change so incremental ingestion re-tags every chunk
+TAGGER_VERSION = 1
+
+# Plain English words only count as a millet mention when followed by "millet"
+_AMBIGUOUS_WORDS = {'pearl', 'finger', 'little', 'barnyard'}
+
+
+def _alias_pattern(alias: str) -> str:
+    if alias in _AMBIGUOUS_WORDS:
+        return rf"\b{re.escape(alias)}[\s-]+millets?\b"
+    return rf"\b{re.escape(alias)}\b"
+
+
+_TEXT_PATTERNS = {
+    canonical: re.compile('|'.join(_alias_pattern(alias) for alias in aliases), re.IGNORECASE)
+    for canonical, aliases in MILLET_ALIASES.items()
+}
+
+
+def metadata_key(canonical: str) -> str:
+    """Chroma metadata flag for a canonical millet (lists aren't valid metadata values)."""
+    return f"millet_{canonical}"
+
+
+def canonical_millet(name: str) -> Optional[str]:
+    """Maps 'Finger Millet', 'ragi', 'jowar' ... to a canonical name, or None if unknown."""
+    if not name:
+        return None
+    return registry.key(registry.id_for(name))
+
+
+def tag_millets(text: str) -> List[str]:
+    """Canonical millets mentioned in a chunk of text."""
+    return [canonical for canonical, pattern in _TEXT_PATTERNS.items() if pattern.search(text or '')]
+
+
+def add_millet_tags(metadata: dict, text: str) -> dict:
+    """Adds millet_<name>=True flags plus a readable 'millets' string to chunk metadata."""
+    millets = tag_millets(text)
+    for canonical in millets:
+        metadata[metadata_key(canonical)] = True
+    metadata['millets'] = ','.join(millets)
+    return metadata
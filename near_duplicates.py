@@ -0,0 +1,224 @@
+# near_duplicates.py
+# Near-duplicate review detection with MinHash + LSH, all in numpy.
+# Each review becomes a set of character shingles. MinHash signatures estimate the Jaccard
+# similarity of those sets, and LSH banding only proposes pairs that share a whole band of the
+# signature, so the work grows with the number of reviews and not with the number of pairs.
+# Candidate pairs are checked against the signature (estimated Jaccard >= threshold). Each review
+# then joins the earliest representative it is itself near-identical to; there is no transitive
+# merging, so a chain of small edits can't pull unrelated reviews into one cluster. Reviews only
+# cluster within their group (clean_text.py passes millet_type). clean_text.py stores the result
+# and extract_sentiment_aspects_groq.py extracts once per cluster (see propagate_to_members).
+#
+# Example (synthetic templated reviews, timing only):
+#   python near_duplicates.py --benchmark 1000000
+
+import argparse
+import time
+
+import numpy as np
+
+MERSENNE_PRIME = (1 << 31) - 1  # a * x + b stays below 2**62, so uint64 arithmetic is exact
+SHINGLE_BASE = 257
+NUM_PERM = 128
+BANDS = 16  # 16 bands x 8 rows: pairs above ~0.7 Jaccard almost always collide in some band
+SHINGLE_SIZE = 5
+THRESHOLD = 0.8
+CHUNK_DOCS = 50_000  # Signatures are computed in blocks of this many reviews to bound memory
+
+
+def _shingle_hashes(texts, k: int):
+    """
+    Polynomial hashes of every k-character window of every text, computed on one concatenated
+    byte array. Returns (hashes, starts): hashes of text i are hashes[starts[i]:starts[i + 1]].
+    Texts shorter than k are padded with spaces, so every text has at least one shingle.
+    """
+    encoded = [text.encode('utf-8').ljust(k) for text in texts]
+    lengths = np.fromiter((len(b) for b in encoded), dtype=np.int64, count=len(encoded))
+    data = np.frombuffer(b''.join(encoded), dtype=np.uint8).astype(np.int64)
+
+    windows = len(data) - k + 1
+    hashes = np.zeros(max(windows, 0), dtype=np.int64)
+    for offset in range(k):
+        hashes = (hashes * SHINGLE_BASE + data[offset:offset + windows]) % MERSENNE_PRIME
+
+    # Keep only windows that start and end inside one text
+    text_starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    window_counts = lengths - k + 1
+    keep = np.repeat(text_starts, window_counts) + _ranges(window_counts)
+    starts = np.concatenate(([0], np.cumsum(window_counts)))
+    return hashes[keep].astype(np.uint64), starts
+
+
+def _ranges(counts: np.ndarray) -> np.ndarray:
+    """[0..counts[0]), [0..counts[1]), ... concatenated."""
+    ends = np.cumsum(counts)
+    return np.arange(ends[-1] if len(ends) else 0) - np.repeat(ends - counts, counts)
+
+
+def _mod_mersenne(x: np.ndarray) -> np.ndarray:
+    """x % MERSENNE_PRIME for x < 2**62 without a division (shift-and-add)."""
+    x = (x & np.uint64(MERSENNE_PRIME)) + (x >> np.uint64(31))
+    x = (x & np.uint64(MERSENNE_PRIME)) + (x >> np.uint64(31))
+    return np.where(x >= np.uint64(MERSENNE_PRIME), x - np.uint64(MERSENNE_PRIME), x)
+
+
+def _permutations(num_perm: int, seed: int):
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+    return a, b
+
+
+def minhash_signatures(texts, num_perm: int = NUM_PERM, shingle_size: int = SHINGLE_SIZE,
+                       seed: int = 1) -> np.ndarray:
+    """(len(texts) x num_perm) uint32 MinHash signatures of the texts' character shingles."""
+    texts = list(texts)
+    a, b = _permutations(num_perm, seed)
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint32)
+    for chunk_start in range(0, len(texts), CHUNK_DOCS):
+        chunk = texts[chunk_start:chunk_start + CHUNK_DOCS]
+        hashes, starts = _shingle_hashes(chunk, shingle_size)
+        for perm in range(num_perm):
+            permuted = _mod_mersenne(a[perm] * hashes + b[perm])
+            signatures[chunk_start:chunk_start + len(chunk), perm] = np.minimum.reduceat(permuted, starts[:-1])
+    return signatures
+
+
+def candidate_pairs(signatures: np.ndarray, bands: int = BANDS, seed: int = 2, groups=None) -> np.ndarray:
+    """
+    (pairs x 2) array of (first member, other member) for every LSH bucket with more than one
+    review, over all bands. Buckets are found by hashing each band to 64 bits and sorting.
+    With groups (an integer code per row), a bucket only holds rows of one group.
+    """
+    n, num_perm = signatures.shape
+    groups = np.zeros(n, dtype=np.int64) if groups is None else np.asarray(groups, dtype=np.int64)
+    if num_perm % bands:
+        raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+    rows = num_perm // bands
+    multipliers = np.random.default_rng(seed).integers(1, 1 << 63, size=rows, dtype=np.uint64) | np.uint64(1)
+    pairs = []
+    with np.errstate(over='ignore'):  # Band hashes wrap around modulo 2**64 on purpose
+        for band in range(bands):
+            block = signatures[:, band * rows:(band + 1) * rows].astype(np.uint64)
+            keys = (block * multipliers).sum(axis=1, dtype=np.uint64)
+            order = np.lexsort((keys, groups))  # Stable: the first member is the lowest position
+            sorted_keys, sorted_groups = keys[order], groups[order]
+            new_group = np.concatenate(([True], (sorted_keys[1:] != sorted_keys[:-1])
+                                        | (sorted_groups[1:] != sorted_groups[:-1])))
+            group_first = order[np.flatnonzero(new_group)][np.cumsum(new_group) - 1]
+            duplicate = ~new_group
+            if duplicate.any():
+                pairs.append(np.column_stack((group_first[duplicate], order[duplicate])))
+    if not pairs:
+        return np.empty((0, 2), dtype=np.int64)
+    # The same pair usually collides in several bands; dedupe on a single int64 key
+    pairs = np.concatenate(pairs).astype(np.int64)
+    unique_keys = np.unique(pairs[:, 0] * n + pairs[:, 1])
+    return np.column_stack((unique_keys // n, unique_keys % n))
+
+
+def find_near_duplicates(texts, threshold: float = THRESHOLD, num_perm: int = NUM_PERM, bands: int = BANDS,
+                         shingle_size: int = SHINGLE_SIZE, groups=None) -> np.ndarray:
+    """
+    Position of each text's cluster representative (its own position for representatives and
+    singletons). Every member is near-identical to its representative (estimated Jaccard >=
+    threshold). With groups (one key per text, e.g. millet type), texts only cluster within their
+    group. Empty / missing texts are never clustered.
+    """
+    texts = ['' if text is None or text != text else str(text) for text in texts]  # None / NaN
+    groups = [None] * len(texts) if groups is None else list(groups)
+    if len(groups) != len(texts):
+        raise ValueError("groups must have one entry per text")
+    representatives = np.arange(len(texts), dtype=np.int64)
+
+    # Exact duplicates share one signature: only the first occurrence of each text is hashed
+    first_seen = {}
+    for position, (text, group) in enumerate(zip(texts, groups)):
+        if text.strip():
+            representatives[position] = first_seen.setdefault((group, text), position)
+    present = np.fromiter(first_seen.values(), dtype=np.int64, count=len(first_seen))
+    if len(present) < 2:
+        return representatives
+
+    signatures = minhash_signatures([texts[i] for i in present], num_perm, shingle_size)
+    group_codes = {}
+    codes = np.array([group_codes.setdefault(groups[i], len(group_codes)) for i in present], dtype=np.int64)
+    pairs = candidate_pairs(signatures, bands, groups=codes)
+    if len(pairs):
+        # Drop band collisions whose signatures don't agree enough (estimated Jaccard)
+        agreement = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+        pairs = pairs[agreement >= threshold]
+
+    # Greedy leader assignment, in position order: a review joins the earliest similar review that
+    # is still a representative, else it becomes one. Pairs are (earlier, later) unique positions.
+    leader_of = np.arange(len(present), dtype=np.int64)
+    is_leader = np.ones(len(present), dtype=bool)
+    order = np.lexsort((pairs[:, 0], pairs[:, 1]))
+    for earlier, later in pairs[order].tolist():
+        if is_leader[earlier] and leader_of[later] == later:
+            leader_of[later] = earlier
+            is_leader[later] = False
+
+    # Exact duplicates follow their first occurrence into its cluster
+    cluster_of_unique = np.arange(len(texts), dtype=np.int64)
+    cluster_of_unique[present] = present[leader_of]
+    return cluster_of_unique[representatives]
+
+
+def cluster_sizes(representatives: np.ndarray) -> np.ndarray:
+    """Size of each position's cluster."""
+    return np.bincount(representatives, minlength=len(representatives))[representatives]
+
+
+def propagate_to_members(results: list, members, id_column: str = 'review_id',
+                         representative_column: str = 'near_duplicate_of') -> list:
+    """
+    Copies of the representatives' extraction results for their cluster members.
+    results: dicts with 'review_id'; members: DataFrame of member ids and their representative's id.
+    Members whose representative has no result are skipped.
+    """
+    by_representative = {output['review_id']: output for output in results}
+    propagated = []
+    for review_id, representative_id in zip(members[id_column], members[representative_column]):
+        output = by_representative.get(representative_id)
+        if output is not None:
+            propagated.append({**output, 'review_id': review_id, 'propagated_from': representative_id})
+    return propagated
+
+
+def _synthetic_reviews(n: int, seed: int = 0) -> list:
+    """Templated marketplace-style reviews with small variations (for --benchmark)."""
+    rng = np.random.default_rng(seed)
+    templates = ["good product nice", "very good quality millet", "taste is good and healthy",
+                 "value for money product", "nice packing fresh stock", "bad quality not fresh"]
+    extras = ["", " must buy", " recommended", " thanks", " good", " nice"]
+    words = np.array(["ragi", "jowar", "bajra", "healthy", "soft", "grainy", "cheap", "costly", "fresh",
+                      "breakfast", "diabetes", "weight", "roti", "dosa", "porridge", "delivery"])
+    reviews = []
+    for i in range(n):
+        if rng.random() < 0.6:
+            reviews.append(templates[rng.integers(len(templates))] + extras[rng.integers(len(extras))])
+        else:
+            reviews.append(' '.join(rng.choice(words, size=rng.integers(4, 12))))
+    return reviews
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MinHash LSH near-duplicate detection")
+    parser.add_argument('--benchmark', type=int, metavar='N', required=True,
+                        help="Cluster N synthetic templated reviews and report timings")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD)
+    args = parser.parse_args()
+
+    reviews = _synthetic_reviews(args.benchmark)
+    start = time.perf_counter()
+    representatives = find_near_duplicates(reviews, threshold=args.threshold)
+    elapsed = time.perf_counter() - start
+    clusters = len(np.unique(representatives))
+    print(f"{len(reviews)} reviews -> {clusters} clusters "
+          f"({len(reviews) - clusters} near-duplicates) in {elapsed:.2f}s "
+          f"({len(reviews) / elapsed:.0f} reviews/s)")
+
+
+if __name__ == "__main__":
+    main()
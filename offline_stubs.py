@@ -0,0 +1,235 @@
+# offline_stubs.py
+# Deterministic stand-ins for the Groq chat model and the HuggingFace embedder.
+# Used by the benchmark scripts so the API can be exercised fully offline.
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import List
+
+import numpy as np
+
+# --- Canned LLM output (same markdown shape the real prompts ask for) ---
+CANNED_BENEFITS_MARKDOWN = """
+# Key Health Benefits
+- **Low glycemic index**: Releases glucose slowly
+- **High fiber**: Keeps you full for longer
+- **Mineral rich**: Good source of iron and calcium
+
+# How It Helps
+- Slows carbohydrate absorption
+- Supports healthy gut bacteria
+
+# Nutritional Highlights
+- Dietary fiber: Aids digestion
+- Magnesium: Supports heart health
+
+# Usage Tips
+- Replace rice in one meal a day
+- Soak overnight before cooking
+- Pair with vegetables and dal
+"""
+
+CANNED_COMBINED_MARKDOWN = """
+# Recommended Millets
+1. First Millet - Best match for your goals
+2. Second Millet - Strong alternative
+3. Third Millet - Good for variety
+
+# Key Benefits
+- Better blood sugar control
+- Improved digestion
+- Sustained energy
+
+# Usage Tips
+- Start with one serving a day
+- Mix with familiar grains
+- Try rotis, dosas and porridge
+
+# Important Notes
+- Consult healthcare professional
+- Start gradually
+- Individual results may vary
+"""
+
+
+class FakeChatGroq:
+    """
+    Drop-in replacement for ChatGroq.invoke() with configurable latency.
+    Latency is latency +/- jitter seconds, drawn from a seeded RNG so runs are repeatable.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, seed: int = 0,
+                 benefits_text: str = CANNED_BENEFITS_MARKDOWN,
+                 combined_text: str = CANNED_COMBINED_MARKDOWN, **kwargs):
+        self.latency = latency
+        self.jitter = jitter
+        self.benefits_text = benefits_text
+        self.combined_text = combined_text
+        self.model_name = kwargs.get('model_name', 'fake-llm')
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _sleep(self):
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + self._rng.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def bind(self, **kwargs):
+        """ChatGroq.bind(response_format=...) compatibility; the stub picks JSON from the prompt."""
+        return self
+
+    def invoke(self, prompt, *args, **kwargs):
+        self._sleep()
+        prompt = str(prompt)
+        if '"recommended_millets"' in prompt:
+            return SimpleNamespace(content=self._structured_json(prompt))
+        text = self.combined_text if "Recommended Millets" in prompt else self.benefits_text
+        return SimpleNamespace(content=text)
+
+    def _structured_json(self, prompt):
+        """Fills the JSON skeleton from the structured-mode prompt with canned bullet points."""
+        names = list(dict.fromkeys(re.findall(r'"name": "([^"]+)"', prompt)))
+        return json.dumps({
+            "recommended_millets": [{"name": n, "reason": "Strong match for your goals"} for n in names],
+            "key_benefits": ["Better blood sugar control", "Improved digestion", "Sustained energy"],
+            "usage_tips": ["Start with one serving a day", "Mix with familiar grains", "Try rotis and porridge"],
+            "important_notes": ["Consult healthcare professional", "Start gradually", "Individual results may vary"],
+            "millets": [{
+                "name": n,
+                "key_health_benefits": ["Low glycemic index", "High fiber", "Mineral rich"],
+                "how_it_helps": ["Slows carbohydrate absorption", "Supports gut bacteria"],
+                "nutritional_highlights": ["Dietary fiber: aids digestion", "Magnesium: heart health"],
+                "usage_tips": ["Replace rice once a day", "Soak before cooking", "Pair with vegetables"],
+            } for n in names],
+        })
+
+
+def make_fake_chat_groq(latency: float = 0.0, jitter: float = 0.0, seed: int = 0):
+    """Returns a ChatGroq-compatible constructor bound to the given latency profile."""
+    def factory(*args, **kwargs):
+        return FakeChatGroq(latency=latency, jitter=jitter, seed=seed, **kwargs)
+    return factory
+
+
+class GroqStandInServer:
+    """
+    Local HTTP stand-in for the Groq chat completions API (OpenAI wire format), answering
+    from a FakeChatGroq. Point Config.GROQ_BASE_URL at `url` to exercise the real ChatGroq
+    client and the shared connection pool (http_pool.py) without network access.
+    HTTP/1.1 keep-alive is supported; `connections` counts the TCP connections accepted.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0,
+                 jitter: float = 0.0, seed: int = 0):
+        self.fake_llm = FakeChatGroq(latency=latency, jitter=jitter, seed=seed)
+        self.connections = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Keep-alive, like the real API
+
+            def setup(self):
+                super().setup()
+                with stand_in._lock:
+                    stand_in.connections += 1
+
+            def _send_json(self, status, payload):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.rstrip('/') == '/openai/v1/models':
+                    self._send_json(200, {'object': 'list', 'data': [{'id': 'llama-3.1-8b-instant', 'object': 'model'}]})
+                else:
+                    self._send_json(404, {'error': {'message': 'Not found'}})
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                request = json.loads(self.rfile.read(length) or b'{}')
+                if self.path.rstrip('/') != '/openai/v1/chat/completions':
+                    self._send_json(404, {'error': {'message': 'Not found'}})
+                    return
+                with stand_in._lock:
+                    stand_in.requests += 1
+                prompt = '\n'.join(str(m.get('content', '')) for m in request.get('messages', []))
+                content = stand_in.fake_llm.invoke(prompt).content
+                prompt_tokens, completion_tokens = len(prompt.split()), len(content.split())
+                self._send_json(200, {
+                    'id': f"chatcmpl-stand-in-{stand_in.requests}",
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': request.get('model', 'llama-3.1-8b-instant'),
+                    'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content},
+                                 'finish_reason': 'stop'}],
+                    'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                              'total_tokens': prompt_tokens + completion_tokens},
+                })
+
+            def log_message(self, format, *args):
+                pass  # Keep benchmark output clean
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+        self._thread = None
+
+    def start(self) -> 'GroqStandInServer':
+        self._thread = threading.Thread(target=self.server.serve_forever, name="groq-stand-in", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'connections_accepted': self.connections, 'requests': self.requests}
+
+
+class FakeEmbeddings:
+    """
+    Tiny hashed bag-of-words embedder with the same interface as HuggingFaceEmbeddings.
+    Vectors are L2-normalised and deterministic, so repeated queries hit the same neighbours.
+    query_latency makes embed_query block like a real model (native code, GIL released).
+    """
+
+    def __init__(self, dim: int = 384, model_name: str = "fake-hash-embedder", query_latency: float = 0.0,
+                 **kwargs):
+        self.dim = dim
+        self.model_name = model_name
+        self.query_latency = query_latency
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in str(text).lower().split():
+            digest = hashlib.md5(token.encode('utf-8')).digest()
+            index = int.from_bytes(digest[:4], 'little') % self.dim
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        if self.query_latency > 0:
+            time.sleep(self.query_latency)
+        return self._embed(text)
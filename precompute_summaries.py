@@ -0,0 +1,115 @@
+# precompute_summaries.py
+# Offline batch job: generates the LLM summaries for requests without free text and
+# saves them to the versioned summary store that app.py reads first.
+#  - benefits summaries for every millet x concern set
+#  - combined summaries for the same concern sets
+# Re-running only fills entries missing for the current data/prompt version.
+#
+# Example:
+#   python precompute_summaries.py --max-set-size 2
+
+import argparse
+import itertools
+import time
+
+from config import Config
+from millet_registry import registry
+from rag_engine import MilletRAGEngine, PROMPT_VERSION
+from recommendation_engine import MilletRecommender
+from summary_store import open_summary_store
+
+
+def concern_sets(concerns, max_size):
+    """All concern combinations up to max_size, in canonical (sorted) order."""
+    for size in range(1, max_size + 1):
+        for combo in itertools.combinations(sorted(concerns), size):
+            yield list(combo)
+
+
+def wait_for_circuit(rag_engine):
+    if rag_engine.circuit_breaker.state == 'open':
+        print(f"LLM circuit open, waiting {Config.LLM_BREAKER_COOLDOWN_SECONDS:.0f}s before continuing...")
+        time.sleep(Config.LLM_BREAKER_COOLDOWN_SECONDS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate summaries for the summary store")
+    parser.add_argument('--max-set-size', type=int, default=2,
+                        help="Largest concern combination to materialize (7 = all 127 subsets)")
+    parser.add_argument('--force', action='store_true', help="Regenerate entries that already exist")
+    parser.add_argument('--save-every', type=int, default=20, help="Persist the store every N new entries")
+    args = parser.parse_args()
+
+    print("--- Starting Summary Precompute Job ---")
+    rag_engine = MilletRAGEngine()
+    recommender = MilletRecommender()
+    store = open_summary_store(PROMPT_VERSION)
+    if args.force:
+        store.benefits.clear()
+        store.combined.clear()
+
+    millets = list(dict.fromkeys(
+        registry.short_name(millet_id, name) for name, millet_id in zip(recommender.millets, recommender.millet_ids)
+    ))
+    all_sets = list(concern_sets(recommender.health_keywords.keys(), args.max_set_size))
+    print(f"Store version {store.version}: {len(all_sets)} concern sets x {len(millets)} millets.")
+
+    generated, skipped, failed = 0, 0, 0
+    start_time = time.time()
+
+    def checkpoint():
+        if generated and generated % args.save_every == 0:
+            store.save()
+
+    for concerns in all_sets:
+        # Combined summary for the ranked top 3 of this concern set
+        recommendations = recommender.get_top_recommendations(concerns, top_n=3)
+        names = [rec['name'] for rec in recommendations]
+        if store.get_combined(concerns, names) is None:
+            wait_for_circuit(rag_engine)
+            evidence = {
+                rec['name']: rag_engine.get_evidence_with_documents(
+                    ', '.join(concerns), recommender.millet_key(rec))[1]
+                for rec in recommendations
+            }
+            user_data = {'recommendations': recommendations, 'health_concerns': concerns,
+                         'user_query': '', 'scientific_evidence': evidence}
+            try:
+                summary = rag_engine.get_combined_recommendation(concerns, user_data, strict=True)
+                store.put_combined(concerns, names, summary)
+                generated += 1
+                checkpoint()
+            except Exception as e:
+                failed += 1
+                print(f"Warning: combined summary failed for {concerns}: {e}")
+        else:
+            skipped += 1
+
+        # Benefits summary for every millet under this concern set
+        for millet in millets:
+            if store.get_benefits(millet, concerns) is not None:
+                skipped += 1
+                continue
+            wait_for_circuit(rag_engine)
+            _, evidence = rag_engine.get_evidence_with_documents(', '.join(concerns), millet)
+            try:
+                summary = rag_engine.generate_benefits_summary(millet, concerns, evidence, strict=True)
+                store.put_benefits(millet, concerns, summary)
+                generated += 1
+                checkpoint()
+            except Exception as e:
+                failed += 1
+                print(f"Warning: benefits summary failed for {millet} / {concerns}: {e}")
+
+        print(f"Done {'+'.join(concerns)}: {generated} generated, {skipped} already stored, {failed} failed.")
+
+    store.metadata.update({'prompt_version': PROMPT_VERSION, 'max_set_size': args.max_set_size})
+    store.save()
+    print(f"\n--- Summary Precompute Complete in {time.time() - start_time:.1f}s ---")
+    print(f"Generated {generated}, skipped {skipped}, failed {failed}. Store: {store.path}")
+    if failed:
+        print("Re-run the job to fill the failed entries.")
+
+
+if __name__ == "__main__":
+    main()
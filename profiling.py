@@ -0,0 +1,148 @@
+# profiling.py
+# Opt-in, per-request profiling for /api/recommend.
+# A request is profiled when it carries the admin token in the X-Profile header, or when it
+# is picked by PROFILE_SAMPLE_RATE. Everything else runs untouched: with no token configured
+# and a zero sample rate, should_profile() returns False without looking at the request.
+#
+# Two modes (Config.PROFILE_MODE):
+#  - "sampling": a side thread snapshots the request thread's stack every PROFILE_INTERVAL_SECONDS
+#    and stores folded stacks ("frame;frame;frame count"), ready for flamegraph.pl / speedscope.
+#  - "cprofile": deterministic cProfile of the request thread, stored as a .prof (pstats) file.
+#
+# Profiles live in memory (most recent PROFILE_MAX_STORED, within PROFILE_STORE_BYTES) and are
+# served by /debug/profiles.
+
+import cProfile
+import hmac
+import io
+import marshal
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from config import Config
+from memory_accounting import BudgetedLRUCache
+
+PROFILE_HEADER = 'x-profile'
+
+
+class SamplingProfiler:
+    """Samples one thread's Python stack from a background thread (no tracing overhead)."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    @staticmethod
+    def _frame_label(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_label(frame))
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self) -> str:
+        return '\n'.join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + '\n'
+
+
+# (meta, data) per profile id; oldest evicted first once over the count or byte budget
+profile_store = BudgetedLRUCache('profiles', Config.PROFILE_STORE_BYTES, max_entries=Config.PROFILE_MAX_STORED)
+
+
+def is_admin(headers) -> bool:
+    """True if the X-Profile header carries the configured admin token."""
+    token = Config.PROFILE_ADMIN_TOKEN
+    supplied = headers.get(PROFILE_HEADER)
+    return bool(token and supplied and hmac.compare_digest(supplied, token))
+
+
+def should_profile(headers) -> bool:
+    if not Config.PROFILE_ADMIN_TOKEN and Config.PROFILE_SAMPLE_RATE <= 0:
+        return False
+    if is_admin(headers):
+        return True
+    return Config.PROFILE_SAMPLE_RATE > 0 and random.random() < Config.PROFILE_SAMPLE_RATE
+
+
+def run_profiled(label: str, func, *args, **kwargs):
+    """
+    Calls func(*args, **kwargs) in the current thread under the configured profiler and stores
+    the result in profile_store. Meant to run inside the worker thread that does the request's work.
+    """
+    mode = Config.PROFILE_MODE
+    profile_id = uuid.uuid4().hex[:12]
+    started_at = time.time()
+    start = time.perf_counter()
+
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+        profiler.enable()
+    else:
+        profiler = SamplingProfiler(threading.get_ident(), Config.PROFILE_INTERVAL_SECONDS)
+        profiler.start()
+
+    error = None
+    try:
+        return func(*args, **kwargs)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        if mode == 'cprofile':
+            profiler.disable()
+            profiler.create_stats()
+            data, extension, samples = marshal.dumps(profiler.stats), 'prof', None
+        else:
+            profiler.stop()
+            data, extension, samples = profiler.folded().encode('utf-8'), 'folded', profiler.samples
+        profile_store.put(profile_id, ({
+            'id': profile_id,
+            'label': label,
+            'mode': mode,
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(started_at)),
+            'duration_ms': round(duration * 1000, 2),
+            'samples': samples,
+            'error': error,
+            'filename': f"profile-{profile_id}.{extension}",
+            'bytes': len(data),
+        }, data))
+
+
+def top_functions(profile_id: str, limit: int = 25) -> str:
+    """Human-readable pstats summary of a stored cProfile profile."""
+    import pstats
+
+    entry = profile_store.get(profile_id)
+    if entry is None or entry[0]['mode'] != 'cprofile':
+        return ''
+    out = io.StringIO()
+    stats = pstats.Stats(stream=out)
+    stats.stats = marshal.loads(entry[1])  # Same bytes pstats.dump_stats would write
+    stats.get_top_level_stats()
+    stats.sort_stats('cumulative').print_stats(limit)
+    return out.getvalue()
@@ -1,63 +1,137 @@
 # rag_engine.py - UPDATED WITH PRODUCT URL MAPPING
 
 from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_groq import ChatGroq
 from config import Config
+from embedding_backends import load_embeddings
+from millet_registry import registry
+from millet_tags import canonical_millet, metadata_key
+from hybrid_retriever import HybridRetriever
+from llm_guard import CircuitBreaker, Deadline, LLMUnavailableError
+from http_pool import get_http_client, reset_http_client
+from memory_accounting import BudgetedLRUCache
+from context_assembler import assemble_context, count_tokens
+from structured_output import benefits_markdown, combined_markdown, json_skeleton, parse_structured_response
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from collections import deque
+import asyncio
 import re
 import html
+import time
+
+# Bump whenever the summary prompts change so materialized summaries get regenerated
+# (3: millets are named by their canonical registry key in prompts and store keys)
+PROMPT_VERSION = 3
 
 class MilletRAGEngine:
     def __init__(self):
-        self.embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-        self.vector_store = Chroma(
+        self.embeddings = load_embeddings()  # Backend chosen by Config.EMBEDDING_BACKEND
+        self.vector_store = self._open_vector_store()
+        self.hybrid_retriever = None
+        if Config.RETRIEVAL_MODE in ('hybrid', 'hybrid_rrf'):
+            try:
+                self.hybrid_retriever = HybridRetriever(
+                    Config.HYBRID_INDEX_PATH, self.embeddings, candidates=Config.HYBRID_CANDIDATES
+                )
+            except Exception as e:
+                print(f"Warning: Hybrid index unavailable ({e}); using dense retrieval only.")
+        self.llm = self._make_llm()
+
+        # Token accounting for the most recent prompts sent to Groq (evidence vs. total input tokens)
+        self.prompt_stats = deque(maxlen=Config.PROMPT_STATS_HISTORY)
+
+        # Retrieved chunks per (query, millet): identical concern sets skip the embedding + search
+        self.evidence_cache = BudgetedLRUCache('evidence', Config.EVIDENCE_CACHE_BYTES)
+
+        # Groq calls run on their own pool so a hung call can be abandoned at its deadline
+        self._llm_executor = ThreadPoolExecutor(max_workers=Config.LLM_MAX_WORKERS, thread_name_prefix="groq")
+        # Query embedding + vector search for the async API (aretrieve_evidence ...); bounded so
+        # retrieval can't take over the event loop's default thread pool
+        self._retrieval_executor = ThreadPoolExecutor(max_workers=Config.RETRIEVAL_MAX_WORKERS,
+                                                      thread_name_prefix="retrieval")
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold=Config.LLM_BREAKER_FAILURE_THRESHOLD,
+            cooldown_seconds=Config.LLM_BREAKER_COOLDOWN_SECONDS,
+            slow_call_seconds=Config.LLM_SLOW_CALL_SECONDS
+        )
+
+    def _open_vector_store(self):
+        return Chroma(
             persist_directory=Config.VECTOR_DB_PATH,
             embedding_function=self.embeddings
         )
-        self.llm = ChatGroq(
+
+    def _make_llm(self):
+        return ChatGroq(
             groq_api_key=Config.GROQ_API_KEY,
+            groq_api_base=Config.GROQ_BASE_URL,
             model_name="llama-3.1-8b-instant",
-            temperature=0.3
+            temperature=0.3,
+            request_timeout=Config.LLM_TIMEOUT_SECONDS,
+            max_retries=Config.LLM_MAX_RETRIES,
+            http_client=get_http_client()  # Shared keep-alive pool (http_pool.py)
         )
-        
-        # Product URL mapping for milletamma.com
-        self.millet_product_urls = {
-            'pearl': 'https://milletamma.com/products/bajra-perl-milet-flour-organic-500gm',
-            'foxtail': 'https://milletamma.com/products/foxtail-millet-grains-organic-500gm',
-            'finger': 'https://milletamma.com/products/ragi-finger-millet-flour-organic-500gm',
-            'barnyard': 'https://milletamma.com/products/barnyard-millet-grains-organic-500gm',
-            'little': 'https://milletamma.com/products/little-millet-flour-organic-500gm',
-            'kodo': 'https://milletamma.com/products/kodo-millet-grains-organic-500gm',
-            'proso': 'https://milletamma.com/products/proso-millet-organic-500gm', # proso millet flour
-            'sorghum': 'https://milletamma.com/products/jowar-millet-grain-organic-500gm',
-            'bajra': 'https://milletamma.com/products/bajra-methi-khakhra-180gm',
-            'ragi': 'https://milletamma.com/products/ragi-grains-finger-millet-organic-500gm',
-            'jowar': 'https://milletamma.com/products/jowar-sorghum-flour-organic-500gm',
-            'kangni': 'https://milletamma.com/products/foxtail-millet-organic-500gm',
-            'kutki': 'https://milletamma.com/products/little-millet-organic-500gm',
-            'sama': 'https://milletamma.com/products/barnyard-millet-organic-500gm',
-            'chena': 'https://milletamma.com/products/proso-millet-organic-500gm'
-        }
+
+    def reopen_after_fork(self):
+        """
+        Re-creates the per-process handles after a pre-forked worker starts (gunicorn.conf.py).
+        Model weights and the mmap'd hybrid embeddings stay shared with the parent; the Chroma
+        client (SQLite connection), the Groq and retrieval thread pools and the pooled Groq
+        connections must not be inherited across fork. The ONNX backend opens its
+        InferenceSession per process on first use (embedding_backends.OnnxEmbeddings).
+        """
+        try:
+            from chromadb.api.client import SharedSystemClient
+            SharedSystemClient.clear_system_cache()  # Otherwise Chroma hands back the parent's client
+        except (ImportError, AttributeError):
+            pass
+        self.vector_store = self._open_vector_store()
+        self._llm_executor = ThreadPoolExecutor(max_workers=Config.LLM_MAX_WORKERS, thread_name_prefix="groq")
+        self._retrieval_executor = ThreadPoolExecutor(max_workers=Config.RETRIEVAL_MAX_WORKERS,
+                                                      thread_name_prefix="retrieval")
+        reset_http_client()
+        self.llm = self._make_llm()
 
     def get_millet_product_url(self, millet_name: str) -> str:
         """
         Get the product URL for a millet from milletamma.com
         Returns a default URL if specific millet not found
         """
-        # Clean the millet name
-        millet_lower = millet_name.lower().strip()
-        
-        # Try exact match first
-        if millet_lower in self.millet_product_urls:
-            return self.millet_product_urls[millet_lower]
-        
-        # Try partial matches
-        for key, url in self.millet_product_urls.items():
-            if key in millet_lower or millet_lower in key:
-                return url
-        
-        # Default to millet products page
-        return "https://milletamma.com/collections/millet-basket"
+        return registry.product_url(millet_name)
+
+    def _invoke_llm(self, prompt: str, deadline: Deadline = None, json_mode: bool = False,
+                    prompt_stats: dict = None) -> str:
+        """
+        Calls the LLM with a per-call timeout capped by the request deadline.
+        Raises LLMUnavailableError without calling Groq when the circuit is open
+        or too little time is left, so callers drop straight to their fallback.
+        prompt_stats (from _evidence_block) is recorded only if the prompt is actually sent.
+        """
+        timeout = Config.LLM_TIMEOUT_SECONDS
+        if deadline is not None:
+            timeout = min(timeout, deadline.remaining())
+        if timeout < Config.LLM_MIN_CALL_SECONDS:
+            raise LLMUnavailableError("Request deadline exhausted")
+        if not self.circuit_breaker.allow_request():
+            raise LLMUnavailableError("LLM circuit open")
+        if prompt_stats is not None:
+            self._record_prompt(prompt, prompt_stats)
+
+        start = time.monotonic()
+        llm = self.llm.bind(response_format={"type": "json_object"}) if json_mode else self.llm
+        future = self._llm_executor.submit(llm.invoke, prompt)
+        try:
+            response = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            self.circuit_breaker.record_failure()
+            raise LLMUnavailableError(f"LLM call exceeded {timeout:.1f}s")
+        except Exception:
+            self.circuit_breaker.record_failure()
+            raise
+
+        self.circuit_breaker.record_success(time.monotonic() - start)
+        return response.content
 
     # [Keep all existing methods exactly as they were...]
     # format_llm_output_to_html, get_scientific_evidence, generate_benefits_summary, etc.
@@ -245,28 +319,123 @@ class MilletRAGEngine:
         
         return text.strip()
 
-    def get_scientific_evidence(self, health_concern: str, millet_type: str = None):
+    def _search(self, query: str, millet_type: str = None, k: int = 4):
+        """
+        Similarity search restricted to chunks tagged with the requested millet.
+        Tops up from the whole collection when the tagged subset is too small
+        (or the index predates millet tagging). In hybrid mode BM25 picks the
+        candidates first; queries with no lexical match fall through to dense search.
+        """
+        canonical = canonical_millet(millet_type) if (millet_type and Config.MILLET_PREFILTER) else None
+
+        if self.hybrid_retriever is not None:
+            fusion = 'rrf' if Config.RETRIEVAL_MODE == 'hybrid_rrf' else 'dense'
+            flag = metadata_key(canonical) if canonical else None
+            results = self.hybrid_retriever.search(query, k=k, metadata_flag=flag, fusion=fusion)
+            if results is not None:
+                return results
+
+        if canonical is None:
+            return self.vector_store.similarity_search(query, k=k)
+
+        results = self.vector_store.similarity_search(query, k=k, filter={metadata_key(canonical): True})
+        if len(results) < k:
+            seen = {doc.page_content for doc in results}
+            for doc in self.vector_store.similarity_search(query, k=k):
+                if doc.page_content not in seen and len(results) < k:
+                    results.append(doc)
+        return results
+
+    def retrieve_evidence(self, health_concern: str, millet_type: str = None):
+        """Raw evidence chunks (LangChain Documents) for a concern, optionally for one millet."""
+        if millet_type:
+            query = f"health benefits of {millet_type} millet for {health_concern}"
+        else:
+            query = f"millets for {health_concern} health benefits nutritional composition"
+        key = (query, millet_type, Config.RETRIEVAL_K)
+        documents = self.evidence_cache.get(key)
+        if documents is None:
+            documents = self._search(query, millet_type, k=Config.RETRIEVAL_K)
+            self.evidence_cache.put(key, documents)
+        return list(documents)
+
+    def format_evidence(self, documents) -> list:
+        evidence = []
+        for doc in documents:
+            page = doc.metadata.get('source_page', 'N/A')
+            content = doc.page_content.replace('\n', ' ').strip()
+            evidence.append(f"Page {page}: {content}")
+        return evidence
+
+    def get_evidence_with_documents(self, health_concern: str, millet_type: str = None):
+        """Returns (display strings for the API response, Documents for prompt assembly)."""
         try:
-            if millet_type:
-                query = f"health benefits of {millet_type} millet for {health_concern}"
-            else:
-                query = f"millets for {health_concern} health benefits nutritional composition"
-            
-            results = self.vector_store.similarity_search(query, k=4)
-            
-            evidence = []
-            for doc in results:
-                page = doc.metadata.get('source_page', 'N/A')
-                content = doc.page_content.replace('\n', ' ').strip()
-                evidence.append(f"Page {page}: {content}")
-            
-            return evidence
+            documents = self.retrieve_evidence(health_concern, millet_type)
+            return self.format_evidence(documents), documents
         except Exception as e:
-            return [f"Scientific data temporarily unavailable: {str(e)}"]
+            return [f"Scientific data temporarily unavailable: {str(e)}"], []
+
+    def get_scientific_evidence(self, health_concern: str, millet_type: str = None):
+        return self.get_evidence_with_documents(health_concern, millet_type)[0]
+
+    # --- Async retrieval: same results, run on the retrieval pool instead of the caller's thread ---
+    async def _run_retrieval(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._retrieval_executor, func, *args)
+
+    async def aretrieve_evidence(self, health_concern: str, millet_type: str = None):
+        return await self._run_retrieval(self.retrieve_evidence, health_concern, millet_type)
+
+    async def aget_evidence_with_documents(self, health_concern: str, millet_type: str = None):
+        return await self._run_retrieval(self.get_evidence_with_documents, health_concern, millet_type)
+
+    async def aget_scientific_evidence(self, health_concern: str, millet_type: str = None):
+        return (await self.aget_evidence_with_documents(health_concern, millet_type))[0]
+
+    def _evidence_block(self, evidence: list, token_budget: int, kind: str, label: str):
+        """Budgeted context block for a prompt; also returns the stats entry to finish after prompting."""
+        context, stats = assemble_context(evidence, token_budget)
+        stats.update({'kind': kind, 'label': label})
+        if not context:
+            return "", stats
+        block = f"""
+        Ground your answer in these excerpts from our research document. Do not contradict them.
+        Research excerpts:
+        {context}
+        """
+        return block, stats
+
+    def _record_prompt(self, prompt: str, stats: dict):
+        stats['prompt_tokens'] = count_tokens(prompt)
+        self.prompt_stats.append(stats)
+
+    def prompt_stats_summary(self) -> dict:
+        """Token accounting over the most recent prompts sent to Groq (see _invoke_llm)."""
+        recent = list(self.prompt_stats)
+        if not recent:
+            return {'prompts': 0}
+
+        def mean(key):
+            return round(sum(stats[key] for stats in recent) / len(recent), 1)
 
-    def generate_benefits_summary(self, millet_type: str, health_concerns: list, scientific_evidence: list):
+        prompt_tokens = sorted(stats['prompt_tokens'] for stats in recent)
+        return {
+            'prompts': len(recent),
+            'mean_prompt_tokens': mean('prompt_tokens'),
+            'p95_prompt_tokens': prompt_tokens[min(len(recent) - 1, int(len(recent) * 0.95))],
+            'mean_evidence_tokens_before_trim': mean('evidence_tokens_in'),
+            'mean_evidence_tokens_after_trim': mean('evidence_tokens'),
+            'truncated_share': round(sum(bool(stats.get('truncated')) for stats in recent) / len(recent), 3),
+        }
+
+    def generate_benefits_summary(self, millet_type: str, health_concerns: list, scientific_evidence: list,
+                                  deadline: Deadline = None, strict: bool = False):
+        evidence_block, stats = self._evidence_block(
+            scientific_evidence, Config.EVIDENCE_TOKEN_BUDGET, 'benefits', millet_type
+        )
         prompt = f"""
         Provide a CLEAN, STRUCTURED summary of {millet_type} millet benefits for {', '.join(health_concerns)}.
+        {evidence_block}
 
         Structure it clearly with these sections:
 
@@ -292,11 +461,12 @@ class MilletRAGEngine:
         Keep each bullet point concise - one line only.
         Use **bold** for key terms only.
         """
-        
         try:
-            response = self.llm.invoke(prompt)
-            return self.format_llm_output_to_html(response.content)
+            content = self._invoke_llm(prompt, deadline, prompt_stats=stats)
+            return self.format_llm_output_to_html(content)
         except Exception as e:
+            if strict:  # Offline jobs must not persist the fallback template
+                raise
             return self.format_llm_output_to_html(f"""
             # Key Health Benefits
             - Supports {', '.join(health_concerns)}
@@ -309,7 +479,8 @@ class MilletRAGEngine:
             - Combine with vegetables
             """)
 
-    def get_combined_recommendation(self, health_concerns: list, user_data: dict):
+    def get_combined_recommendation(self, health_concerns: list, user_data: dict, deadline: Deadline = None,
+                                    strict: bool = False):
         # 1. EXTRACT THE CALCULATED WINNERS (The Ordering Fix)
         top_millets = [rec['name'] for rec in user_data.get('recommendations', [])]
         millet_list_string = ", ".join(top_millets)
@@ -326,11 +497,19 @@ class MilletRAGEngine:
             even if it goes beyond the selected tags.
             """
 
-        # 3. UPDATE THE PROMPT
+        # 3. SHARED EVIDENCE (all recommended millets, one budget)
+        evidence_by_millet = user_data.get('scientific_evidence', {}) or {}
+        combined_evidence = [item for name in top_millets for item in evidence_by_millet.get(name, [])]
+        evidence_block, stats = self._evidence_block(
+            combined_evidence, Config.COMBINED_EVIDENCE_TOKEN_BUDGET, 'combined', millet_list_string
+        )
+
+        # 4. UPDATE THE PROMPT
         prompt = f"""
         Our data analysis has determined that the best millets for {', '.join(health_concerns)} are: {millet_list_string}.
         
         {custom_instruction}
+        {evidence_block}
 
         Create a recommendation summary specifically for these 3 millets in this exact order.
 
@@ -359,11 +538,12 @@ class MilletRAGEngine:
         Be direct. No greetings. No conversational fluff.
         Use **bold** only for millet names and section headers.
         """
-        
         try:
-            response = self.llm.invoke(prompt)
-            return self.format_llm_output_to_html(response.content)
+            content = self._invoke_llm(prompt, deadline, prompt_stats=stats)
+            return self.format_llm_output_to_html(content)
         except Exception as e:
+            if strict:  # Offline jobs must not persist the fallback template
+                raise
             # Fallback
             return self.format_llm_output_to_html(f"""
             # Recommended Millets
@@ -375,4 +555,61 @@ class MilletRAGEngine:
             - Addresses your specific health goals
             - Nutrient rich
             - versatile
-            """)
\ No newline at end of file
+            """)
+
+    def get_structured_recommendation(self, health_concerns: list, user_data: dict, deadline: Deadline = None):
+        """
+        One LLM call for the combined summary AND every millet's benefits (JSON, schema-validated).
+        Returns (summary_html, {millet name: benefits_html}). Raises on any call or parse
+        failure so the caller can fall back to the per-call path.
+        """
+        top_millets = [rec['name'] for rec in user_data.get('recommendations', [])]
+        user_query = user_data.get('user_query', '')
+        concerns_text = ', '.join(health_concerns)
+
+        evidence_by_millet = user_data.get('scientific_evidence', {}) or {}
+        evidence_sections, stats_list = [], []
+        for name in top_millets:
+            block, stats = self._evidence_block(
+                evidence_by_millet.get(name, []), Config.EVIDENCE_TOKEN_BUDGET, 'structured', name
+            )
+            stats_list.append(stats)
+            if block:
+                evidence_sections.append(f"{name}:{block}")
+
+        custom_instruction = ""
+        if user_query:
+            custom_instruction = f"""
+        CRITICAL USER CONTEXT: The user specifically mentioned: "{user_query}".
+        You MUST address this specific need in the benefits and usage tips.
+        """
+
+        prompt = f"""
+        Our data analysis has determined that the best millets for {concerns_text} are, in this exact order: {', '.join(top_millets)}.
+        {custom_instruction}
+        {''.join(evidence_sections)}
+        Respond with ONE JSON object and nothing else, shaped exactly like this example
+        (keep the millet names and order, replace the placeholder text):
+        {json_skeleton(top_millets)}
+
+        Rules: each list item is one concise line; 3 items per list unless the example shows 2.
+        No greetings, no markdown, no text outside the JSON.
+        """
+        prompt_stats = {
+            'kind': 'structured',
+            'label': ', '.join(top_millets),
+            'evidence_tokens_in': sum(st['evidence_tokens_in'] for st in stats_list),
+            'evidence_tokens': sum(st['evidence_tokens'] for st in stats_list),
+            'truncated': any(st['truncated'] for st in stats_list),
+            'chunks_in': sum(st['chunks_in'] for st in stats_list),
+            'spans_used': sum(st['spans_used'] for st in stats_list),
+        }
+        content = self._invoke_llm(prompt, deadline, json_mode=True, prompt_stats=prompt_stats)
+        result = parse_structured_response(content, top_millets)
+
+        summary_html = self.format_llm_output_to_html(combined_markdown(result))
+        sections = benefits_markdown(result)
+        benefits_html = {
+            name: self.format_llm_output_to_html(sections[name.strip().lower()]) for name in top_millets
+        }
+        return summary_html, benefits_html
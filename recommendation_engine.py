@@ -1,11 +1,30 @@
+import copy
+import numpy as np
 import pandas as pd
 import re
-from typing import Dict, List
+from typing import Dict, List, Optional, Sequence
 from config import Config
+from millet_registry import encode_millet_column, registry
 
 class MilletRecommender:
-    def __init__(self):
-        self.df = pd.read_csv(Config.CSV_PATH)
+    def __init__(self, df: pd.DataFrame = None):
+        """df: reviews to use instead of Config.CSV_PATH (its millet_type column is converted in place)."""
+        self._load(df)
+
+    def reload(self):
+        """Re-reads the reviews CSV and rebuilds every derived table, materialized results included."""
+        fresh = type(self).__new__(type(self))
+        fresh._load()
+        self.__dict__ = fresh.__dict__  # One swap: requests see the old or the new data, never a mix
+
+    def _load(self, df: pd.DataFrame = None):
+        self.df = pd.read_csv(Config.CSV_PATH) if df is None else df
+        # millet_type becomes categorical: per-row codes index every per-millet array below
+        self.millet_codes, self.millet_ids = encode_millet_column(self.df)
+        self.millets = self.df['millet_type'].cat.categories.to_numpy()
+        self.display_names = [millet.title() for millet in self.millets]
+        self._position = {millet: i for i, millet in enumerate(self.millets)}
+        self._rows = [np.flatnonzero(self.millet_codes == i) for i in range(len(self.millets))]
         self.health_keywords = {
             'diabetes': ['diabet', 'sugar', 'blood sugar', 'glucose', 'glycemic', 'insulin'],
             'heart': ['heart', 'cholesterol', 'blood pressure', 'cardio', 'hypertension'],
@@ -15,10 +34,171 @@ class MilletRecommender:
             'bones': ['bone', 'calcium', 'osteoporosis', 'fracture'],
             'gluten': ['gluten', 'celiac', 'allerg', 'intolerance']
         }
+        self._build_concern_matrix()
+        self._materialized = None
+        if Config.RECOMMENDER_MATERIALIZE:
+            self._materialize()
+
+    def _build_concern_matrix(self):
+        """
+        Precomputes, in one pass over the reviews, the keyword match percentage of every
+        millet x concern pair plus each millet's mean rating. Scoring a concern set (or
+        thousands of them) is then a matrix product instead of repeated str.contains scans.
+        """
+        self.concerns = list(self.health_keywords.keys())
+        self._concern_index = {concern: j for j, concern in enumerate(self.concerns)}
+        keywords = sorted({kw for kws in self.health_keywords.values() for kw in kws})
+        self.keyword_masks = pd.DataFrame(
+            {kw: self.df['review'].str.contains(kw, case=False, na=False) for kw in keywords}
+        )
+        n_millets = len(self.millets)
+        valid = self.millet_codes >= 0
+        codes = self.millet_codes[valid]
+        review_counts = np.bincount(codes, minlength=n_millets)
+        keyword_hits = {
+            kw: np.bincount(codes, weights=self.keyword_masks[kw].to_numpy()[valid], minlength=n_millets)
+            for kw in keywords
+        }
+
+        # concern_pct[m, c]: keyword hits per 100 reviews (a review matching two keywords counts twice)
+        self.concern_pct = np.zeros((n_millets, len(self.concerns)))
+        for j, concern in enumerate(self.concerns):
+            hits = sum(keyword_hits[kw] for kw in self.health_keywords[concern])
+            self.concern_pct[:, j] = hits / review_counts * 100
+
+        ratings = self.df['rating'].to_numpy(dtype=float)[valid]
+        rated = ~np.isnan(ratings)
+        rating_sums = np.bincount(codes[rated], weights=ratings[rated], minlength=n_millets)
+        rating_counts = np.bincount(codes[rated], minlength=n_millets)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.rating_bonus = (rating_sums / rating_counts - 3) * 10
+
+        # health_concern_match always reports mention percentages; scoring may use relevance instead
+        self.mention_pct = self.concern_pct
+        self.relevance_pct = None
+        if Config.CONCERN_SCORING == 'embedding':
+            self._apply_concern_relevance(Config.CONCERN_RELEVANCE_PATH)
+
+    def _apply_concern_relevance(self, path: str):
+        """
+        Replaces the keyword percentages with the offline embedding relevance table
+        (concern_relevance.py). The two scales aren't comparable, so the table is only used if
+        it covers every millet and concern; otherwise keyword scoring is kept for the whole matrix.
+        """
+        from concern_relevance import load_relevance_table
+
+        table = load_relevance_table(path)
+        if table is None:
+            print("Falling back to keyword concern scoring.")
+            return
+        rows = dict(zip(table['millets'], table['relevance']))
+        missing_millets = [millet for millet in self.millets if millet not in rows]
+        missing_concerns = [concern for concern in self.concerns if concern not in table['concerns']]
+        if missing_millets or missing_concerns:
+            print(f"Warning: Concern relevance table {path} is missing millets {missing_millets} "
+                  f"and concerns {missing_concerns}; rebuild it with concern_relevance.py. "
+                  f"Falling back to keyword concern scoring.")
+            return
+        columns = [table['concerns'].index(concern) for concern in self.concerns]
+        self.relevance_pct = np.array([[rows[millet][column] for column in columns] for millet in self.millets],
+                                      dtype=float)
+        self.concern_pct = self.relevance_pct
+        print(f"Concern scoring: embedding relevance for {len(self.millets)} millets from {path}.")
+
+    def _materialize(self):
+        """
+        Precomputes the recommender output for every non-empty concern subset (2^7 - 1 with
+        seven concerns): the full millet ranking per subset, keyed by concern bitmask, plus each
+        millet's stats, themes, match percentage and relevance per concern. Only the random sample reviews
+        are left for request time.
+        """
+        masks = range(1, 1 << len(self.concerns))
+        subsets = [[concern for j, concern in enumerate(self.concerns) if mask >> j & 1] for mask in masks]
+        scores = self.score_concern_sets(subsets)
+        self._materialized = {
+            mask: [(int(position), float(row[position])) for position in np.argsort(-row, kind='stable')]
+            for mask, row in zip(masks, scores)
+        }
+        self._materialized_millets = [
+            {
+                'stats': self.get_millet_stats(millet),
+                'themes': {concern: self.extract_common_themes(millet, concern) for concern in self.concerns},
+                'match': self.get_health_concern_match(millet, self.concerns),
+                'relevance': self.get_concern_relevance(millet, self.concerns),
+            }
+            for millet in self.millets
+        ]
+
+    def concern_mask(self, health_concerns: List[str]) -> Optional[int]:
+        """Bitmask of a concern set, or None if it is empty or has unknown or repeated concerns."""
+        mask = 0
+        for concern in health_concerns:
+            index = self._concern_index.get(concern)
+            if index is None or mask >> index & 1:
+                return None
+            mask |= 1 << index
+        return mask or None
+
+    def _materialized_recommendations(self, health_concerns: List[str], top_n: int) -> Optional[List[Dict]]:
+        """Same output as _build_recommendations, from the materialized tables (None if not covered)."""
+        if self._materialized is None:
+            return None
+        mask = self.concern_mask(health_concerns)
+        if mask is None:
+            return None
+        recommendations = []
+        for position, score in self._materialized[mask][:top_n]:
+            millet = self._materialized_millets[position]
+            recommendations.append({
+                'name': self.display_names[position],
+                'millet_id': int(self.millet_ids[position]),
+                'score': score,
+                'stats': copy.deepcopy(millet['stats']),
+                'themes': [copy.deepcopy(theme) for concern in health_concerns for theme in millet['themes'][concern]],
+                'sample_reviews': self.get_sample_reviews(self.millets[position]),
+                'health_concern_match': {concern: millet['match'][concern] for concern in health_concerns},
+                'concern_relevance': (None if millet['relevance'] is None
+                                      else {concern: millet['relevance'][concern] for concern in health_concerns})
+            })
+        return recommendations
+
+    def materialized_stats(self) -> Dict:
+        """Size of the materialized results, for /debug/memory."""
+        from memory_accounting import deep_sizeof
+
+        if self._materialized is None:
+            return {'enabled': False}
+        return {
+            'enabled': True,
+            'entries': len(self._materialized),
+            'bytes': deep_sizeof(self._materialized) + deep_sizeof(self._materialized_millets),
+        }
+
+    def _millet_positions(self, millet_type: str) -> np.ndarray:
+        """Row positions of one millet's reviews (empty if unknown)."""
+        position = self._position.get(millet_type)
+        return self._rows[position] if position is not None else np.empty(0, dtype=np.intp)
+
+    def _millet_rows(self, millet_type: str) -> pd.DataFrame:
+        return self.df.iloc[self._millet_positions(millet_type)]
+
+    def score_concern_sets(self, concern_sets: Sequence[List[str]]) -> np.ndarray:
+        """Relevance scores, shape (len(concern_sets), len(self.millets)), in one vectorized pass."""
+        counts = np.zeros((len(concern_sets), len(self.concerns)))
+        index = self._concern_index
+        for i, concerns in enumerate(concern_sets):
+            for concern in concerns:
+                if concern in index:  # Unknown concerns contribute nothing, as before
+                    counts[i, index[concern]] += 1
+        return np.round(counts @ self.concern_pct.T + self.rating_bonus, 2)
+
+    def millet_key(self, recommendation: Dict) -> str:
+        """Canonical short name ('finger', 'sorghum' ...) used for retrieval, prompts and store keys."""
+        return registry.short_name(recommendation.get('millet_id', -1), recommendation['name'])
 
     def get_millet_stats(self, millet_type: str) -> Dict:
         """Get comprehensive statistics for a millet type"""
-        millet_data = self.df[self.df['millet_type'] == millet_type]
+        millet_data = self._millet_rows(millet_type)
         
         if millet_data.empty:
             return {}
@@ -43,12 +223,12 @@ class MilletRecommender:
 
     def extract_common_themes(self, millet_type: str, health_concern: str) -> List[str]:
         """Extract common themes from reviews for specific health concerns"""
-        millet_reviews = self.df[self.df['millet_type'] == millet_type]
+        rows = self._millet_positions(millet_type)
         keywords = self.health_keywords.get(health_concern, [])
         
         themes = []
         for keyword in keywords:
-            relevant_reviews = millet_reviews[millet_reviews['review'].str.contains(keyword, case=False, na=False)]
+            relevant_reviews = self.df.iloc[rows[self.keyword_masks[keyword].to_numpy()[rows]]]
             if len(relevant_reviews) > 0:
                 themes.append({
                     'theme': health_concern,
@@ -62,10 +242,8 @@ class MilletRecommender:
 
     def get_sample_reviews(self, millet_type: str, sentiment: str = 'Positive', limit: int = 3) -> List[str]:
         """Get sample reviews for a millet type"""
-        millet_reviews = self.df[
-            (self.df['millet_type'] == millet_type) & 
-            (self.df['sentiment'] == sentiment)
-        ]
+        millet_reviews = self._millet_rows(millet_type)
+        millet_reviews = millet_reviews[millet_reviews['sentiment'] == sentiment]
         
         if millet_reviews.empty:
             return ["No reviews available"]
@@ -75,75 +253,81 @@ class MilletRecommender:
 
     def calculate_millet_scores(self, health_concerns: List[str]) -> Dict[str, float]:
         """Calculate relevance scores for each millet based on health concerns"""
-        scores = {}
-        all_millets = self.df['millet_type'].unique()
-        
-        for millet in all_millets:
-            score = 0
-            millet_reviews = self.df[self.df['millet_type'] == millet]
-            
-            for concern in health_concerns:
-                keywords = self.health_keywords.get(concern, [])
-                concern_matches = 0
-                
-                for keyword in keywords:
-                    matches = millet_reviews[millet_reviews['review'].str.contains(keyword, case=False, na=False)]
-                    concern_matches += len(matches)
-                
-                # Normalize score based on total reviews
-                if len(millet_reviews) > 0:
-                    concern_score = (concern_matches / len(millet_reviews)) * 100
-                    score += concern_score
-            
-            # Add average rating bonus
-            avg_rating = millet_reviews['rating'].mean()
-            score += (avg_rating - 3) * 10  # Bonus for higher ratings
-            
-            scores[millet] = round(score, 2)
-        
-        return scores
+        scores = self.score_concern_sets([health_concerns])[0]
+        return {millet: float(score) for millet, score in zip(self.millets, scores)}
 
     def get_top_recommendations(self, health_concerns: List[str], top_n: int = 3) -> List[Dict]:
         """Get top millet recommendations with complete data"""
-        scores = self.calculate_millet_scores(health_concerns)
-        sorted_millets = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:top_n]
+        materialized = self._materialized_recommendations(health_concerns, top_n)
+        if materialized is not None:
+            return materialized
+        scores = self.score_concern_sets([health_concerns])[0]
+        return self._build_recommendations(scores, health_concerns, top_n)
+
+    def get_batch_recommendations(self, concern_sets: Sequence[List[str]], top_n: int = 3) -> List[List[Dict]]:
+        """
+        Recommendations for many concern sets at once. Identical sets are scored and built
+        once (callers must copy before mutating), and themes are shared across sets.
+        """
+        unique_sets = list(dict.fromkeys(tuple(concerns) for concerns in concern_sets))
+        score_rows = self.score_concern_sets(unique_sets)
+        theme_cache = {}
+        built = {}
+        for concerns, row in zip(unique_sets, score_rows):
+            materialized = self._materialized_recommendations(list(concerns), top_n)
+            built[concerns] = (materialized if materialized is not None
+                               else self._build_recommendations(row, list(concerns), top_n, theme_cache))
+        return [built[tuple(concerns)] for concerns in concern_sets]
+
+    def _build_recommendations(self, scores: np.ndarray, health_concerns: List[str], top_n: int,
+                               theme_cache: Dict = None) -> List[Dict]:
+        """scores[i] belongs to self.millets[i]; ties keep dataset order."""
+        top_positions = np.argsort(-scores, kind='stable')[:top_n]
         
         recommendations = []
-        for millet, score in sorted_millets:
+        for position in top_positions:
+            millet, score = self.millets[position], float(scores[position])
             stats = self.get_millet_stats(millet)
             themes = []
             for concern in health_concerns:
-                themes.extend(self.extract_common_themes(millet, concern))
+                if theme_cache is None:
+                    themes.extend(self.extract_common_themes(millet, concern))
+                    continue
+                if (millet, concern) not in theme_cache:
+                    theme_cache[(millet, concern)] = self.extract_common_themes(millet, concern)
+                themes.extend(theme_cache[(millet, concern)])
             
             recommendations.append({
-                'name': millet.title(),
+                'name': self.display_names[position],
+                'millet_id': int(self.millet_ids[position]),  # millet_registry ID (-1 if unknown)
                 'score': score,
                 'stats': stats,
                 'themes': themes,
                 'sample_reviews': self.get_sample_reviews(millet),
-                'health_concern_match': self.get_health_concern_match(millet, health_concerns)
+                'health_concern_match': self.get_health_concern_match(millet, health_concerns),
+                'concern_relevance': self.get_concern_relevance(millet, health_concerns)
             })
         
         return recommendations
 
     def get_health_concern_match(self, millet_type: str, health_concerns: List[str]) -> Dict[str, float]:
-        """Calculate match percentage for each health concern"""
-        matches = {}
-        millet_reviews = self.df[self.df['millet_type'] == millet_type]
-        total_reviews = len(millet_reviews)
-        
-        if total_reviews == 0:
+        """Calculate match percentage for each health concern (keyword mentions per 100 reviews, in every scoring mode)"""
+        return self._concern_values(self.mention_pct, millet_type, health_concerns)
+
+    def get_concern_relevance(self, millet_type: str, health_concerns: List[str]) -> Optional[Dict[str, float]]:
+        """Embedding relevance (0..100) per health concern with CONCERN_SCORING=embedding, else None."""
+        if self.relevance_pct is None:
+            return None
+        return self._concern_values(self.relevance_pct, millet_type, health_concerns)
+
+    def _concern_values(self, matrix: np.ndarray, millet_type: str, health_concerns: List[str]) -> Dict[str, float]:
+        position = self._position.get(millet_type)
+        if position is None:
             return {concern: 0 for concern in health_concerns}
         
-        for concern in health_concerns:
-            keywords = self.health_keywords.get(concern, [])
-            total_matches = 0
-            
-            for keyword in keywords:
-                matches_count = len(millet_reviews[millet_reviews['review'].str.contains(keyword, case=False, na=False)])
-                total_matches += matches_count
-            
-            match_percentage = (total_matches / total_reviews) * 100
-            matches[concern] = round(match_percentage, 1)
-        
-        return matches
\ No newline at end of file
+        row = matrix[position]
+        index = self._concern_index
+        return {
+            concern: round(float(row[index[concern]]), 1) if concern in index else 0.0
+            for concern in health_concerns
+        }
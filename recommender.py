@@ -6,6 +6,8 @@ import os
 import json
 from datetime import datetime
 
+from millet_registry import registry
+
 # --- Define File Names (in the current directory) ---
 MILLET_SUMMARY_CSV = 'millet_summary.csv'
 LOG_CSV = 'recommendation_logs.csv' # File to log recommendations made
@@ -20,6 +22,12 @@ WEIGHTS = {
     # 'price': 0.0,   # Price component currently disabled (no price data in summary)
 }
 
+# --- Millets favoured per health goal (registry IDs, so 'kangni' counts as foxtail too) ---
+GOAL_MILLET_IDS = {
+    'weight_loss': {registry.id_for('foxtail'), registry.id_for('barnyard')}, # Example
+    'diabetes': {registry.id_for('foxtail'), registry.id_for('kodo')}, # Example
+}
+
 # --- Load Millet Summary Data ---
 llm = None # Initialize llm to None
 try:
@@ -71,9 +79,7 @@ def calculate_health_score(millet_data, user_prefs):
 
     # VERY basic goal matching (replace with RAG/Nutrition DB later)
     goal = user_prefs.get('health_goal', 'general')
-    if goal == 'weight_loss' and millet_data.name.lower() in ['foxtail millet', 'barnyard millet']: # Example
-        base_score += 0.2
-    elif goal == 'diabetes' and millet_data.name.lower() in ['foxtail millet', 'kodo millet']: # Example
+    if registry.id_for(millet_data.name) in GOAL_MILLET_IDS.get(goal, ()):
         base_score += 0.2
     # Add more rules based on the PDF content
 
@@ -0,0 +1,296 @@
+# sentiment_classifier.py
+# Local fast path for extract_sentiment_aspects_groq.py.
+# A TF-IDF + logistic regression model trained on earlier Groq outputs (SentimentAspects rows)
+# predicts the same fields: sentiment label/score, taste score, cooking time, mention flags and
+# keywords. The dataset's lexicon 'sentiment' column is added as an extra token feature.
+# Reviews whose least confident prediction is below the threshold still go to the LLM.
+#
+# Example:
+#   python sentiment_classifier.py --train                 # Fit on the LLM outputs, report held-out agreement
+#   python sentiment_classifier.py --evaluate --threshold 0.9
+#   python extract_sentiment_aspects_groq.py --fast-path   # Only low-confidence reviews hit Groq
+
+import argparse
+import json
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression, Ridge
+from sklearn.model_selection import train_test_split
+
+LLM_OUTPUT_CSV = 'millet_review_sentiments_groq.csv'  # Training labels (extract_sentiment_aspects_groq.py output)
+PROCESSED_CSV = 'final_processed_dataset.csv'  # Review text and lexicon sentiment
+MODEL_PATH = 'sentiment_fastpath.joblib'
+
+# Bump when the features or the stored layout change; older model files are rejected
+MODEL_VERSION = 1
+DEFAULT_THRESHOLD = 0.85
+MIN_WORDS = 2  # Shorter reviews are skipped by process_batch too
+FLAG_COLUMNS = ['texture_mentioned', 'health_benefit_mentioned', 'price_mentioned']
+COOKING_TIME_LABELS = ['fast', 'slow', 'average', 'not mentioned']
+THRESHOLD_SWEEP = [0.6, 0.7, 0.8, 0.85, 0.9, 0.95]
+
+
+def _with_lexicon(texts, lexicon=None) -> list:
+    """Review text plus a 'lexicon_<label>' token carrying the dataset's lexicon sentiment."""
+    texts = ['' if pd.isna(text) else str(text) for text in texts]
+    if lexicon is None:
+        return texts
+    return [f"{text} lexicon_{str(label).lower()}" if not pd.isna(label) else text
+            for text, label in zip(texts, lexicon)]
+
+
+def _as_bool(series: pd.Series) -> np.ndarray:
+    """LLM flags come back as True / False / null (read as NaN or strings); null means not mentioned."""
+    return series.map(lambda v: str(v).strip().lower() == 'true').to_numpy()
+
+
+def _fit_classifier(X, y):
+    """LogisticRegression, or the single class as a constant when the labels never vary."""
+    classes = np.unique(y)
+    if len(classes) < 2:
+        return classes[0]
+    model = LogisticRegression(max_iter=1000, class_weight='balanced')
+    model.fit(X, y)
+    return model
+
+
+def _class_proba(model, X, classes) -> np.ndarray:
+    """(rows x len(classes)) probabilities in the given class order."""
+    proba = np.zeros((X.shape[0], len(classes)))
+    if isinstance(model, LogisticRegression):
+        predicted = model.predict_proba(X)
+        for column, cls in enumerate(model.classes_):
+            proba[:, list(classes).index(cls)] = predicted[:, column]
+    else:
+        proba[:, list(classes).index(model)] = 1.0
+    return proba
+
+
+class SentimentFastPath:
+    def __init__(self, vectorizer, label_model, label_scores: dict, flag_models: dict,
+                 taste_model, taste_regressor, cooking_model):
+        self.vectorizer = vectorizer
+        self.label_model = label_model
+        self.label_scores = label_scores  # Mean LLM sentiment_score per label
+        self.flag_models = flag_models
+        self.taste_model = taste_model  # Taste mentioned at all (LLM gave a taste_score)
+        self.taste_regressor = taste_regressor
+        self.cooking_model = cooking_model
+        self.labels = list(label_scores)
+        vocabulary = self.vectorizer.get_feature_names_out()
+        self._keyword_terms = np.array([' ' not in term and not term.startswith('lexicon_') for term in vocabulary])
+        self._vocabulary = vocabulary
+
+    @classmethod
+    def train(cls, df: pd.DataFrame) -> 'SentimentFastPath':
+        """df: one row per review with clean_review, optional lexicon 'sentiment' and the LLM's fields."""
+        vectorizer = TfidfVectorizer(ngram_range=(1, 2), min_df=2, sublinear_tf=True)
+        X = vectorizer.fit_transform(_with_lexicon(df['clean_review'], df.get('sentiment')))
+
+        labels = df['sentiment_label'].astype(str).to_numpy()
+        scores = pd.to_numeric(df['sentiment_score'], errors='coerce')
+        label_scores = {label: float(scores[labels == label].mean()) if (labels == label).any() else 0.5
+                        for label in ['positive', 'neutral', 'negative']}
+        label_scores = {label: (0.5 if np.isnan(score) else score) for label, score in label_scores.items()}
+
+        flag_models = {column: _fit_classifier(X, _as_bool(df[column])) for column in FLAG_COLUMNS}
+
+        taste = pd.to_numeric(df['taste_score'], errors='coerce')
+        taste_mentioned = taste.notna().to_numpy()
+        taste_regressor = None
+        if taste_mentioned.any():
+            taste_regressor = Ridge(alpha=1.0).fit(X[taste_mentioned], taste[taste_mentioned].to_numpy())
+
+        cooking = df['cooking_time_mention'].where(df['cooking_time_mention'].isin(COOKING_TIME_LABELS), 'not mentioned')
+
+        return cls(
+            vectorizer=vectorizer,
+            label_model=_fit_classifier(X, labels),
+            label_scores=label_scores,
+            flag_models=flag_models,
+            taste_model=_fit_classifier(X, taste_mentioned),
+            taste_regressor=taste_regressor,
+            cooking_model=_fit_classifier(X, cooking.to_numpy()),
+        )
+
+    def _keywords(self, X, top_n: int = 5) -> list:
+        """Highest-weighted single words of each review (stands in for the LLM's extracted_keywords)."""
+        keywords = []
+        for row in range(X.shape[0]):
+            start, end = X.indptr[row], X.indptr[row + 1]
+            indices, weights = X.indices[start:end], X.data[start:end]
+            keep = self._keyword_terms[indices]
+            indices, weights = indices[keep], weights[keep]
+            order = np.argsort(-weights, kind='stable')[:top_n]
+            keywords.append([str(term) for term in self._vocabulary[indices[order]]])
+        return keywords
+
+    def predict(self, texts, lexicon=None):
+        """
+        Returns (outputs, confidence): one SentimentAspects-shaped dict per review, and the lowest
+        of its per-field confidences (probability of the chosen class) as a float array.
+        """
+        X = self.vectorizer.transform(_with_lexicon(texts, lexicon))
+        label_proba = _class_proba(self.label_model, X, self.labels)
+        confidences = [label_proba.max(axis=1)]
+
+        flag_proba = {}
+        for column, model in self.flag_models.items():
+            p = _class_proba(model, X, [False, True])[:, 1]
+            flag_proba[column] = p
+            confidences.append(np.maximum(p, 1 - p))
+
+        taste_p = _class_proba(self.taste_model, X, [False, True])[:, 1]
+        confidences.append(np.maximum(taste_p, 1 - taste_p))
+        taste_scores = (np.clip(self.taste_regressor.predict(X), 0.0, 1.0)
+                        if self.taste_regressor is not None else np.full(X.shape[0], 0.5))
+
+        cooking_proba = _class_proba(self.cooking_model, X, COOKING_TIME_LABELS)
+        confidences.append(cooking_proba.max(axis=1))
+
+        # Expected LLM score under the predicted label distribution
+        sentiment_scores = label_proba @ np.array([self.label_scores[label] for label in self.labels])
+        keywords = self._keywords(X)
+
+        outputs = []
+        for row in range(X.shape[0]):
+            outputs.append({
+                'sentiment_label': self.labels[int(label_proba[row].argmax())],
+                'sentiment_score': round(float(sentiment_scores[row]), 3),
+                'taste_score': round(float(taste_scores[row]), 3) if taste_p[row] >= 0.5 else None,
+                'texture_mentioned': bool(flag_proba['texture_mentioned'][row] >= 0.5),
+                'cooking_time_mention': COOKING_TIME_LABELS[int(cooking_proba[row].argmax())],
+                'health_benefit_mentioned': bool(flag_proba['health_benefit_mentioned'][row] >= 0.5),
+                'price_mentioned': bool(flag_proba['price_mentioned'][row] >= 0.5),
+                'extracted_keywords': keywords[row],
+            })
+        return outputs, np.min(np.vstack(confidences), axis=0)
+
+    def save(self, path: str = MODEL_PATH):
+        joblib.dump({'version': MODEL_VERSION, 'model': self}, path)
+
+    @classmethod
+    def load(cls, path: str = MODEL_PATH) -> 'SentimentFastPath':
+        payload = joblib.load(path)
+        if payload.get('version') != MODEL_VERSION:
+            raise ValueError(f"{path} was written by model version {payload.get('version')}, "
+                             f"expected {MODEL_VERSION}; retrain with --train")
+        return payload['model']
+
+
+def eligible(texts) -> np.ndarray:
+    """Reviews the extraction script actually processes (non-empty, at least MIN_WORDS words)."""
+    return np.array([isinstance(text, str) and len(text.split()) >= MIN_WORDS for text in texts], dtype=bool)
+
+
+def load_training_data(llm_csv: str = LLM_OUTPUT_CSV, processed_csv: str = PROCESSED_CSV) -> pd.DataFrame:
+    """LLM outputs joined with their review text; locally labelled and propagated rows are left out."""
+    llm_df = pd.read_csv(llm_csv)
+    if 'extraction_source' in llm_df.columns:
+        llm_df = llm_df[llm_df['extraction_source'] != 'local']
+    if 'propagated_from' in llm_df.columns:  # Copies of a near-duplicate's labels (near_duplicates.py)
+        llm_df = llm_df[llm_df['propagated_from'].isna()]
+    text_columns = ['review_id', 'clean_review'] + (['sentiment'] if 'sentiment' in pd.read_csv(processed_csv, nrows=0).columns else [])
+    processed = pd.read_csv(processed_csv, usecols=text_columns)
+    df = llm_df.merge(processed, on='review_id', how='inner')
+    df = df[df['sentiment_label'].isin(['positive', 'neutral', 'negative'])]
+    return df[eligible(df['clean_review'])].reset_index(drop=True)
+
+
+def evaluate(model: SentimentFastPath, df: pd.DataFrame, threshold: float) -> dict:
+    """Agreement with the LLM labels in df, overall and on the reviews the fast path would keep."""
+    start = time.perf_counter()
+    outputs, confidence = model.predict(df['clean_review'], df.get('sentiment'))
+    elapsed = time.perf_counter() - start
+
+    predicted = np.array([output['sentiment_label'] for output in outputs])
+    truth = df['sentiment_label'].astype(str).to_numpy()
+    label_match = predicted == truth
+    flag_match = {column: np.array([output[column] for output in outputs]) == _as_bool(df[column])
+                  for column in FLAG_COLUMNS}
+
+    def agreement(mask):
+        if not mask.any():
+            return {'reviews': 0}
+        return {
+            'reviews': int(mask.sum()),
+            'sentiment_label': round(float(label_match[mask].mean()), 4),
+            **{column: round(float(match[mask].mean()), 4) for column, match in flag_match.items()},
+        }
+
+    local = confidence >= threshold
+    return {
+        'reviews': len(df),
+        'threshold': threshold,
+        'throughput_reviews_per_second': round(len(df) / elapsed, 1) if elapsed > 0 else None,
+        'llm_calls_saved': int(local.sum()),
+        'llm_calls_saved_pct': round(float(local.mean()) * 100, 2) if len(df) else 0.0,
+        'agreement_all': agreement(np.ones(len(df), dtype=bool)),
+        'agreement_local': agreement(local),
+        'agreement_routed_to_llm': agreement(~local),
+        'threshold_sweep': [
+            {'threshold': t, 'llm_calls_saved_pct': round(float((confidence >= t).mean()) * 100, 2),
+             'label_agreement_local': agreement(confidence >= t).get('sentiment_label')}
+            for t in THRESHOLD_SWEEP
+        ],
+    }
+
+
+def print_report(report: dict):
+    print(f"Reviews: {report['reviews']}  |  throughput: {report['throughput_reviews_per_second']} reviews/s")
+    print(f"Threshold {report['threshold']}: {report['llm_calls_saved']} LLM calls saved "
+          f"({report['llm_calls_saved_pct']}%)")
+    for name in ['agreement_all', 'agreement_local', 'agreement_routed_to_llm']:
+        print(f"  {name}: {report[name]}")
+    print("Threshold sweep (calls saved % / label agreement on locally labelled reviews):")
+    for entry in report['threshold_sweep']:
+        print(f"  {entry['threshold']:.2f}: {entry['llm_calls_saved_pct']:6.2f}%  {entry['label_agreement_local']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train / evaluate the local sentiment fast path")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument('--train', action='store_true', help="Fit on the LLM outputs and save the model")
+    mode.add_argument('--evaluate', action='store_true', help="Score the saved model against all LLM outputs")
+    parser.add_argument('--llm-csv', default=LLM_OUTPUT_CSV)
+    parser.add_argument('--processed-csv', default=PROCESSED_CSV)
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--holdout', type=float, default=0.2, help="With --train: fraction held out for the report")
+    parser.add_argument('--output', help="Also write the report as JSON")
+    args = parser.parse_args()
+
+    for path in (args.llm_csv, args.processed_csv):
+        if not os.path.exists(path):
+            parser.error(f"{path} not found")
+    df = load_training_data(args.llm_csv, args.processed_csv)
+    print(f"Loaded {len(df)} LLM-labelled reviews.")
+
+    if args.train:
+        train_df, test_df = train_test_split(df, test_size=args.holdout, random_state=42,
+                                             stratify=df['sentiment_label'] if df['sentiment_label'].nunique() > 1 else None)
+        model = SentimentFastPath.train(train_df)
+        report = evaluate(model, test_df.reset_index(drop=True), args.threshold)
+        print("Held-out evaluation:")
+        print_report(report)
+        # The saved model uses every labelled review
+        SentimentFastPath.train(df).save(args.model)
+        print(f"Model saved to {args.model}")
+    else:
+        report = evaluate(SentimentFastPath.load(args.model), df, args.threshold)
+        print("Evaluation (includes reviews the model was trained on):")
+        print_report(report)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,12 @@
 # setup_rag_vectorstore.py
 # Loads the millet nutrition PDF, splits it, creates embeddings (using FREE local model),
 # and saves to a local Chroma vector store.
+# Use --corpus-dir to ingest a directory of PDFs in parallel, --incremental to only embed changes.
 
 import os
 import time
+import hashlib
+import argparse
 from dotenv import load_dotenv
 
 # --- LangChain Imports ---
@@ -12,8 +15,11 @@ try:
     # Use external package with no spacy requirement for basic splitters
     from langchain_text_splitters import RecursiveCharacterTextSplitter
     from langchain_community.vectorstores import Chroma
-    # Use FREE local embeddings instead of OpenAI
-    from langchain_community.embeddings import HuggingFaceEmbeddings
+    # Use FREE local embeddings instead of OpenAI (HuggingFace or ONNX, see Config.EMBEDDING_BACKEND)
+    from embedding_backends import load_embeddings
+    from config import Config
+    from millet_tags import TAGGER_VERSION, add_millet_tags
+    from hybrid_retriever import build_hybrid_index
     print("Successfully imported LangChain components.")
 except ImportError as e:
     print(f"Import Error: {e}")
@@ -26,31 +32,35 @@ PDF_PATH = 'Nutritional_health_benefits_millets.pdf'
 VECTORSTORE_PATH = 'chroma_vector_db'
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 150
+EMBED_BATCH_SIZE = 256  # Chunks embedded per call in incremental mode
+EMBED_BATCH_PER_CORE = 32  # Corpus mode: embedding batch = this x CPU cores
 # Using a FREE local embedding model
-EMBEDDING_MODEL = "all-MiniLM-L6-v2"  # Lightweight, effective model
+EMBEDDING_MODEL = Config.EMBEDDING_MODEL  # all-MiniLM-L6-v2: lightweight, effective model
 
 # --- Initialize FREE Local Embedding Model ---
-embeddings = None
-try:
-    embeddings = HuggingFaceEmbeddings(
-        model_name=EMBEDDING_MODEL,
-        model_kwargs={'device': 'cpu'},  # Use CPU to avoid GPU issues
-        encode_kwargs={'normalize_embeddings': False}
-    )
-    print(f"Initialized FREE Local Embeddings ('{EMBEDDING_MODEL}').")
-except Exception as e:
-    print(f"Error initializing local embeddings: {e}.")
-    print("Trying to install required packages...")
+# Done from __main__ (not at import) so corpus-mode worker processes don't each load the model.
+def initialize_embeddings():
     try:
-        import subprocess
-        subprocess.check_call(["pip", "install", "sentence-transformers", "torch"])
-        # Try again after install
-        from langchain_community.embeddings import HuggingFaceEmbeddings
-        embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
-        print("Successfully installed and initialized local embeddings.")
-    except Exception as install_error:
-        print(f"Failed to install required packages: {install_error}")
-        exit()
+        embedding_function = load_embeddings()  # Runs on CPU for both backends
+        print(f"Initialized FREE Local Embeddings ('{EMBEDDING_MODEL}', backend '{Config.EMBEDDING_BACKEND}').")
+        return embedding_function
+    except Exception as e:
+        print(f"Error initializing local embeddings: {e}.")
+        if Config.EMBEDDING_BACKEND != 'huggingface':
+            print("Run export_onnx_embedder.py to create the ONNX model, or set EMBEDDING_BACKEND=huggingface.")
+            return None
+        print("Trying to install required packages...")
+        try:
+            import subprocess
+            subprocess.check_call(["pip", "install", "sentence-transformers", "torch"])
+            # Try again after install
+            from langchain_community.embeddings import HuggingFaceEmbeddings
+            embedding_function = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+            print("Successfully installed and initialized local embeddings.")
+            return embedding_function
+        except Exception as install_error:
+            print(f"Failed to install required packages: {install_error}")
+            return None
 
 def load_and_split_pdf(pdf_path, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
     """Loads PDF and splits it into text chunks."""
@@ -77,11 +87,12 @@ def load_and_split_pdf(pdf_path, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVER
         print(f"Error loading or splitting PDF: {e}")
         return None
 
-    # Add page number metadata
+    # Add page number metadata and tag the millets each chunk discusses
     for chunk in chunks:
         if 'page' not in chunk.metadata:
             chunk.metadata['page'] = -1
         chunk.metadata['source_page'] = chunk.metadata.get('page', -1) + 1
+        add_millet_tags(chunk.metadata, chunk.page_content)
 
     return chunks
 
@@ -101,10 +112,13 @@ def create_and_save_vectorstore(chunks, embedding_function, persist_directory):
             import shutil
             shutil.rmtree(persist_directory)
 
+        # Chroma rejects repeated ids, and identical chunks from the same page hash alike
+        current = unique_chunks(chunks, embedding_function)
         vectorstore = Chroma.from_documents(
-            documents=chunks,
+            documents=list(current.values()),
             embedding=embedding_function,
-            persist_directory=persist_directory
+            persist_directory=persist_directory,
+            ids=list(current)  # Lets later incremental runs reuse them
         )
         end_time = time.time()
         print(f"Vector store created and persisted successfully in {end_time - start_time:.2f} seconds.")
@@ -114,26 +128,239 @@ def create_and_save_vectorstore(chunks, embedding_function, persist_directory):
         print(f"Error creating Chroma vector store: {e}")
         return None
 
+def chunk_id(chunk, embedding_function, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+    """Content hash of a chunk: text + splitter params + embedding model (+ source page, tagger version)."""
+    model_name = getattr(embedding_function, 'model_name', EMBEDDING_MODEL)
+    source = os.path.basename(str(chunk.metadata.get('source', '')))
+    key = "|".join([
+        model_name, str(chunk_size), str(chunk_overlap), f"tags-v{TAGGER_VERSION}",
+        source, str(chunk.metadata.get('source_page', '')),
+        chunk.page_content
+    ])
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+def unique_chunks(chunks, embedding_function) -> dict:
+    """chunk_id -> chunk, keeping the first of any chunks that hash to the same id."""
+    current = {}
+    for chunk in chunks:
+        current.setdefault(chunk_id(chunk, embedding_function), chunk)
+    return current
+
+def update_vectorstore_incrementally(chunks, embedding_function, persist_directory, batch_size=EMBED_BATCH_SIZE):
+    """
+    Brings an existing Chroma store in line with `chunks` without rebuilding it:
+    only chunks whose hash is new get embedded, chunks that disappeared are deleted,
+    and everything else is left in place so the serving index stays usable throughout.
+    """
+    if not chunks or embedding_function is None:
+        print("Error: Cannot update vector store without chunks or embedding function.")
+        return None
+
+    start_time = time.time()
+    try:
+        vectorstore = Chroma(persist_directory=persist_directory, embedding_function=embedding_function)
+        existing_ids = set(vectorstore.get(include=[])['ids'])
+
+        # Identical chunks hash to the same id; keep the first occurrence
+        current = unique_chunks(chunks, embedding_function)
+
+        new_ids = [cid for cid in current if cid not in existing_ids]
+        removed_ids = [cid for cid in existing_ids if cid not in current]
+        print(f"Incremental update: {len(current)} chunks, {len(new_ids)} new, "
+              f"{len(removed_ids)} removed, {len(current) - len(new_ids)} unchanged.")
+
+        # Add before deleting so queries never see a half-empty index
+        for i in range(0, len(new_ids), batch_size):
+            batch_ids = new_ids[i:i + batch_size]
+            batch = [current[cid] for cid in batch_ids]
+            vectorstore.add_texts(
+                texts=[doc.page_content for doc in batch],
+                metadatas=[doc.metadata for doc in batch],
+                ids=batch_ids
+            )
+            print(f"Embedded {min(i + batch_size, len(new_ids))}/{len(new_ids)} new chunks...")
+
+        for i in range(0, len(removed_ids), batch_size):
+            vectorstore.delete(ids=removed_ids[i:i + batch_size])
+
+        print(f"Incremental update finished in {time.time() - start_time:.2f} seconds.")
+        return vectorstore
+    except Exception as e:
+        print(f"Error updating Chroma vector store: {e}")
+        print("If the embedding model dimension changed, run a full rebuild instead.")
+        return None
+
+def _split_pdf_worker(pdf_path, chunk_size, chunk_overlap):
+    """Process-pool task: parse and split one PDF, returning its chunks and parse time."""
+    start = time.time()
+    chunks = load_and_split_pdf(pdf_path, chunk_size, chunk_overlap) or []
+    return pdf_path, chunks, time.time() - start
+
+def ingest_corpus(pdf_paths, embedding_function, persist_directory, workers=None,
+                  batch_size=None, incremental=False):
+    """
+    Ingests a directory's worth of PDFs.
+    PDFs are parsed and split across a process pool; their chunks are streamed into a bounded
+    queue that a single writer thread drains in large batches (embed + bulk write to Chroma),
+    so parsing and embedding overlap. With `incremental`, chunks already in the store are
+    skipped and ids no longer produced by any PDF are deleted at the end.
+    """
+    import queue
+    import shutil
+    import threading
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    if not pdf_paths or embedding_function is None:
+        print("Error: Cannot ingest corpus without PDFs or embedding function.")
+        return None
+
+    cpu_count = os.cpu_count() or 1
+    workers = workers or max(1, cpu_count - 1)  # Leave a core for the embedding writer
+    batch_size = batch_size or EMBED_BATCH_PER_CORE * cpu_count
+
+    if not incremental and os.path.exists(persist_directory):
+        print(f"Note: Directory '{persist_directory}' already exists. Overwriting.")
+        shutil.rmtree(persist_directory)
+
+    vectorstore = Chroma(persist_directory=persist_directory, embedding_function=embedding_function)
+    existing_ids = set(vectorstore.get(include=[])['ids']) if incremental else set()
+    seen_ids = set()
+    stats = {'chunks': 0, 'embedded': 0, 'unchanged': 0, 'deleted': 0, 'embed_seconds': 0.0}
+
+    batches = queue.Queue(maxsize=4)  # Backpressure: parsers wait if embedding falls behind
+    writer_errors = []
+
+    def writer():
+        while True:
+            batch = batches.get()
+            if batch is None:
+                return
+            try:
+                start = time.time()
+                vectorstore.add_texts(
+                    texts=[doc.page_content for _, doc in batch],
+                    metadatas=[doc.metadata for _, doc in batch],
+                    ids=[cid for cid, _ in batch]
+                )
+                stats['embed_seconds'] += time.time() - start
+                stats['embedded'] += len(batch)
+            except Exception as e:
+                writer_errors.append(e)
+
+    writer_thread = threading.Thread(target=writer, daemon=True)
+    writer_thread.start()
+
+    print(f"Ingesting {len(pdf_paths)} PDFs with {workers} parser processes, embedding batches of {batch_size}...")
+    start_time = time.time()
+    pending = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_split_pdf_worker, path, CHUNK_SIZE, CHUNK_OVERLAP) for path in pdf_paths]
+        for done, future in enumerate(as_completed(futures), start=1):
+            pdf_path, chunks, parse_seconds = future.result()
+            new_in_doc = 0
+            for chunk in chunks:
+                cid = chunk_id(chunk, embedding_function)
+                if cid in seen_ids:
+                    continue
+                seen_ids.add(cid)
+                if cid in existing_ids:
+                    stats['unchanged'] += 1
+                    continue
+                pending.append((cid, chunk))
+                new_in_doc += 1
+                if len(pending) >= batch_size:
+                    batches.put(pending)
+                    pending = []
+            stats['chunks'] += len(chunks)
+            elapsed = time.time() - start_time
+            print(f"[{done}/{len(pdf_paths)}] {os.path.basename(pdf_path)}: {len(chunks)} chunks "
+                  f"({new_in_doc} new) parsed in {parse_seconds:.1f}s | "
+                  f"{done / elapsed:.2f} docs/s, {stats['embedded']} chunks embedded so far")
+
+    if pending:
+        batches.put(pending)
+    batches.put(None)
+    writer_thread.join()
+    if writer_errors:
+        print(f"Error writing to Chroma vector store: {writer_errors[0]}")
+        return None
+
+    if incremental:
+        removed_ids = list(existing_ids - seen_ids)
+        for i in range(0, len(removed_ids), batch_size):
+            vectorstore.delete(ids=removed_ids[i:i + batch_size])
+        stats['deleted'] = len(removed_ids)
+
+    total_seconds = time.time() - start_time
+    embed_rate = stats['embedded'] / stats['embed_seconds'] if stats['embed_seconds'] else 0.0
+    print(f"Corpus ingestion finished in {total_seconds:.2f} seconds: {len(pdf_paths)} PDFs, "
+          f"{stats['chunks']} chunks, {stats['embedded']} embedded, {stats['unchanged']} unchanged, "
+          f"{stats['deleted']} deleted.")
+    print(f"Throughput: {len(pdf_paths) / total_seconds:.2f} docs/s, {stats['chunks'] / total_seconds:.1f} chunks/s overall, "
+          f"{embed_rate:.1f} chunks/s embedding.")
+    return vectorstore
+
 if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Build the Chroma vector store from the millet PDF")
+    arg_parser.add_argument('--incremental', action='store_true',
+                            help="Embed only new/changed chunks and delete removed ones instead of rebuilding")
+    arg_parser.add_argument('--batch-size', type=int, default=None,
+                            help=f"Chunks per embedding call (default {EMBED_BATCH_SIZE}, "
+                                 f"or {EMBED_BATCH_PER_CORE} x CPU cores with --corpus-dir)")
+    arg_parser.add_argument('--corpus-dir', default=None,
+                            help="Ingest every PDF in this directory in parallel instead of PDF_PATH")
+    arg_parser.add_argument('--workers', type=int, default=None,
+                            help="Parser processes for --corpus-dir (default: CPU cores - 1)")
+    cli_args = arg_parser.parse_args()
+
     print("--- Starting RAG Vector Store Setup Script (Using FREE Local Embeddings) ---")
 
+    embeddings = initialize_embeddings()
     if embeddings is None:
         print("Error: Embedding model not initialized. Exiting.")
         exit()
 
-    # 1. Load and Split PDF
-    pdf_chunks = load_and_split_pdf(PDF_PATH)
-
-    # 2. Create and Save Vector Store
-    if pdf_chunks:
-        vector_db = create_and_save_vectorstore(
-            chunks=pdf_chunks,
-            embedding_function=embeddings,
-            persist_directory=VECTORSTORE_PATH
+    # 1. Load and Split PDF, 2. Create and Save Vector Store
+    vector_db = None
+    if cli_args.corpus_dir:
+        # Whole corpus: parsing and embedding are streamed straight into the store
+        corpus_pdfs = sorted(
+            os.path.join(cli_args.corpus_dir, name) for name in os.listdir(cli_args.corpus_dir)
+            if name.lower().endswith('.pdf')
+        )
+        have_input = bool(corpus_pdfs)
+        vector_db = ingest_corpus(
+            corpus_pdfs, embeddings, VECTORSTORE_PATH,
+            workers=cli_args.workers,
+            batch_size=cli_args.batch_size,
+            incremental=cli_args.incremental
         )
+    else:
+        pdf_chunks = load_and_split_pdf(PDF_PATH)
+        have_input = bool(pdf_chunks)
+        if pdf_chunks and cli_args.incremental and os.path.exists(VECTORSTORE_PATH):
+            vector_db = update_vectorstore_incrementally(
+                chunks=pdf_chunks,
+                embedding_function=embeddings,
+                persist_directory=VECTORSTORE_PATH,
+                batch_size=cli_args.batch_size or EMBED_BATCH_SIZE
+            )
+        elif pdf_chunks:
+            vector_db = create_and_save_vectorstore(
+                chunks=pdf_chunks,
+                embedding_function=embeddings,
+                persist_directory=VECTORSTORE_PATH
+            )
 
+    if have_input:
         if vector_db:
             print("\n--- Vector Store Setup Complete ---")
+            # Lexical index + embedding matrix for hybrid retrieval, snapshotted from the final collection
+            try:
+                indexed = build_hybrid_index(vector_db, Config.HYBRID_INDEX_PATH)
+                print(f"Hybrid (BM25 + dense) index built over {indexed} chunks in {os.path.abspath(Config.HYBRID_INDEX_PATH)}")
+            except Exception as index_e:
+                print(f"Warning: Could not build hybrid index: {index_e}")
             # Test the vector store
             try:
                 print("\nTesting vector store with a sample query ('health benefits of ragi')...")
@@ -153,4 +380,4 @@ if __name__ == "__main__":
         else:
             print("\n--- Vector Store Creation Failed ---")
     else:
-        print("\n--- Script Failed: Could not load or split PDF ---")
\ No newline at end of file
+        print("\n--- Script Failed: Could not load or split PDF(s) ---")
\ No newline at end of file
@@ -0,0 +1,120 @@
+# static_assets.py
+# In-memory serving of the frontend with precompressed variants and conditional GET.
+# Only the frontend files are exposed (never the CSVs or code in the repo root).
+#  - After `python build_static.py`: content-hashed files from static_build/, cached for a year.
+#  - Without a build: index.html / style.css / script.js from source, revalidated on every use.
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+from typing import Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from build_static import BUILD_DIR, HASHED_ASSETS, INDEX_FILE, MANIFEST_FILE
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"  # May be stored, but must be revalidated (cheap 304 via ETag)
+ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+def _etag_matches(request: Request, etags) -> bool:
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    candidates = {tag.strip().removeprefix('W/') for tag in header.split(',')}
+    return bool(candidates & set(etags))
+
+
+def _preferred_encodings(request: Request):
+    """Encodings the client accepts, best first (q-values other than 0 are treated as equal)."""
+    accepted = set()
+    for part in request.headers.get('accept-encoding', '').split(','):
+        name, _, params = part.strip().partition(';')
+        if name and params.replace(' ', '') not in ('q=0', 'q=0.0'):
+            accepted.add(name.lower())
+    return [enc for enc in ('br', 'gzip') if enc in accepted]
+
+
+class CachedAsset:
+    """One logical asset with its identity/gzip/brotli bodies and per-variant ETags."""
+
+    def __init__(self, variants: Dict[str, bytes], media_type: str, cache_control: str):
+        self.variants = variants
+        self.media_type = media_type
+        self.cache_control = cache_control
+        digest = hashlib.sha256(variants['identity']).hexdigest()[:16]
+        self.etags = {enc: f'"{digest}-{enc}"' if enc != 'identity' else f'"{digest}"' for enc in variants}
+
+    @classmethod
+    def from_bytes(cls, data: bytes, media_type: str, cache_control: str) -> 'CachedAsset':
+        return cls({'identity': data, 'gzip': gzip.compress(data, mtime=0)}, media_type, cache_control)
+
+    def respond(self, request: Request) -> Response:
+        encoding = next((enc for enc in _preferred_encodings(request) if enc in self.variants), 'identity')
+        headers = {
+            'ETag': self.etags[encoding],
+            'Cache-Control': self.cache_control,
+            'Vary': 'Accept-Encoding',
+        }
+        if _etag_matches(request, self.etags.values()):
+            return Response(status_code=304, headers=headers)
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        return Response(content=self.variants[encoding], media_type=self.media_type, headers=headers)
+
+
+class StaticAssets:
+    def __init__(self, source_dir: str = '.', build_dir: str = BUILD_DIR):
+        self.assets: Dict[str, CachedAsset] = {}
+        manifest_path = os.path.join(build_dir, MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            self._load_build(build_dir, manifest_path)
+        else:
+            print(f"Note: no {build_dir}/ found; serving unhashed frontend files. Run build_static.py for production.")
+            self._load_sources(source_dir)
+
+    def _load_build(self, build_dir: str, manifest_path: str):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        for logical_name, built_name in manifest.items():
+            path = os.path.join(build_dir, built_name)
+            variants = {'identity': self._read(path)}
+            for encoding, suffix in ENCODING_SUFFIXES.items():
+                if os.path.exists(path + suffix):
+                    variants[encoding] = self._read(path + suffix)
+            cache = REVALIDATE_CACHE if logical_name == INDEX_FILE else IMMUTABLE_CACHE
+            self.assets[built_name] = CachedAsset(variants, self._media_type(built_name), cache)
+
+    def _load_sources(self, source_dir: str):
+        for name in [INDEX_FILE] + HASHED_ASSETS:
+            data = self._read(os.path.join(source_dir, name))
+            self.assets[name] = CachedAsset.from_bytes(data, self._media_type(name), REVALIDATE_CACHE)
+
+    @staticmethod
+    def _read(path: str) -> bytes:
+        with open(path, 'rb') as f:
+            return f.read()
+
+    @staticmethod
+    def _media_type(name: str) -> str:
+        media_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        return f"{media_type}; charset=utf-8" if media_type.startswith('text/') or name.endswith('.js') else media_type
+
+    def get(self, name: str) -> Optional[CachedAsset]:
+        return self.assets.get(name)
+
+    @property
+    def index(self) -> CachedAsset:
+        return self.assets[INDEX_FILE]
+
+
+def json_asset(payload) -> CachedAsset:
+    """Pre-serialised JSON API response that supports ETag / If-None-Match."""
+    data = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return CachedAsset.from_bytes(data, 'application/json', "public, max-age=300")
@@ -0,0 +1,97 @@
+# structured_output.py
+# Schema, parsing and rendering for the single-call "structured" LLM mode:
+# one JSON document carries the combined summary plus every millet's benefit sections.
+# Rendering goes back through the same markdown shape the per-call prompts produce, so
+# MilletRAGEngine.format_llm_output_to_html turns both into identical cards.
+
+import json
+import re
+from typing import Dict, List
+
+from pydantic import BaseModel
+
+
+class RecommendedMillet(BaseModel):
+    name: str
+    reason: str
+
+
+class MilletBenefits(BaseModel):
+    name: str
+    key_health_benefits: List[str]
+    how_it_helps: List[str]
+    nutritional_highlights: List[str]
+    usage_tips: List[str]
+
+
+class StructuredRecommendation(BaseModel):
+    recommended_millets: List[RecommendedMillet]
+    key_benefits: List[str]
+    usage_tips: List[str]
+    important_notes: List[str]
+    millets: List[MilletBenefits]
+
+
+def json_skeleton(millet_names: List[str]) -> str:
+    """Example document shown to the model, already filled with the millet names."""
+    skeleton = {
+        "recommended_millets": [{"name": name, "reason": "key reason relative to user needs"} for name in millet_names],
+        "key_benefits": ["benefit 1", "benefit 2", "benefit 3"],
+        "usage_tips": ["tip for getting started", "tip for best results", "tip for variety"],
+        "important_notes": ["Consult healthcare professional", "Start gradually", "Individual results may vary"],
+        "millets": [
+            {
+                "name": name,
+                "key_health_benefits": ["benefit with brief explanation", "...", "..."],
+                "how_it_helps": ["mechanism 1", "mechanism 2"],
+                "nutritional_highlights": ["key nutrient and benefit", "..."],
+                "usage_tips": ["practical tip 1", "practical tip 2", "practical tip 3"],
+            }
+            for name in millet_names
+        ],
+    }
+    return json.dumps(skeleton, indent=2)
+
+
+def parse_structured_response(text: str, millet_names: List[str]) -> StructuredRecommendation:
+    """
+    Extracts the JSON object from the model output and validates it.
+    Raises ValueError (or pydantic's ValidationError) if anything is missing.
+    """
+    match = re.search(r'\{.*\}', text or '', re.DOTALL)
+    if not match:
+        raise ValueError("No JSON object in LLM response")
+    result = StructuredRecommendation.parse_obj(json.loads(match.group(0)))
+
+    covered = {m.name.strip().lower() for m in result.millets}
+    missing = [name for name in millet_names if name.strip().lower() not in covered]
+    if missing:
+        raise ValueError(f"LLM response has no benefits for: {', '.join(missing)}")
+    return result
+
+
+def _bullets(items: List[str]) -> str:
+    return '\n'.join(f"- {item}" for item in items if item and item.strip())
+
+
+def combined_markdown(result: StructuredRecommendation) -> str:
+    ranked = '\n'.join(f"{i}. {m.name} - {m.reason}" for i, m in enumerate(result.recommended_millets, start=1))
+    return (
+        f"# Recommended Millets\n{ranked}\n\n"
+        f"# Key Benefits\n{_bullets(result.key_benefits)}\n\n"
+        f"# Usage Tips\n{_bullets(result.usage_tips)}\n\n"
+        f"# Important Notes\n{_bullets(result.important_notes)}\n"
+    )
+
+
+def benefits_markdown(result: StructuredRecommendation) -> Dict[str, str]:
+    """Per-millet markdown keyed by lower-cased millet name."""
+    sections = {}
+    for millet in result.millets:
+        sections[millet.name.strip().lower()] = (
+            f"# Key Health Benefits\n{_bullets(millet.key_health_benefits)}\n\n"
+            f"# How It Helps\n{_bullets(millet.how_it_helps)}\n\n"
+            f"# Nutritional Highlights\n{_bullets(millet.nutritional_highlights)}\n\n"
+            f"# Usage Tips\n{_bullets(millet.usage_tips)}\n"
+        )
+    return sections
@@ -0,0 +1,101 @@
+# summary_store.py
+# Versioned on-disk store of pre-generated LLM summaries.
+# Requests without free text only depend on (millet, concern set), so their summaries can be
+# generated offline by precompute_summaries.py and served without touching the LLM.
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from config import Config
+
+
+def file_fingerprint(path: str) -> str:
+    """sha256 of a file's contents, or 'missing' if it does not exist."""
+    if not os.path.exists(path):
+        return 'missing'
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def compute_store_version(prompt_version, data_paths: Iterable[str]) -> str:
+    """Store version changes whenever the prompts or any input data file changes."""
+    digest = hashlib.sha256(f"prompt:{prompt_version}".encode('utf-8'))
+    for path in data_paths:
+        digest.update(f"{path}:{file_fingerprint(path)}".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def concern_key(health_concerns: Iterable[str]) -> str:
+    """Order-insensitive key for a set of health concerns."""
+    return '+'.join(sorted({c.strip().lower() for c in health_concerns if c}))
+
+
+class SummaryStore:
+    """
+    One JSON file per version under `directory`. Only the file matching the current
+    version is ever read, so a data or prompt change silently invalidates old entries.
+    """
+
+    def __init__(self, directory: str, version: str):
+        self.directory = directory
+        self.version = version
+        self.path = os.path.join(directory, f"summaries_{version}.json")
+        self.benefits: Dict[str, str] = {}
+        self.combined: Dict[str, dict] = {}
+        self.metadata: Dict = {}
+
+    def load(self) -> 'SummaryStore':
+        if not os.path.exists(self.path):
+            print(f"Summary store: no materialized summaries for version {self.version} (looked in {self.path}).")
+            return self
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.benefits = data.get('benefits', {})
+            self.combined = data.get('combined', {})
+            self.metadata = data.get('metadata', {})
+            print(f"Summary store: loaded {len(self.benefits)} benefits and {len(self.combined)} combined summaries.")
+        except Exception as e:
+            print(f"Warning: Could not read summary store {self.path}: {e}")
+        return self
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.metadata.update({'version': self.version, 'updated_at': datetime.now().isoformat()})
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'metadata': self.metadata, 'benefits': self.benefits, 'combined': self.combined}, f)
+        os.replace(tmp_path, self.path)  # Readers never see a half-written file
+
+    @staticmethod
+    def benefits_key(millet_name: str, health_concerns: Iterable[str]) -> str:
+        return f"{millet_name.strip().lower()}|{concern_key(health_concerns)}"
+
+    def get_benefits(self, millet_name: str, health_concerns: List[str]) -> Optional[str]:
+        return self.benefits.get(self.benefits_key(millet_name, health_concerns))
+
+    def put_benefits(self, millet_name: str, health_concerns: List[str], summary_html: str):
+        self.benefits[self.benefits_key(millet_name, health_concerns)] = summary_html
+
+    def get_combined(self, health_concerns: List[str], millet_names: List[str]) -> Optional[str]:
+        """Returns the stored summary only if it was written for the same ranked millets."""
+        entry = self.combined.get(concern_key(health_concerns))
+        if entry and entry.get('millets') == list(millet_names):
+            return entry['html']
+        return None
+
+    def put_combined(self, health_concerns: List[str], millet_names: List[str], summary_html: str):
+        self.combined[concern_key(health_concerns)] = {'millets': list(millet_names), 'html': summary_html}
+
+
+def open_summary_store(prompt_version) -> SummaryStore:
+    """Opens the store for the current prompt version and data files."""
+    # Any change to these files invalidates the store (the index feeds evidence into the prompts)
+    data_paths = [Config.CSV_PATH, os.path.join(Config.VECTOR_DB_PATH, 'chroma.sqlite3')]
+    version = compute_store_version(prompt_version, data_paths)
+    return SummaryStore(Config.SUMMARY_STORE_PATH, version).load()
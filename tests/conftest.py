@@ -0,0 +1,64 @@
+# tests/conftest.py
+# Shared fixtures. `app_module` imports app.py fully offline, the way benchmark_app.py does:
+# fake ChatGroq, hashed embedder, a synthetic reviews CSV and a small Chroma store in a temp dir.
+
+import os
+
+import pytest
+
+os.environ.setdefault("ANONYMIZED_TELEMETRY", "False")
+
+ADMIN_TOKEN = "test-admin-token"
+EVIDENCE_TEXTS = [
+    "Finger millet (ragi) is rich in calcium and supports bone health.",
+    "Pearl millet (bajra) is a good source of iron for anemia.",
+    "Foxtail millet has a low glycemic index, helpful in diabetes.",
+    "Kodo millet is high in fiber and aids digestion and weight control.",
+    "Sorghum (jowar) is gluten free and good for heart health.",
+]
+
+
+@pytest.fixture(scope="session")
+def app_module(tmp_path_factory):
+    for module in ('fastapi', 'httpx', 'chromadb', 'langchain_community', 'langchain_groq'):
+        pytest.importorskip(module)
+
+    import rag_engine
+    from benchmark_recommender import RECOMMENDER_COLUMNS, generate_reviews
+    from config import Config
+    from langchain_community.vectorstores import Chroma
+    from millet_tags import add_millet_tags
+    from offline_stubs import FakeEmbeddings, make_fake_chat_groq
+
+    root = tmp_path_factory.mktemp("app")
+    Config.CSV_PATH = str(root / "reviews.csv")
+    generate_reviews(2000, seed=7)[RECOMMENDER_COLUMNS].to_csv(Config.CSV_PATH, index=False)
+    Config.VECTOR_DB_PATH = str(root / "chroma")
+    Config.SUMMARY_STORE_PATH = str(root / "summary_store")
+    Config.RETRIEVAL_MODE = "dense"
+    Config.PROFILE_ADMIN_TOKEN = ADMIN_TOKEN
+    Config.GROQ_API_KEY = "offline-test-key"
+    Config.GROQ_POOL_WARM_CONNECTIONS = 0
+
+    embeddings = FakeEmbeddings()
+    metadatas = []
+    for index, text in enumerate(EVIDENCE_TEXTS):
+        metadata = {'source_page': index + 1}
+        add_millet_tags(metadata, text)
+        metadatas.append(metadata)
+    Chroma(persist_directory=Config.VECTOR_DB_PATH, embedding_function=embeddings).add_texts(
+        texts=EVIDENCE_TEXTS, metadatas=metadatas
+    )
+
+    rag_engine.ChatGroq = make_fake_chat_groq(latency=0.0)
+    rag_engine.load_embeddings = lambda *args, **kwargs: embeddings
+
+    import app
+    return app
+
+
+@pytest.fixture
+def admin_headers():
+    from profiling import PROFILE_HEADER
+
+    return {PROFILE_HEADER: ADMIN_TOKEN}
@@ -0,0 +1,90 @@
+# tests/test_admission.py
+# Admission control covers every request that waits on Groq: /api/recommend and batches with
+# include_llm. Score-only batches and /health bypass it.
+
+import asyncio
+import json
+
+import pytest
+
+from admission import AdmissionController
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def client_for(app_module, monkeypatch):
+    import httpx
+
+    def make(max_concurrent=1, max_queue=0, shed_mode='reject'):
+        # Created inside the test's event loop (its semaphore binds to the running loop)
+        controller = AdmissionController(max_concurrent=max_concurrent, max_queue=max_queue, queue_timeout=0.1)
+        monkeypatch.setattr(app_module, 'admission', controller)
+        monkeypatch.setattr(app_module.Config, 'SHED_MODE', shed_mode)
+        transport = httpx.ASGITransport(app=app_module.app)
+        return controller, httpx.AsyncClient(transport=transport, base_url="http://test")
+    return make
+
+
+BATCH = {'items': [{'health_concerns': ['diabetes']}, {'health_concerns': ['bones', 'anemia']}]}
+
+
+def test_llm_batch_is_shed_when_slots_are_full(client_for):
+    async def scenario():
+        controller, client = client_for()
+        async with client:
+            release = await controller.admit()  # Another request holds the only slot
+            try:
+                shed = await client.post("/api/recommend/batch", json={**BATCH, 'include_llm': True})
+                scores_only = await client.post("/api/recommend/batch", json=BATCH)
+                health = await client.get("/health")
+            finally:
+                release()
+        return controller, shed, scores_only, health
+
+    controller, shed, scores_only, health = run(scenario())
+    assert shed.status_code == 503
+    assert int(shed.headers['Retry-After']) >= 1
+    assert scores_only.status_code == 200 and len(scores_only.text.splitlines()) == 2
+    assert health.status_code == 200
+    assert controller.snapshot()['shed_queue_full'] == 1
+
+
+def test_llm_batch_holds_one_slot_while_streaming_and_releases_it(client_for):
+    async def scenario():
+        controller, client = client_for()
+        async with client:
+            response = await client.post("/api/recommend/batch", json={**BATCH, 'include_llm': True})
+        return controller, response
+
+    controller, response = run(scenario())
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert len(lines) == 2 and all('"success": true' in line for line in lines)
+    snapshot = controller.snapshot()
+    assert snapshot['admitted'] == 1 and snapshot['in_flight'] == 0
+
+
+def test_llm_batch_degrades_when_shed_in_degraded_mode(client_for, app_module, monkeypatch):
+    def rescore(*args, **kwargs):
+        raise AssertionError("degraded items must reuse the batch's one-pass scores")
+    monkeypatch.setattr(app_module.recommender, 'get_top_recommendations', rescore)
+
+    async def scenario():
+        controller, client = client_for(shed_mode='degraded')
+        async with client:
+            release = await controller.admit()
+            try:
+                return await client.post("/api/recommend/batch", json={**BATCH, 'include_llm': True})
+            finally:
+                release()
+
+    response = run(scenario())
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert len(lines) == 2 and all('"scientific_evidence": {}' in line for line in lines)
+    items = [json.loads(line) for line in lines]
+    assert all(item['success'] and item['summary'] for item in items)
+    assert all(rec['benefits_summary'] for item in items for rec in item['recommendations'])
@@ -0,0 +1,74 @@
+# tests/test_concern_relevance.py
+# With CONCERN_SCORING=embedding, MilletRecommender uses the relevance table only if it covers
+# every millet and concern; a partial table would mix two incomparable scales.
+
+import numpy as np
+
+from benchmark_recommender import RECOMMENDER_COLUMNS, generate_reviews
+from concern_relevance import build_relevance_table, save_relevance_table
+from config import Config
+from recommendation_engine import MilletRecommender
+
+
+def make_recommender(monkeypatch, tmp_path, drop_millet=None, drop_concern=None):
+    df = generate_reviews(600, seed=3)[RECOMMENDER_COLUMNS]
+    csv_path = tmp_path / 'reviews.csv'
+    df.to_csv(csv_path, index=False)
+    monkeypatch.setattr(Config, 'CSV_PATH', str(csv_path))
+    monkeypatch.setattr(Config, 'RECOMMENDER_MATERIALIZE', False)
+
+    relevance = np.random.default_rng(0).random((len(df), 7))
+    table = build_relevance_table(df, relevance)
+    if drop_millet is not None:
+        keep = [i for i, millet in enumerate(table['millets']) if millet != drop_millet]
+        table['millets'] = [table['millets'][i] for i in keep]
+        table['relevance'] = [table['relevance'][i] for i in keep]
+    if drop_concern is not None:
+        column = table['concerns'].index(drop_concern)
+        table['concerns'].pop(column)
+        table['relevance'] = [row[:column] + row[column + 1:] for row in table['relevance']]
+    table_path = str(tmp_path / 'relevance.json')
+    save_relevance_table(table, table_path)
+
+    monkeypatch.setattr(Config, 'CONCERN_SCORING', 'keywords')
+    keyword_pct = MilletRecommender().concern_pct
+    monkeypatch.setattr(Config, 'CONCERN_SCORING', 'embedding')
+    monkeypatch.setattr(Config, 'CONCERN_RELEVANCE_PATH', table_path)
+    return MilletRecommender(), keyword_pct, table
+
+
+def test_complete_table_replaces_every_cell(monkeypatch, tmp_path):
+    recommender, _, table = make_recommender(monkeypatch, tmp_path)
+    rows = dict(zip(table['millets'], table['relevance']))
+    columns = [table['concerns'].index(concern) for concern in recommender.concerns]
+    expected = [[rows[millet][column] for column in columns] for millet in recommender.millets]
+    np.testing.assert_array_equal(recommender.concern_pct, expected)
+
+
+def test_missing_millet_falls_back_to_keywords_everywhere(monkeypatch, tmp_path, capsys):
+    recommender, keyword_pct, _ = make_recommender(monkeypatch, tmp_path, drop_millet='Pearl Millet')
+    np.testing.assert_array_equal(recommender.concern_pct, keyword_pct)
+    assert "missing millets ['Pearl Millet']" in capsys.readouterr().out
+
+
+def test_missing_concern_falls_back_to_keywords_everywhere(monkeypatch, tmp_path, capsys):
+    recommender, keyword_pct, _ = make_recommender(monkeypatch, tmp_path, drop_concern='bones')
+    np.testing.assert_array_equal(recommender.concern_pct, keyword_pct)
+    assert "concerns ['bones']" in capsys.readouterr().out
+
+
+def test_match_stays_on_mention_percentages_and_relevance_is_separate(monkeypatch, tmp_path):
+    recommender, keyword_pct, _ = make_recommender(monkeypatch, tmp_path)
+    concerns = ['diabetes', 'bones']
+    for materialize in (False, True):
+        monkeypatch.setattr(Config, 'RECOMMENDER_MATERIALIZE', materialize)
+        for rec in MilletRecommender().get_top_recommendations(concerns, top_n=3):
+            position = recommender.display_names.index(rec['name'])
+            columns = [recommender.concerns.index(concern) for concern in concerns]
+            assert list(rec['health_concern_match'].values()) == [round(keyword_pct[position, j], 1) for j in columns]
+            assert list(rec['concern_relevance'].values()) == [
+                round(recommender.relevance_pct[position, j], 1) for j in columns]
+
+    monkeypatch.setattr(Config, 'CONCERN_SCORING', 'keywords')
+    for rec in MilletRecommender().get_top_recommendations(concerns, top_n=3):
+        assert rec['concern_relevance'] is None
@@ -0,0 +1,29 @@
+# tests/test_debug_endpoints.py
+# Every /debug endpoint needs the admin token in the X-Profile header.
+
+import pytest
+
+from profiling import PROFILE_HEADER
+
+DEBUG_ENDPOINTS = [
+    ('GET', '/debug/admission'),
+    ('GET', '/debug/groq-pool'),
+    ('GET', '/debug/memory'),
+    ('GET', '/debug/prompts'),
+    ('GET', '/debug/profiles'),
+    ('POST', '/debug/reload'),
+]
+
+
+@pytest.fixture
+def client(app_module):
+    from fastapi.testclient import TestClient
+
+    return TestClient(app_module.app)
+
+
+@pytest.mark.parametrize('method, path', DEBUG_ENDPOINTS)
+def test_debug_endpoint_requires_admin(client, admin_headers, method, path):
+    assert client.request(method, path).status_code == 403
+    assert client.request(method, path, headers={PROFILE_HEADER: 'wrong-token'}).status_code == 403
+    assert client.request(method, path, headers=admin_headers).status_code == 200
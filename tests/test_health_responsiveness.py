@@ -0,0 +1,64 @@
+# tests/test_health_responsiveness.py
+# /api/recommend runs retrieval off the event loop, so /health stays fast while slow vector
+# searches are in flight.
+
+import asyncio
+import threading
+import time
+
+from admission import AdmissionController
+
+CONCURRENT_REQUESTS = 8
+SEARCH_SECONDS = 0.4
+HEALTH_BOUND_SECONDS = 0.25
+
+
+def test_health_stays_responsive_during_blocking_retrieval(app_module, monkeypatch):
+    import httpx
+
+    rag_engine = app_module.rag_engine
+    search = rag_engine.vector_store.similarity_search
+    lock = threading.Lock()
+    in_flight = {'now': 0, 'peak': 0, 'calls': 0}
+
+    def blocking_search(*args, **kwargs):
+        with lock:
+            in_flight['now'] += 1
+            in_flight['calls'] += 1
+            in_flight['peak'] = max(in_flight['peak'], in_flight['now'])
+        try:
+            time.sleep(SEARCH_SECONDS)  # A slow Chroma query, holding its thread
+            return search(*args, **kwargs)
+        finally:
+            with lock:
+                in_flight['now'] -= 1
+
+    monkeypatch.setattr(rag_engine.vector_store, 'similarity_search', blocking_search)
+    monkeypatch.setattr(app_module.Config, 'RETRIEVAL_MODE', 'dense')
+
+    async def scenario():
+        # Created inside the test's event loop (its semaphore binds to the running loop)
+        monkeypatch.setattr(app_module, 'admission', AdmissionController(
+            max_concurrent=CONCURRENT_REQUESTS, max_queue=CONCURRENT_REQUESTS, queue_timeout=30))
+        transport = httpx.ASGITransport(app=app_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=60) as client:
+            # A distinct user_query per request changes the retrieval query, so nothing comes from the evidence cache
+            recommends = [
+                asyncio.create_task(client.post("/api/recommend", json={
+                    'health_concerns': ['diabetes'], 'user_query': f"responsiveness check {i}"}))
+                for i in range(CONCURRENT_REQUESTS)
+            ]
+            health_latencies = []
+            while not all(task.done() for task in recommends):
+                start = time.perf_counter()
+                health = await client.get("/health")
+                health_latencies.append(time.perf_counter() - start)
+                assert health.status_code == 200
+                await asyncio.sleep(0.05)
+            return await asyncio.gather(*recommends), health_latencies
+
+    responses, health_latencies = asyncio.run(scenario())
+    assert [response.status_code for response in responses] == [200] * CONCURRENT_REQUESTS
+    assert len(health_latencies) >= 5
+    assert max(health_latencies) < HEALTH_BOUND_SECONDS, health_latencies
+    assert in_flight['calls'] >= CONCURRENT_REQUESTS and in_flight['peak'] >= 2
@@ -0,0 +1,58 @@
+# tests/test_hybrid_index.py
+# Rebuilding the hybrid index must not disturb a retriever that already has the old build
+# mmap'd, and a new retriever must see one consistent build (ids aligned with embedding rows).
+
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip('chromadb')
+os.environ.setdefault("ANONYMIZED_TELEMETRY", "False")
+
+from langchain_community.vectorstores import Chroma
+
+from hybrid_retriever import BUILDS_DIR, HybridRetriever, build_hybrid_index
+from offline_stubs import FakeEmbeddings
+
+
+def make_store(path, texts):
+    embeddings = FakeEmbeddings()
+    store = Chroma(persist_directory=path, embedding_function=embeddings)
+    store.add_texts(texts=texts, metadatas=[{'source_page': i + 1} for i in range(len(texts))],
+                    ids=[f"chunk-{i}" for i in range(len(texts))])
+    return store, embeddings
+
+
+def test_rebuild_leaves_live_retriever_intact(tmp_path):
+    index_dir = str(tmp_path / 'hybrid')
+    old_texts = ["finger millet calcium bones", "pearl millet iron anemia", "foxtail millet diabetes sugar"]
+    store, embeddings = make_store(str(tmp_path / 'db1'), old_texts)
+    build_hybrid_index(store, index_dir)
+    live = HybridRetriever(index_dir, embeddings)
+    live_rows = np.array(live.embeddings)
+
+    new_texts = ["kodo millet fiber digestion", "barnyard millet weight loss"] * 3
+    store, _ = make_store(str(tmp_path / 'db2'), new_texts)
+    for _ in range(3):  # Older builds get pruned; the live one's mapping must survive that too
+        build_hybrid_index(store, index_dir)
+
+    assert np.array_equal(np.array(live.embeddings), live_rows)
+    assert [doc.page_content for doc in live.search("calcium bones", k=1)] == ["finger millet calcium bones"]
+
+    fresh = HybridRetriever(index_dir, embeddings)
+    assert fresh.texts == new_texts
+    assert fresh.embeddings.shape[0] == len(fresh.ids) == len(new_texts)
+    assert len(os.listdir(os.path.join(index_dir, BUILDS_DIR))) == 2  # Current + previous
+
+
+def test_reads_unversioned_index(tmp_path):
+    """Indexes written before versioned builds (files directly in the index directory) still load."""
+    index_dir = str(tmp_path / 'hybrid')
+    store, embeddings = make_store(str(tmp_path / 'db'), ["ragi calcium", "bajra iron"])
+    build_hybrid_index(store, index_dir)
+    build_dir = os.path.join(index_dir, BUILDS_DIR, os.listdir(os.path.join(index_dir, BUILDS_DIR))[0])
+    for name in os.listdir(build_dir):
+        os.replace(os.path.join(build_dir, name), os.path.join(index_dir, name))
+    os.remove(os.path.join(index_dir, 'CURRENT'))
+    assert HybridRetriever(index_dir, embeddings).texts == ["ragi calcium", "bajra iron"]
@@ -0,0 +1,120 @@
+# tests/test_incremental_aggregation.py
+# aggregate_millet_data.incremental_aggregate must write the same millet_summary.csv as a full
+# aggregate_data run over the whole file, whatever order rows were merged in.
+
+import os
+
+import pandas as pd
+import pytest
+
+from aggregate_millet_data import aggregate_data, incremental_aggregate, save_summary_data
+
+SENTIMENT_COLUMNS = ['review_id', 'sentiment_label', 'sentiment_score', 'taste_score', 'texture_mentioned',
+                     'health_benefit_mentioned', 'price_mentioned', 'extracted_keywords']
+MILLETS = ['Finger Millet', 'Foxtail Millet', 'Pearl Millet']
+KEYWORDS = ['tasty', 'fresh', 'healthy', 'soft', 'stale', 'bitter', 'cheap', 'crunchy']
+
+
+def sentiment_rows(start, count):
+    """Deterministic LLM rows; keyword counts tie often, so first-seen order would matter."""
+    rows = []
+    for review_id in range(start, start + count):
+        label = ['positive', 'neutral', 'negative'][review_id % 3]
+        rows.append({
+            'review_id': review_id,
+            'sentiment_label': label,
+            'sentiment_score': round(0.1 + (review_id * 7 % 9) / 10, 2),
+            'taste_score': round((review_id % 5) / 4, 2) if review_id % 4 else None,
+            'texture_mentioned': review_id % 2 == 0,
+            'health_benefit_mentioned': review_id % 3 == 0,
+            'price_mentioned': None if review_id % 7 == 0 else review_id % 5 == 0,
+            'extracted_keywords': str([KEYWORDS[(review_id * 3 + k) % len(KEYWORDS)] for k in range(review_id % 3)]),
+        })
+    return pd.DataFrame(rows, columns=SENTIMENT_COLUMNS)
+
+
+def processed_rows(review_ids):
+    return pd.DataFrame({
+        'review_id': list(review_ids),
+        'rating': [1 + review_id % 5 for review_id in review_ids],
+        'millet_type': [MILLETS[review_id // 2 % len(MILLETS)] for review_id in review_ids],
+    })
+
+
+class Paths:
+    def __init__(self, directory):
+        self.sentiment = os.path.join(directory, 'sentiments.csv')
+        self.processed = os.path.join(directory, 'processed.csv')
+        self.state = os.path.join(directory, 'state.json')
+        self.incremental_csv = os.path.join(directory, 'millet_summary.csv')
+        self.full_csv = os.path.join(directory, 'millet_summary_full.csv')
+
+    def append_sentiments(self, df):
+        exists = os.path.exists(self.sentiment)
+        df.to_csv(self.sentiment, mode='a', header=not exists, index=False)
+
+    def write_processed(self, review_ids):
+        processed_rows(review_ids).to_csv(self.processed, index=False)
+
+    def assert_matches_full(self, rebuild=False):
+        """Runs an incremental pass and compares its millet_summary.csv with a full recompute, byte for byte."""
+        save_summary_data(incremental_aggregate(self.sentiment, self.processed, self.state, rebuild=rebuild),
+                          self.incremental_csv)
+        save_summary_data(aggregate_data(self.sentiment, self.processed), self.full_csv)
+        with open(self.incremental_csv, encoding='utf-8') as f:
+            incremental = f.read()
+        with open(self.full_csv, encoding='utf-8') as f:
+            full = f.read()
+        assert incremental == full
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return Paths(str(tmp_path))
+
+
+def test_plain_appends_match_full_recompute(paths):
+    paths.write_processed(range(0, 90))
+    paths.append_sentiments(sentiment_rows(0, 30))
+    paths.assert_matches_full()
+    for start in (30, 60):
+        paths.append_sentiments(sentiment_rows(start, 30))
+        paths.assert_matches_full()
+
+
+def test_pending_rows_resolved_later_match_full_recompute(paths):
+    # Every other pair of reviews has LLM output before it is in the processed file
+    matched_first = [review_id for review_id in range(0, 40) if review_id // 2 % 2 == 0]
+    paths.write_processed(matched_first)
+    paths.append_sentiments(sentiment_rows(0, 40))
+    save_summary_data(incremental_aggregate(paths.sentiment, paths.processed, paths.state), paths.incremental_csv)
+    assert pd.read_csv(paths.incremental_csv)['num_reviews'].sum() == len(matched_first)
+
+    # They resolve on a later run, merged after rows that come later in the file
+    paths.write_processed(range(0, 60))
+    paths.append_sentiments(sentiment_rows(40, 20))
+    paths.assert_matches_full()
+    assert pd.read_csv(paths.incremental_csv)['num_reviews'].sum() == 60
+
+
+def test_upstream_rewrite_forces_full_rebuild(paths, capsys):
+    paths.write_processed(range(0, 60))
+    paths.append_sentiments(sentiment_rows(0, 40))
+    paths.assert_matches_full()
+
+    # Re-extraction rewrites the file: fewer, different rows at the same byte offsets
+    rewritten = sentiment_rows(0, 40)
+    rewritten['sentiment_label'] = 'negative'
+    rewritten.iloc[:30].to_csv(paths.sentiment, index=False)
+    capsys.readouterr()
+    paths.assert_matches_full()
+    assert "rebuilding" in capsys.readouterr().out
+    assert pd.read_csv(paths.incremental_csv)['negative_pct'].eq(100).all()
+
+
+def test_explicit_rebuild_matches_full_recompute(paths):
+    paths.write_processed(range(0, 50))
+    paths.append_sentiments(sentiment_rows(0, 25))
+    paths.assert_matches_full()
+    paths.append_sentiments(sentiment_rows(25, 25))
+    paths.assert_matches_full(rebuild=True)
@@ -0,0 +1,56 @@
+# tests/test_near_duplicates.py
+# Deterministic checks for near_duplicates.py (fixed MinHash seeds): templated variants cluster,
+# distinct reviews and other millets don't, chains don't merge transitively, and extraction
+# results are copied only to a representative's own members.
+
+import numpy as np
+import pandas as pd
+
+from near_duplicates import cluster_sizes, find_near_duplicates, propagate_to_members
+
+TEMPLATED = [
+    "very good product nice quality ragi flour, fresh stock and value for money",
+    "very good product nice quality ragi flour fresh stock and value for money!",
+    "very good product, nice quality ragi flour, fresh stock and value for money",
+    "Very good product nice quality ragi flour fresh stock and value for money",
+]
+DISTINCT = [
+    "bad packing, the jowar was full of stones and smelled stale",
+    "my sugar levels came down after switching to foxtail millet rice",
+    "kids did not like the taste of bajra roti but dosa came out well",
+]
+
+
+def test_templated_variants_cluster_and_distinct_reviews_do_not():
+    representatives = find_near_duplicates(TEMPLATED + DISTINCT)
+    assert representatives.tolist() == [0, 0, 0, 0, 4, 5, 6]
+    assert cluster_sizes(representatives).tolist() == [4, 4, 4, 4, 1, 1, 1]
+
+
+def test_clusters_stay_within_millet_type():
+    texts = TEMPLATED[:2] + TEMPLATED[:2]
+    groups = ['Finger Millet', 'Finger Millet', 'Pearl Millet', 'Pearl Millet']
+    assert find_near_duplicates(texts, groups=groups).tolist() == [0, 0, 2, 2]
+    assert find_near_duplicates(texts).tolist() == [0, 0, 0, 0]
+
+
+def test_chains_do_not_merge_transitively():
+    # Estimated Jaccard: a~b 0.88 and b~c 0.71 pass the threshold, a~c 0.62 doesn't
+    a = "very good quality ragi flour tasty and healthy will buy again from this seller"
+    b = "very good quality ragi flour tasty and healthy will buy again from this shop"
+    c = "very good quality ragi flour tasty healthy, will buy again from this shop thanks"
+    assert find_near_duplicates([a, b, c], threshold=0.7).tolist() == [0, 0, 2]
+
+
+def test_empty_reviews_are_never_clustered():
+    assert find_near_duplicates(["", None, np.nan, "  "]).tolist() == [0, 1, 2, 3]
+
+
+def test_results_are_copied_to_members_of_the_same_representative():
+    results = [{'review_id': 'r1', 'sentiment_label': 'positive'}, {'review_id': 'r5', 'sentiment_label': 'negative'}]
+    members = pd.DataFrame({'review_id': ['r2', 'r3', 'r6'], 'near_duplicate_of': ['r1', 'r1', 'r9']})
+    propagated = propagate_to_members(results, members)
+    assert propagated == [
+        {'review_id': 'r2', 'sentiment_label': 'positive', 'propagated_from': 'r1'},
+        {'review_id': 'r3', 'sentiment_label': 'positive', 'propagated_from': 'r1'},
+    ]
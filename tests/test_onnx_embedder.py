@@ -0,0 +1,25 @@
+# tests/test_onnx_embedder.py
+# The exported ONNX embedder (export_onnx_embedder.py) must stay within tolerance of the PyTorch
+# sentence-transformers model it replaces. Skipped when the export or the reference model isn't available.
+
+import os
+
+import pytest
+
+pytest.importorskip('onnxruntime')
+pytest.importorskip('tokenizers')
+pytest.importorskip('sentence_transformers')
+
+from config import Config
+from embedding_backends import ONNX_INT8_MODEL_FILE, ONNX_MODEL_FILE
+from export_onnx_embedder import FP32_TOLERANCE, INT8_TOLERANCE, min_cosine_vs_reference
+
+
+@pytest.mark.parametrize('quantized, model_file, tolerance', [
+    (False, ONNX_MODEL_FILE, FP32_TOLERANCE),
+    (True, ONNX_INT8_MODEL_FILE, INT8_TOLERANCE),
+])
+def test_onnx_vectors_match_pytorch_reference(quantized, model_file, tolerance):
+    if not os.path.exists(os.path.join(Config.ONNX_MODEL_DIR, model_file)):
+        pytest.skip(f"{model_file} not exported to {Config.ONNX_MODEL_DIR}; run export_onnx_embedder.py")
+    assert min_cosine_vs_reference(Config.ONNX_MODEL_DIR, quantized) >= 1 - tolerance
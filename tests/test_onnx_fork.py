@@ -0,0 +1,68 @@
+# tests/test_onnx_fork.py
+# With a preloading gunicorn master, OnnxEmbeddings is built before fork(). Each worker must get
+# its own InferenceSession instead of using the parent's (whose thread pool didn't survive the fork).
+# Runs on a tiny generated graph and word-level tokenizer, so no model export is needed.
+
+import multiprocessing
+import os
+
+import numpy as np
+import pytest
+
+onnx = pytest.importorskip('onnx')
+pytest.importorskip('onnxruntime')
+tokenizers = pytest.importorskip('tokenizers')
+
+from embedding_backends import ONNX_MODEL_FILE, TOKENIZER_FILE, OnnxEmbeddings
+
+VOCAB = ['[PAD]', '[UNK]', 'ragi', 'bajra', 'jowar', 'calcium', 'iron', 'fiber']
+DIM = 8
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    """Graph: token embedding lookup (input_ids -> last_hidden_state), ignoring the attention mask."""
+    from onnx import TensorProto, helper, numpy_helper
+
+    table = np.random.default_rng(0).normal(size=(len(VOCAB), DIM)).astype(np.float32)
+    graph = helper.make_graph(
+        [helper.make_node('Gather', ['table', 'input_ids'], ['last_hidden_state'], axis=0),
+         helper.make_node('Identity', ['attention_mask'], ['unused_mask'])],
+        'tiny_embedder',
+        [helper.make_tensor_value_info('input_ids', TensorProto.INT64, ['batch', 'sequence']),
+         helper.make_tensor_value_info('attention_mask', TensorProto.INT64, ['batch', 'sequence'])],
+        [helper.make_tensor_value_info('last_hidden_state', TensorProto.FLOAT, ['batch', 'sequence', DIM]),
+         helper.make_tensor_value_info('unused_mask', TensorProto.INT64, ['batch', 'sequence'])],
+        initializer=[numpy_helper.from_array(table, 'table')],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid('', 14)], ir_version=8)
+    onnx.save(model, str(tmp_path / ONNX_MODEL_FILE))
+
+    tokenizer = tokenizers.Tokenizer(tokenizers.models.WordLevel({w: i for i, w in enumerate(VOCAB)}, unk_token='[UNK]'))
+    tokenizer.pre_tokenizer = tokenizers.pre_tokenizers.Whitespace()
+    tokenizer.save(str(tmp_path / TOKENIZER_FILE))
+    return str(tmp_path)
+
+
+def _embed_in_child(embeddings, parent_session_id, results):
+    vector = embeddings.embed_query("ragi calcium")
+    results.put((os.getpid(), id(embeddings.session) != parent_session_id, vector))
+
+
+def test_forked_worker_opens_its_own_session(model_dir):
+    embeddings = OnnxEmbeddings(model_dir, num_threads=2)
+    expected = embeddings.embed_query("ragi calcium")  # Parent session (and thread pool) now exists
+    parent_session = embeddings.session
+
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    child = context.Process(target=_embed_in_child, args=(embeddings, id(parent_session), results))
+    child.start()
+    child_pid, fresh_session, vector = results.get(timeout=30)  # A deadlocked child never answers
+    child.join(timeout=30)
+
+    assert child.exitcode == 0
+    assert child_pid != os.getpid()
+    assert fresh_session
+    assert np.allclose(vector, expected)
+    assert embeddings.session is parent_session  # The parent keeps its own
@@ -0,0 +1,45 @@
+# tests/test_profiled_pipeline.py
+# Profiled /api/recommend requests run the same pipeline as unprofiled ones: retrieval goes
+# through the RAG engine's retrieval pool and the response matches.
+
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def client(app_module):
+    from fastapi.testclient import TestClient
+
+    return TestClient(app_module.app)
+
+
+def test_profiled_request_uses_the_retrieval_pool(app_module, client, admin_headers, monkeypatch):
+    rag_engine = app_module.rag_engine
+    search = rag_engine.vector_store.similarity_search
+    search_threads = []
+
+    def recording_search(*args, **kwargs):
+        search_threads.append(threading.current_thread().name)
+        return search(*args, **kwargs)
+
+    monkeypatch.setattr(rag_engine.vector_store, 'similarity_search', recording_search)
+    monkeypatch.setattr(app_module.Config, 'PROFILE_MODE', 'cprofile')
+    rag_engine.evidence_cache.clear()
+
+    query = {'health_concerns': ['bones', 'anemia'], 'user_query': 'profiled pipeline check'}
+    before = {meta['id'] for meta in client.get("/debug/profiles", headers=admin_headers).json()['profiles']}
+    profiled = client.post("/api/recommend", json=query, headers=admin_headers)
+    profiles = client.get("/debug/profiles", headers=admin_headers).json()['profiles']
+
+    assert profiled.status_code == 200
+    assert search_threads and all(name.startswith('retrieval') for name in search_threads)
+    new = [meta for meta in profiles if meta['id'] not in before]
+    assert len(new) == 1 and new[0]['error'] is None
+
+    rag_engine.evidence_cache.clear()
+    plain = client.post("/api/recommend", json=query)
+    assert plain.status_code == 200
+    names = lambda response: [rec['name'] for rec in response.json()['recommendations']]
+    assert names(profiled) == names(plain)
+    assert profiled.json()['scientific_evidence'] == plain.json()['scientific_evidence']
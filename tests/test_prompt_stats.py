@@ -0,0 +1,29 @@
+# tests/test_prompt_stats.py
+# Prompt token accounting covers only prompts that were sent to Groq, and /debug/prompts
+# summarises it.
+
+from collections import deque
+
+from llm_guard import Deadline
+
+EVIDENCE = [f"Page {page}: Finger millet is rich in calcium and dietary fibre. " * 20 for page in range(6)]
+
+
+def test_only_sent_prompts_are_recorded(app_module, monkeypatch, admin_headers):
+    from fastapi.testclient import TestClient
+
+    rag_engine = app_module.rag_engine
+    monkeypatch.setattr(rag_engine, 'prompt_stats', deque(maxlen=50))
+    monkeypatch.setattr(app_module.Config, 'EVIDENCE_TOKEN_BUDGET', 100)
+
+    # An exhausted deadline falls back to the template without calling Groq
+    rag_engine.generate_benefits_summary('finger', ['bones'], EVIDENCE, deadline=Deadline(0))
+    assert rag_engine.prompt_stats_summary() == {'prompts': 0}
+
+    for _ in range(3):
+        rag_engine.generate_benefits_summary('finger', ['bones'], EVIDENCE)
+    summary = TestClient(app_module.app).get("/debug/prompts", headers=admin_headers).json()
+    assert summary['prompts'] == 3
+    assert summary['p95_prompt_tokens'] >= summary['mean_prompt_tokens'] > summary['mean_evidence_tokens_after_trim']
+    assert summary['mean_evidence_tokens_after_trim'] <= 100 < summary['mean_evidence_tokens_before_trim']
+    assert summary['truncated_share'] == 1.0
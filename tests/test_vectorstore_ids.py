@@ -0,0 +1,34 @@
+# tests/test_vectorstore_ids.py
+# Chunk ids are content hashes, so identical chunks from one page collide; both the full rebuild
+# and the incremental update must store each id once instead of failing on Chroma's duplicate check.
+
+import os
+
+import pytest
+
+pytest.importorskip('chromadb')
+os.environ.setdefault("ANONYMIZED_TELEMETRY", "False")
+
+from langchain_core.documents import Document
+
+from offline_stubs import FakeEmbeddings
+from setup_rag_vectorstore import create_and_save_vectorstore, update_vectorstore_incrementally
+
+
+def page_chunks():
+    metadata = {'source': 'millets.pdf', 'page': 3, 'source_page': 4}
+    texts = ["Finger millet is rich in calcium.", "Finger millet is rich in calcium.", "Pearl millet has iron."]
+    return [Document(page_content=text, metadata=dict(metadata)) for text in texts]
+
+
+def test_full_rebuild_stores_repeated_chunks_once(tmp_path):
+    store = create_and_save_vectorstore(page_chunks(), FakeEmbeddings(), str(tmp_path / 'db'))
+    assert store is not None
+    assert len(store.get(include=[])['ids']) == 2
+
+
+def test_incremental_update_after_rebuild_is_a_no_op(tmp_path):
+    embeddings = FakeEmbeddings()
+    create_and_save_vectorstore(page_chunks(), embeddings, str(tmp_path / 'db'))
+    store = update_vectorstore_incrementally(page_chunks(), embeddings, str(tmp_path / 'db'))
+    assert len(store.get(include=[])['ids']) == 2
@@ -0,0 +1,92 @@
+# worker_memory_report.py
+# Per-process memory of a running gunicorn master and its workers (Linux only).
+# USS (unique set size = private clean + private dirty) is what each extra worker really
+# costs; PSS splits shared pages evenly, so sum(PSS) is the true total of the whole group.
+#
+# Example:
+#   gunicorn app:app -c gunicorn.conf.py
+#   python worker_memory_report.py --pidfile gunicorn.pid
+#   python worker_memory_report.py --pid 12345 --output memory_report.json
+
+import argparse
+import json
+import os
+
+FIELDS = ['Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty', 'Swap']
+
+
+def read_smaps_rollup(pid: int) -> dict:
+    """Memory counters in KiB from /proc/<pid>/smaps_rollup (kernel 4.14+)."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup", 'r') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].rstrip(':') in FIELDS:
+                values[parts[0].rstrip(':')] = int(parts[1])
+    values['Uss'] = values.get('Private_Clean', 0) + values.get('Private_Dirty', 0)
+    return values
+
+
+def child_pids(pid: int) -> list:
+    children = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        try:
+            with open(f"/proc/{pid}/task/{task}/children", 'r') as f:
+                children.extend(int(child) for child in f.read().split())
+        except FileNotFoundError:
+            continue
+    return sorted(set(children))
+
+
+def report(master_pid: int) -> dict:
+    processes = [{'role': 'master', 'pid': master_pid, **read_smaps_rollup(master_pid)}]
+    for pid in child_pids(master_pid):
+        try:
+            processes.append({'role': 'worker', 'pid': pid, **read_smaps_rollup(pid)})
+        except (FileNotFoundError, ProcessLookupError):
+            continue  # Worker restarted while we were reading
+    workers = [p for p in processes if p['role'] == 'worker']
+    return {
+        'master_pid': master_pid,
+        'workers': len(workers),
+        'processes': processes,
+        'total_rss_kib': sum(p['Rss'] for p in processes),
+        'total_pss_kib': sum(p['Pss'] for p in processes),
+        'mean_worker_uss_kib': round(sum(p['Uss'] for p in workers) / len(workers)) if workers else 0,
+    }
+
+
+def print_report(result: dict):
+    print(f"{'role':<8}{'pid':>8}{'RSS MiB':>10}{'PSS MiB':>10}{'USS MiB':>10}{'shared MiB':>12}")
+    for p in result['processes']:
+        shared = p.get('Shared_Clean', 0) + p.get('Shared_Dirty', 0)
+        print(f"{p['role']:<8}{p['pid']:>8}{p['Rss'] / 1024:>10.1f}{p['Pss'] / 1024:>10.1f}"
+              f"{p['Uss'] / 1024:>10.1f}{shared / 1024:>12.1f}")
+    print(f"\nTotal RSS (double counts shared pages): {result['total_rss_kib'] / 1024:.1f} MiB")
+    print(f"Total PSS (actual footprint):           {result['total_pss_kib'] / 1024:.1f} MiB")
+    print(f"Mean unique memory per worker (USS):    {result['mean_worker_uss_kib'] / 1024:.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-worker unique/shared memory of a gunicorn server")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--pid', type=int, help="Master process id")
+    group.add_argument('--pidfile', default='gunicorn.pid', help="gunicorn pidfile (default: gunicorn.pid)")
+    parser.add_argument('--output', help="Also write the report as JSON")
+    args = parser.parse_args()
+
+    master_pid = args.pid
+    if master_pid is None:
+        with open(args.pidfile, 'r') as f:
+            master_pid = int(f.read().strip())
+
+    result = report(master_pid)
+    print_report(result)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()